@@ -0,0 +1,64 @@
+# benchmarks/bench_batch.py
+# Samples/sec of model.score_batch at 1k, 100k and 1M rows, with and without
+# JSONL serialization of the results, against calling get_suitable_crops per sample.
+#
+# Usage: python benchmarks/bench_batch.py [--sizes 1000 100000 1000000] [--serialize-max 100000]
+
+import argparse
+import io
+import time
+
+import numpy as np
+
+from synthetic import CLIMATES, SOIL_TYPES, TOPOGRAPHIES, WATER_LEVELS, make_samples, model
+
+NUMERICAL_RANGES = {
+    'Nitrogen': (0, 160), 'Phosphorus': (0, 100), 'Potassium': (0, 220),
+    'Humidity': (20, 100), 'pH': (4.0, 8.5), 'Rainfall': (0, 320),
+}
+
+def make_columns(num_rows, seed=0):
+    """
+    Columnar samples (the fastest input layout for score_batch).
+    """
+    rng = np.random.default_rng(seed)
+    columns = {key: rng.uniform(low, high, num_rows).round(1) for key, (low, high) in NUMERICAL_RANGES.items()}
+    for key, choices in (('Climate', CLIMATES), ('Soil_Type', SOIL_TYPES),
+                         ('Topography', TOPOGRAPHIES), ('Water_Availability', WATER_LEVELS)):
+        columns[key] = np.array(choices, dtype=object)[rng.integers(0, len(choices), num_rows)].tolist()
+    return columns
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--serialize-max', type=int, default=100000,
+                        help="Only time JSONL serialization up to this many rows")
+    args = parser.parse_args()
+
+    model.get_engine() # Compile outside the timed region
+
+    samples = make_samples(1000)
+    start = time.perf_counter()
+    for features in samples:
+        model.get_suitable_crops(features)
+    per_sample_rate = len(samples) / (time.perf_counter() - start)
+    print(f"get_suitable_crops per sample      : {per_sample_rate:12.0f} samples/s")
+
+    for size in args.sizes:
+        columns = make_columns(size)
+        start = time.perf_counter()
+        percentages = model.score_batch(columns)
+        score_time = time.perf_counter() - start
+        line = f"score_batch {size:>8} rows           : {size / score_time:12.0f} samples/s"
+        if size <= args.serialize_max:
+            start = time.perf_counter()
+            sink = io.StringIO()
+            for result in model.iter_batch_results(percentages):
+                sink.write(result)
+                sink.write('\n')
+            total_time = score_time + time.perf_counter() - start
+            line += f"   with JSONL: {size / total_time:10.0f} samples/s"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_db.py
+# Prediction persistence: inserts/sec and history-query latency of the row-at-a-time JSON
+# rows index.php writes versus crop_db.PredictionWriter (buffered multi-row INSERTs,
+# packed crop_scores), on SQLite files in a temporary directory.
+#
+#   JSON, row at a time     one INSERT + commit per request, predicted_crop = model.py JSON
+#   compact, batched        PredictionWriter, --batch-size rows per transaction
+#
+# Results are ranked before the timing, so only the persistence is measured. History is
+# the --history latest predictions of a random user (crop_db.fetch_history, names and
+# percentages decoded), with and without the predictions_user index.
+#
+# Usage: python benchmarks/bench_db.py [--rows 5000] [--users 100] [--batch-size 500]
+#                                      [--history 20] [--crops N]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from synthetic import make_catalog, make_samples, model
+
+import crop_db
+
+def insert_json(conn, rows):
+    columns = ('user_id',) + tuple(crop_db.FEATURE_COLUMNS) + ('predicted_crop',)
+    statement = f"INSERT INTO predictions ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    for user_id, features, ranked in rows:
+        conn.execute(statement, (user_id,) + tuple(features.get(name) for name in crop_db.FEATURE_COLUMNS.values())
+                     + (ranked.to_json(),))
+        conn.commit() # mysqli autocommit, as in index.php
+
+def insert_compact(conn, rows, batch_size):
+    with crop_db.PredictionWriter(conn, batch_size) as writer:
+        for user_id, features, ranked in rows:
+            writer.add(user_id, features, ranked)
+
+def history_latency(conn, users, limit, queries=500):
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(queries):
+        crop_db.fetch_history(conn, rng.randrange(users), limit)
+    return (time.perf_counter() - start) / queries
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prediction inserts and history queries.")
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--history', type=int, default=20, help="Predictions per history query (default: 20)")
+    parser.add_argument('--crops', type=int, default=None, help="Use a synthetic catalog of this many crops")
+    args = parser.parse_args()
+
+    if args.crops:
+        model.CROP_CONDITIONS = make_catalog(args.crops)
+    model.use_vectorized_engine(True)
+    samples = make_samples(min(args.rows, 1000))
+    rng = random.Random(0)
+    rows = []
+    for i in range(args.rows):
+        features = samples[i % len(samples)]
+        rows.append((rng.randrange(args.users), features, model.rank_crops(features)))
+
+    directory = tempfile.mkdtemp()
+    print(f"{args.rows} predictions, {args.users} users, {len(model.CROP_CONDITIONS)} crops")
+    modes = [
+        ('JSON, row at a time', insert_json),
+        (f'compact, batched ({args.batch_size})', lambda conn, rows: insert_compact(conn, rows, args.batch_size)),
+    ]
+    for label, insert in modes:
+        path = os.path.join(directory, label.split(',')[0] + '.sqlite')
+        conn = crop_db.connect(path)
+        start = time.perf_counter()
+        insert(conn, rows)
+        seconds = time.perf_counter() - start
+        indexed = history_latency(conn, args.users, args.history)
+        conn.execute("DROP INDEX predictions_user")
+        unindexed = history_latency(conn, args.users, args.history)
+        conn.close()
+        size = os.path.getsize(path)
+        print(f"  {label:<26} {args.rows / seconds:>9.0f} inserts/s  "
+              f"history {indexed * 1e3:6.3f} ms (no user index {unindexed * 1e3:6.3f} ms)  "
+              f"{size / args.rows:>6.0f} bytes/row")
+
+if __name__ == "__main__":
+    main()
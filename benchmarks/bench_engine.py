@@ -0,0 +1,47 @@
+# benchmarks/bench_engine.py
+# Compares the per-crop Python scoring loop with the vectorized engine (crop_engine.py)
+# as the crop catalog grows.
+#
+# Usage: python benchmarks/bench_engine.py [--sizes 60 600 6000] [--samples 200]
+
+import argparse
+import time
+
+from synthetic import make_catalog, make_samples, model
+
+def time_per_call(func, samples):
+    start = time.perf_counter()
+    for features in samples:
+        func(features)
+    return (time.perf_counter() - start) / len(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[60, 600, 6000])
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    samples = make_samples(args.samples)
+    original = model.CROP_CONDITIONS
+    print(f"{'crops':>8} {'python loop':>14} {'vectorized':>14} {'speedup':>8}")
+    try:
+        for size in args.sizes:
+            model.CROP_CONDITIONS = make_catalog(size)
+            model.reset_engine()
+
+            model.use_vectorized_engine(False)
+            python_time = time_per_call(model._rank_crops_python, samples)
+
+            engine = model.get_engine()
+            def vectorized(features):
+                return engine.rank(engine.score(features))
+            vectorized_time = time_per_call(vectorized, samples)
+
+            print(f"{size:>8} {python_time * 1e6:>11.1f} us {vectorized_time * 1e6:>11.1f} us "
+                  f"{python_time / vectorized_time:>7.1f}x")
+    finally:
+        model.CROP_CONDITIONS = original
+        model.reset_engine()
+
+if __name__ == "__main__":
+    main()
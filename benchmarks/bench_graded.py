@@ -0,0 +1,69 @@
+# benchmarks/bench_graded.py
+# Binary versus graded scoring (crop_engine.GradedScoring, trapezoid and Gaussian
+# falloff with per-feature weights): time per single-sample request and per batch row
+# as the catalog grows.
+#
+#   binary (index)   get_suitable_crops' default vectorized path (crop_index bitsets)
+#   binary (scan)    CompiledConditions.score, the binary kernel over every crop
+#   graded ...       CompiledConditions.score with a GradedScoring (always a full scan)
+#
+# Usage: python benchmarks/bench_graded.py [--sizes 60 1000 10000] [--samples 200] [--rows 20000]
+
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import make_catalog, make_samples, model
+
+import crop_engine
+import crop_index
+
+def time_per_call(function, samples):
+    function(samples[0])
+    start = time.perf_counter()
+    for features in samples:
+        function(features)
+    return (time.perf_counter() - start) / len(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark binary versus graded scoring.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[60, 1000, 10000])
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=20000, help="Rows for the batch (score_columns) timing")
+    args = parser.parse_args()
+
+    samples = make_samples(args.samples)
+    rows = make_samples(args.rows)
+    columns = {key: [sample.get(key) for sample in rows] for key in model.FEATURE_NAMES}
+    weights = {'pH': 2.0, 'Rainfall': 1.5, 'Topography': 0.5}
+    modes = [
+        ('graded trapezoid', crop_engine.GradedScoring('trapezoid')),
+        ('graded gaussian', crop_engine.GradedScoring('gaussian')),
+        ('graded weighted', crop_engine.GradedScoring('trapezoid', weights=weights)),
+    ]
+    exact = crop_engine.GradedScoring(tolerances={key: 0.0 for key in crop_engine.NUMERICAL_FEATURES})
+
+    print(f"{'crops':>8} {'mode':<18} {'per request':>12} {'per batch row':>14}")
+    for size in args.sizes:
+        engine = crop_engine.CompiledConditions(make_catalog(size))
+        index = crop_index.IntervalIndex(engine)
+        # Zero tolerances and unit weights must reproduce binary scoring exactly
+        assert np.array_equal(engine.score_columns(columns), engine.score_columns(columns, exact))
+
+        def batch_time(graded):
+            start = time.perf_counter()
+            engine.score_columns(columns, graded)
+            return (time.perf_counter() - start) / args.rows
+
+        results = [('binary (index)', time_per_call(index.score, samples), None),
+                   ('binary (scan)', time_per_call(engine.score, samples), batch_time(None))]
+        for label, graded in modes:
+            results.append((label, time_per_call(lambda features: engine.score(features, graded), samples),
+                            batch_time(graded)))
+        for label, request_time, row_time in results:
+            row_column = f"{row_time * 1e6:>11.2f} us" if row_time is not None else f"{'-':>14}"
+            print(f"{size:>8} {label:<18} {request_time * 1e6:>9.1f} us {row_column}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_http.py
+# Load generator for the HTTP endpoint (crop_http.py): throughput and latency
+# percentiles with and without request micro-batching.
+#
+# Starts "python model.py --serve-http" once with --max-batch 1 (every request scored on
+# its own) and once with batching, then has --concurrency keep-alive connections each
+# send requests back to back with synthetic samples.
+#
+# Usage: python benchmarks/bench_http.py [--requests 5000] [--concurrency 64]
+#                                        [--max-batch 64] [--max-delay-ms 2] [--crops N]
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import ROOT, make_catalog, make_samples, model
+
+import crop_reload
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+async def http_request(reader, writer, method, path, body=b''):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+async def run_client(port, bodies, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            status, _ = await http_request(reader, writer, 'POST', '/recommend', body)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f"HTTP {status}")
+    finally:
+        writer.close()
+
+async def load_test(port, bodies, concurrency):
+    """
+    Sends all bodies over concurrency connections. Returns (seconds, latencies).
+    """
+    latencies = []
+    shares = [bodies[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(port, share, latencies) for share in shares if share))
+    return time.perf_counter() - start, latencies
+
+async def fetch(port, path, body=b'', method='GET'):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        return await http_request(reader, writer, method, path, body)
+    finally:
+        writer.close()
+
+async def wait_for_server(port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            await fetch(port, '/health')
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("HTTP server did not start")
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+async def bench(label, server_args, bodies, args, expected):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'model.py'), '--serve-http', '--port', str(port),
+                               '--reload-interval', '0'] + server_args, cwd=ROOT, stderr=subprocess.DEVNULL)
+    try:
+        await wait_for_server(port)
+        # Results must match get_suitable_crops byte for byte
+        status, response = await fetch(port, '/recommend', bodies[0], 'POST')
+        assert status == 200 and response.decode('utf-8') == expected, response[:200]
+        await load_test(port, bodies[:args.concurrency * 4], args.concurrency) # Warm-up
+        seconds, latencies = await load_test(port, bodies, args.concurrency)
+        _, stats = await fetch(port, '/stats')
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    batching = json.loads(stats)['batching']
+    mean_batch = f"{batching['mean_batch']:.1f}" if batching else '1'
+    print(f"{label:<24} {len(latencies) / seconds:>9.0f} req/s  "
+          f"p50 {percentile(latencies, 0.50) * 1e3:6.2f} ms  p90 {percentile(latencies, 0.90) * 1e3:6.2f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1e3:6.2f} ms  max {latencies[-1] * 1e3:7.2f} ms  "
+          f"mean batch {mean_batch}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the crop scoring HTTP server.")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64, help="Concurrent keep-alive connections (default: 64)")
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-delay-ms', type=float, default=2.0)
+    parser.add_argument('--crops', type=int, default=None, help="Serve a synthetic catalog of this many crops")
+    args = parser.parse_args()
+
+    server_args = []
+    if args.crops:
+        conditions_path = os.path.join(tempfile.mkdtemp(), 'crop_conditions.json')
+        model.CROP_CONDITIONS = make_catalog(args.crops)
+        crop_reload.export_conditions(conditions_path)
+        server_args = ['--conditions', conditions_path]
+    samples = make_samples(min(args.requests, 1000))
+    bodies = [json.dumps([samples[i % len(samples)][key] for key in model.FEATURE_NAMES]).encode('utf-8')
+              for i in range(args.requests)]
+    model.use_vectorized_engine(True)
+    expected = model.get_suitable_crops(model.parse_features(json.loads(bodies[0])))
+
+    print(f"{args.requests} requests, {args.concurrency} connections, "
+          f"{len(model.CROP_CONDITIONS)} crops, {os.cpu_count()} CPUs")
+    asyncio.run(bench('unbatched', server_args + ['--max-batch', '1'], bodies, args, expected))
+    asyncio.run(bench(f'batched ({args.max_batch}, {args.max_delay_ms:g} ms)',
+                      server_args + ['--max-batch', str(args.max_batch), '--max-delay-ms', str(args.max_delay_ms)],
+                      bodies, args, expected))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_index.py
+# Interval index (crop_index.py) versus the linear scan of the vectorized engine
+# (crop_engine.py) and the original Python loop, as the crop catalog grows.
+#
+# Usage: python benchmarks/bench_index.py [--sizes 60 1000 10000 30000] [--samples 300]
+
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import make_catalog, make_samples, model
+
+import crop_engine
+import crop_index
+
+def time_per_call(func, samples):
+    start = time.perf_counter()
+    for features in samples:
+        func(features)
+    return (time.perf_counter() - start) / len(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[60, 1000, 10000, 30000])
+    parser.add_argument('--samples', type=int, default=300)
+    parser.add_argument('--python-max', type=int, default=10000,
+                        help="Skip the Python loop above this many crops")
+    args = parser.parse_args()
+
+    samples = make_samples(args.samples)
+    print(f"{'crops':>8} {'build':>9} {'candidates':>11} {'python loop':>12} {'linear scan':>12} {'index':>10} {'vs scan':>8}")
+    original = model.CROP_CONDITIONS
+    try:
+        for size in args.sizes:
+            catalog = make_catalog(size)
+            engine = crop_engine.CompiledConditions(catalog)
+            start = time.perf_counter()
+            index = crop_index.IntervalIndex(engine)
+            build_time = time.perf_counter() - start
+
+            for features in samples[:20]:
+                assert np.array_equal(engine.score(features), index.score(features))
+            candidates = np.mean([len(index.query(features)[0]) for features in samples[:50]])
+
+            python_column = '-'
+            if size <= args.python_max:
+                model.CROP_CONDITIONS = catalog
+                python_time = time_per_call(model._rank_crops_python, samples[:50])
+                python_column = f"{python_time * 1e6:.0f} us"
+            scan_time = time_per_call(engine.score, samples)
+            index_time = time_per_call(index.query, samples)
+            print(f"{size:>8} {build_time:>8.2f}s {candidates:>11.0f} {python_column:>12} "
+                  f"{scan_time * 1e6:>9.0f} us {index_time * 1e6:>7.0f} us {scan_time / index_time:>7.1f}x")
+    finally:
+        model.CROP_CONDITIONS = original
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_json.py
+# Response serialization only: the previous dict + json.dumps formatting versus
+# crop_json.ResponseEncoder (same bytes) and the compact format, with the stdlib and
+# (when installed) the orjson backend. Reports encode time and bytes per response.
+#
+# Usage: python benchmarks/bench_json.py [--sizes 60 1000 10000] [--samples 200]
+
+import argparse
+import json
+import time
+
+from synthetic import make_catalog, make_samples, model
+import crop_json
+
+def dumps_dicts(crop_names, percentages, compatible, incompatible):
+    # format_ranked_crops before crop_json
+    output_data = {
+        'compatible_crops': [{'crop': crop_names[i], 'compatibility': percentages[i]} for i in compatible]
+    }
+    if incompatible is not None:
+        output_data['incompatible_crops'] = [{'crop': crop_names[i], 'compatibility': percentages[i]} for i in incompatible]
+    return json.dumps(output_data)
+
+def ranked_inputs(samples):
+    """
+    Scores and ranks every sample once, so only the encoding is timed.
+    """
+    index = model.get_index()
+    engine = index.engine
+    inputs = []
+    for features in samples:
+        percentages = index.score(features)
+        compatible, incompatible = engine.rank(percentages)
+        inputs.append((percentages.tolist(), compatible.tolist(), incompatible.tolist()))
+    return engine.crop_names, inputs
+
+def measure(encode, inputs, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total_bytes = 0
+        for percentages, compatible, incompatible in inputs:
+            total_bytes += len(encode(percentages, compatible, incompatible))
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best / len(inputs), total_bytes / len(inputs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response JSON encoding.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[60, 1000, 10000])
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    samples = make_samples(args.samples)
+    original = model.CROP_CONDITIONS
+    orjson = crop_json._orjson()
+    model.use_vectorized_engine(True)
+    try:
+        for size in args.sizes:
+            model.CROP_CONDITIONS = make_catalog(size)
+            crop_names, inputs = ranked_inputs(samples)
+            encoder = crop_json.ResponseEncoder(crop_names)
+            assert all(encoder.encode(*item) == dumps_dicts(crop_names, *item) for item in inputs)
+            modes = [
+                ('dicts + json.dumps', lambda *item: dumps_dicts(crop_names, *item), None),
+                ('ResponseEncoder', encoder.encode, None),
+                ('compact (stdlib)', encoder.encode_compact, None),
+            ]
+            if orjson is not None:
+                modes.append(('compact (orjson)', encoder.encode_compact, orjson))
+            print(f"{size} crops")
+            baseline = None
+            for label, encode, backend in modes:
+                crop_json.orjson = backend
+                seconds, payload = measure(encode, inputs)
+                baseline = baseline or seconds
+                print(f"  {label:<22} {seconds * 1e6:>9.1f} us {baseline / seconds:>6.2f}x {payload:>10.0f} bytes")
+            if orjson is None:
+                print("  compact (orjson)       skipped (orjson not installed)")
+    finally:
+        crop_json.orjson = orjson
+        model.CROP_CONDITIONS = original
+        model.use_vectorized_engine(False)
+
+if __name__ == "__main__":
+    main()
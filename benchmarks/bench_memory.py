@@ -0,0 +1,137 @@
+# benchmarks/bench_memory.py
+# Memory of the compiled crop conditions and per-request allocations, for small and
+# large catalogs.
+#
+# Resident: tracemalloc size of the CROP_CONDITIONS dicts, the CropRecords compiled from
+# them (Python scoring loop), the crop_engine arrays and the crop_index bitsets, plus the
+# process RSS once everything is built (each catalog size runs in its own process).
+#
+# Per request: tracemalloc peak (bytes allocated above the baseline while the request
+# runs) and the time of
+#   dicts + json.dumps      the previous Python path: a {'crop', 'compatibility'} dict per crop
+#   records, view only      the Python path (CropRecords), RankedCrops left unserialized
+#   records + to_json       the same, serialized (get_suitable_crops for small catalogs)
+#   engine, view only       rank_crops() through the vectorized engine and index
+#   engine + to_json        get_suitable_crops() through the vectorized engine and index
+#
+# Usage: python benchmarks/bench_memory.py [--sizes 60 10000] [--samples 20]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from synthetic import make_catalog, make_samples, model
+
+def rss_mb():
+    """
+    Current resident set size in MB (Linux), or the peak where /proc is not available.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def legacy_get_suitable_crops(features_dict):
+    # get_suitable_crops before the CropRecords / RankedCrops rewrite (Python path)
+    conditions = model.CROP_CONDITIONS
+    all_crops_data = [{'crop': name, 'compatibility': model.calculate_compatibility(name, features_dict, conditions)}
+                      for name in conditions]
+    compatible_crops = [item for item in all_crops_data if item['compatibility'] > 0]
+    incompatible_crops = [item for item in all_crops_data if item['compatibility'] <= 0]
+    compatible_crops.sort(key=lambda x: x['compatibility'], reverse=True)
+    incompatible_crops.sort(key=lambda x: x['crop'])
+    return json.dumps({'compatible_crops': compatible_crops, 'incompatible_crops': incompatible_crops})
+
+def traced_size(build):
+    """
+    Returns (result of build(), bytes it allocated and kept).
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+def request_cost(function, samples):
+    """
+    Mean tracemalloc peak (bytes above the baseline) and mean seconds per request.
+    """
+    function(samples[0]) # Warm caches (compiled tables, encoder) outside the measurement
+    peaks = []
+    tracemalloc.start()
+    for features in samples:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = function(features)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        del result
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for features in samples:
+        function(features)
+    return sum(peaks) / len(peaks), (time.perf_counter() - start) / len(samples)
+
+def measure(size, num_samples):
+    import crop_engine, crop_index
+    # Pay the module imports and NumPy's lazy initialization outside the traced builds
+    crop_index.IntervalIndex(crop_engine.CompiledConditions(make_catalog(2)))
+    samples = make_samples(num_samples)
+    catalog, conditions_bytes = traced_size(lambda: make_catalog(size))
+    model.CROP_CONDITIONS = catalog
+    model.reset_engine()
+    _, records_bytes = traced_size(model.get_records)
+    _, engine_bytes = traced_size(model.get_engine)
+    _, index_bytes = traced_size(model.get_index)
+    result = {
+        'crops': size,
+        'resident': {'conditions dicts': conditions_bytes, 'CropRecords': records_bytes,
+                     'engine arrays': engine_bytes, 'index bitsets': index_bytes},
+        'rss_mb': rss_mb(),
+        'requests': {},
+    }
+    modes = [
+        ('dicts + json.dumps', False, legacy_get_suitable_crops),
+        ('records, view only', False, model._rank_crops_python),
+        ('records + to_json', False, lambda features: model._rank_crops_python(features).to_json()),
+        ('engine, view only', True, model.rank_crops),
+        ('engine + to_json', True, model.get_suitable_crops),
+    ]
+    for label, vectorized, function in modes:
+        model.use_vectorized_engine(vectorized)
+        result['requests'][label] = request_cost(function, samples)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory of compiled conditions and per-request allocations.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[60, 10000])
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--child', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(measure(args.child, args.samples)))
+        return
+
+    for size in args.sizes:
+        # A fresh process per size, so the RSS figures do not include the other catalogs
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(size),
+                                 '--samples', str(args.samples)], check=True, capture_output=True, text=True).stdout
+        result = json.loads(output)
+        print(f"{size} crops (process RSS {result['rss_mb']:.1f} MB)")
+        for label, size_bytes in result['resident'].items():
+            print(f"  {label:<22} {size_bytes / 1024:>10.1f} KB resident")
+        for label, (peak, seconds) in result['requests'].items():
+            print(f"  {label:<22} {peak / 1024:>10.1f} KB peak per request {seconds * 1e6:>10.0f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_ml.py
+# ML inference latency at different batch sizes:
+#   - the old path: a one-row pandas DataFrame per sample through pipeline.predict_proba
+#   - the pickled pipeline's classifier on the precomputed one-hot encoding (crop_ml.MLScorer)
+#   - the NumPy array export (crop_forest.ForestModel through crop_ml.MLScorer)
+#
+# Usage: python benchmarks/bench_ml.py [--sizes 1 64 4096] [--repeat 5]
+
+import argparse
+import os
+import time
+
+from synthetic import ROOT, make_samples, model
+
+import crop_forest
+import crop_ml
+
+def best_of(repeat, function):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 64, 4096])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    import pandas as pd
+    pipeline = model.load_ml_pipeline(os.path.join(ROOT, 'crop_model.pkl'))
+    if pipeline is None:
+        raise SystemExit("crop_model.pkl not found; run generate_crop_model.py first")
+    scorers = [('pipeline classifier, precomputed encoding', crop_ml.MLScorer.from_pipeline(pipeline))]
+    forest_dir = os.path.join(ROOT, crop_forest.DEFAULT_FOREST_DIR)
+    if os.path.isdir(forest_dir):
+        scorers.append(('array export (ForestModel)', crop_ml.MLScorer.from_forest(crop_forest.ForestModel(forest_dir))))
+
+    print(f"{'batch':>6}  {'method':<42} {'total ms':>10} {'us/sample':>10}")
+    for size in args.sizes:
+        samples = make_samples(size)
+        def per_row_dataframes():
+            for features in samples:
+                pipeline.predict_proba(pd.DataFrame([features]))
+        # The old path is far slower; time it once for big batches
+        runs = [('per-row DataFrame (old)', per_row_dataframes, 1 if size > 64 else args.repeat)]
+        runs += [(label, lambda scorer=scorer: scorer.predict_proba(samples), args.repeat) for label, scorer in scorers]
+        for label, function, repeat in runs:
+            seconds = best_of(repeat, function)
+            print(f"{size:>6}  {label:<42} {seconds * 1e3:>10.2f} {seconds / size * 1e6:>10.1f}")
+
+if __name__ == "__main__":
+    main()
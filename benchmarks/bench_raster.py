@@ -0,0 +1,114 @@
+# benchmarks/bench_raster.py
+# Raster scoring (crop_raster.py): cells/s and peak memory for a synthetic grid, with the
+# best-crop map only and with the full score cube, per worker count.
+#
+# The grids are written to a temporary directory: float32 numerical layers drawn around
+# CROP_CONDITIONS (about 1% NaN cells) and uint8 category codes (255 = no data). Before
+# timing, --check random cells are compared with get_suitable_crops.
+# Each run is a separate "python model.py --raster" process, so the peak RSS is its own
+# (grids are generated and checked in child processes too: Linux carries the peak RSS of
+# a parent over exec).
+# With --cube the peak also counts the page cache mapped for each crop plane being written
+# (shared, reclaimable file pages).
+#
+# Usage: python benchmarks/bench_raster.py [--size 2000] [--workers 1 4] [--check 200]
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from synthetic import ROOT, CLIMATES, SOIL_TYPES, TOPOGRAPHIES, WATER_LEVELS, model
+
+import crop_raster
+
+CATEGORY_VALUES = {'Climate': CLIMATES, 'Soil_Type': SOIL_TYPES,
+                   'Topography': TOPOGRAPHIES, 'Water_Availability': WATER_LEVELS}
+
+def write_grids(directory, size, seed=0):
+    """
+    Writes size x size synthetic feature grids and categories.json to directory.
+    """
+    rng = np.random.default_rng(seed)
+    conditions = list(model.CROP_CONDITIONS.values())
+    # Each cell draws its values around the ranges of one crop, as synthetic.make_samples does
+    preferred = rng.integers(len(conditions), size=(size, size))
+    for key in model.NUMERICAL_FEATURES:
+        low = np.array([c[key][0] for c in conditions])[preferred]
+        high = np.array([c[key][1] for c in conditions])[preferred]
+        margin = (high - low) * 0.5 + 1
+        grid = (low - margin + rng.random((size, size)) * (high - low + 2 * margin)).astype(np.float32)
+        grid[rng.random((size, size)) < 0.01] = np.nan
+        np.save(os.path.join(directory, key.lower() + '.npy'), grid)
+    for key, values in CATEGORY_VALUES.items():
+        grid = rng.integers(len(values), size=(size, size)).astype(np.uint8)
+        grid[rng.random((size, size)) < 0.01] = 255
+        np.save(os.path.join(directory, key.lower() + '.npy'), grid)
+    with open(os.path.join(directory, crop_raster.CATEGORIES_FILE), 'w') as f:
+        json.dump(CATEGORY_VALUES, f)
+
+def check_cells(input_dir, output_dir, cells, seed=1):
+    """
+    Compares random cells of the outputs with get_suitable_crops.
+    """
+    grids = {key: np.load(path, mmap_mode='r') for key, path in crop_raster.find_grids(input_dir).items()}
+    best_crop = np.load(os.path.join(output_dir, 'best_crop.npy'), mmap_mode='r')
+    best_score = np.load(os.path.join(output_dir, 'best_score.npy'), mmap_mode='r')
+    crop_names = json.load(open(os.path.join(output_dir, 'crops.json')))['crops']
+    rng = random.Random(seed)
+    rows, cols = best_crop.shape
+    for _ in range(cells):
+        row, col = rng.randrange(rows), rng.randrange(cols)
+        features = {}
+        for key, grid in grids.items():
+            value = grid[row, col]
+            if key in CATEGORY_VALUES:
+                if value < len(CATEGORY_VALUES[key]):
+                    features[key] = CATEGORY_VALUES[key][value]
+            elif not np.isnan(value):
+                features[key] = float(value)
+        compatible = json.loads(model.get_suitable_crops(features))['compatible_crops']
+        expected = (crop_names.index(compatible[0]['crop']), int(compatible[0]['compatibility'] + 0.5)) \
+            if compatible else (crop_raster.NO_CROP, 0)
+        assert (int(best_crop[row, col]), int(best_score[row, col])) == expected, (row, col, features)
+
+def run(input_dir, output_dir, workers, cube):
+    command = [sys.executable, os.path.join(ROOT, 'model.py'), '--raster', input_dir, '--output', output_dir,
+               '--workers', str(workers)] + (['--cube'] if cube else [])
+    result = subprocess.run(command, cwd=ROOT, check=True, capture_output=True, text=True)
+    return result.stderr.strip()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark raster scoring over memory-mapped grids.")
+    parser.add_argument('--size', type=int, default=2000, help="Grid rows and columns (default: 2000)")
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument('--check', type=int, default=200, help="Cells compared with get_suitable_crops")
+    parser.add_argument('--write-grids', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--check-output', nargs=2, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.write_grids:
+        write_grids(args.write_grids, args.size)
+        return
+    if args.check_output:
+        check_cells(*args.check_output, args.check)
+        return
+    input_dir = tempfile.mkdtemp()
+    output_dir = tempfile.mkdtemp()
+    script = [sys.executable, os.path.abspath(__file__), '--size', str(args.size), '--check', str(args.check)]
+    subprocess.run(script + ['--write-grids', input_dir], check=True)
+    print(f"{args.size} x {args.size} grid, {len(model.CROP_CONDITIONS)} crops, {os.cpu_count()} CPUs")
+    run(input_dir, output_dir, 1, False)
+    subprocess.run(script + ['--check-output', input_dir, output_dir], check=True)
+    for cube in (False, True):
+        for workers in args.workers:
+            label = f"{'cube' if cube else 'best crop'}, {workers} worker{'s' if workers > 1 else ''}"
+            print(f"  {label:<22} {run(input_dir, output_dir, workers, cube)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_sensitivity.py
+# What-if sweeps: re-running get_suitable_crops once per slider value (the current way,
+# through the vectorized engine and index) versus crop_sensitivity.Sensitivity, which
+# reuses the base input's match vectors and scores the whole sweep in one pass.
+#
+#   per value             get_suitable_crops for every value of the sweep
+#   Sensitivity.sweep     percentages of every crop over the sweep (base vectors included)
+#   analyze + JSON        the full report (levels, breakpoints, unaffected crops), serialized
+#                         with crop_json.dumps (orjson when installed), as the CLI prints it
+#
+# One-feature sweeps have --values values of pH; two-feature sweeps are pH x Rainfall with
+# --values2 values each. Sweep results are checked against the per-value scores.
+#
+# Usage: python benchmarks/bench_sensitivity.py [--sizes 60 1000 10000] [--values 100] [--values2 30]
+
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import make_catalog, make_samples, model
+
+import crop_json
+import crop_sensitivity
+
+def best_time(function, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sensitivity sweeps against per-value scoring.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[60, 1000, 10000])
+    parser.add_argument('--values', type=int, default=100, help="Values in a one-feature sweep (default: 100)")
+    parser.add_argument('--values2', type=int, default=30, help="Values per feature in a two-feature sweep")
+    args = parser.parse_args()
+
+    base = make_samples(1)[0]
+    ph = np.linspace(3.5, 9.5, args.values).tolist()
+    ph2 = np.linspace(3.5, 9.5, args.values2).tolist()
+    rainfall2 = np.linspace(0, 3000, args.values2).tolist()
+    model.use_vectorized_engine(True)
+    for size in args.sizes:
+        model.CROP_CONDITIONS = make_catalog(size)
+        engine = model.get_index().engine
+        sensitivity = crop_sensitivity.Sensitivity(base, engine)
+        assert all(np.array_equal(row, engine.score({**base, 'pH': v})) for v, row in zip(ph, sensitivity.sweep('pH', ph)))
+
+        print(f"{size} crops")
+        sweeps = [
+            (f'pH x {args.values}', [{**base, 'pH': v} for v in ph], ('pH', ph)),
+            (f'pH x Rainfall {args.values2}x{args.values2}',
+             [{**base, 'pH': a, 'Rainfall': b} for a in ph2 for b in rainfall2], ('pH', ph2, 'Rainfall', rainfall2)),
+        ]
+        for label, inputs, sweep in sweeps:
+            per_value = best_time(lambda: [model.get_suitable_crops(features) for features in inputs], repeat=3)
+            vectors = best_time(lambda: crop_sensitivity.Sensitivity(base, engine).sweep(*sweep))
+            report = best_time(lambda: crop_json.dumps(crop_sensitivity.analyze(base, *sweep)))
+            print(f"  {label:<26} per value {per_value * 1e3:9.2f} ms   "
+                  f"Sensitivity.sweep {vectors * 1e3:8.2f} ms ({per_value / vectors:6.1f}x)   "
+                  f"analyze + JSON {report * 1e3:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
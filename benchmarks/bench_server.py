@@ -0,0 +1,85 @@
+# benchmarks/bench_server.py
+# Compares requests/sec of the scoring daemon (python model.py --serve) against the
+# original spawn-per-call path (python model.py <10 features>).
+#
+# Usage: python benchmarks/bench_server.py [--requests 200] [--spawn-requests 20] [--clients 4]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import crop_server
+
+SAMPLE = ['75', '45', '40', 'Tropical', '80', '6.5', '200', 'Clayey', 'Flat', 'High']
+
+def bench_spawn(n):
+    start = time.perf_counter()
+    for _ in range(n):
+        subprocess.run([sys.executable, os.path.join(ROOT, 'model.py')] + SAMPLE,
+                       check=True, capture_output=True, cwd=ROOT)
+    return n / (time.perf_counter() - start)
+
+def bench_daemon(n, clients, socket_path):
+    per_client = max(1, n // clients)
+
+    def worker():
+        for _ in range(per_client):
+            crop_server.request_recommendation(SAMPLE, socket_path=socket_path)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return per_client * clients / (time.perf_counter() - start)
+
+def wait_for_socket(path, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if os.path.exists(path):
+            try:
+                crop_server.request_recommendation(SAMPLE, socket_path=path)
+                return
+            except OSError:
+                pass
+        time.sleep(0.05)
+    raise RuntimeError("scoring daemon did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--spawn-requests', type=int, default=20)
+    parser.add_argument('--clients', type=int, default=4)
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.mkdtemp(), 'crop_model.sock')
+    daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, 'model.py'), '--serve', '--socket', socket_path],
+                              cwd=ROOT, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_socket(socket_path)
+        # Results must match the CLI byte for byte
+        cli = subprocess.run([sys.executable, os.path.join(ROOT, 'model.py')] + SAMPLE,
+                             check=True, capture_output=True, text=True, cwd=ROOT).stdout.strip()
+        assert crop_server.request_recommendation(SAMPLE, socket_path=socket_path) == cli
+
+        spawn_rps = bench_spawn(args.spawn_requests)
+        serial_rps = bench_daemon(args.requests, 1, socket_path)
+        concurrent_rps = bench_daemon(args.requests, args.clients, socket_path)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    print(f"spawn per call      : {spawn_rps:10.1f} req/s")
+    print(f"daemon, 1 client    : {serial_rps:10.1f} req/s  ({serial_rps / spawn_rps:.1f}x)")
+    print(f"daemon, {args.clients} clients   : {concurrent_rps:10.1f} req/s  ({concurrent_rps / spawn_rps:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# benchmarks/bench_topk.py
+# Full get_suitable_crops output versus top-K mode (with and without the incompatible
+# list): latency and JSON payload size as the crop catalog grows.
+#
+# Usage: python benchmarks/bench_topk.py [--sizes 60 1000 10000] [--k 5] [--samples 200]
+
+import argparse
+import time
+
+from synthetic import make_catalog, make_samples, model
+
+def measure(samples, **options):
+    start = time.perf_counter()
+    total_bytes = 0
+    for features in samples:
+        total_bytes += len(model.get_suitable_crops(features, **options))
+    return (time.perf_counter() - start) / len(samples), total_bytes / len(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[60, 1000, 10000])
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    samples = make_samples(args.samples)
+    modes = [
+        ('full', {}),
+        (f'top {args.k}', {'top_k': args.k}),
+        (f'top {args.k}, no incompatible', {'top_k': args.k, 'include_incompatible': False}),
+    ]
+    original = model.CROP_CONDITIONS
+    model.use_vectorized_engine(True)
+    try:
+        for size in args.sizes:
+            model.CROP_CONDITIONS = make_catalog(size)
+            model.get_index() # Build outside the timed region
+            print(f"{size} crops")
+            for label, options in modes:
+                seconds, payload = measure(samples, **options)
+                print(f"  {label:<28} {seconds * 1e6:>9.0f} us {payload:>10.0f} bytes")
+    finally:
+        model.CROP_CONDITIONS = original
+        model.use_vectorized_engine(False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_workers.py
+# Scaling of python model.py --batch ... --workers N for N = 1, 2, 4, 8, 16.
+# Writes a synthetic CSV, scores it with each worker count, checks the output is
+# identical to the single-process run and reports rows/sec and speedup.
+#
+# Usage: python benchmarks/bench_workers.py [--rows 100000] [--workers 1 2 4 8 16]
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import tempfile
+
+from synthetic import make_samples, model
+
+import crop_batch
+
+def write_csv(path, num_rows):
+    samples = make_samples(min(num_rows, 10000))
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(model.FEATURE_NAMES)
+        for i in range(num_rows):
+            features = samples[i % len(samples)]
+            writer.writerow([features[key] for key in model.FEATURE_NAMES])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'samples.csv')
+    write_csv(path, args.rows)
+    print(f"{args.rows} rows, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'rows/s':>10} {'speedup':>8} {'peak RSS':>10}")
+
+    baseline_rate = None
+    baseline_digest = None
+    for workers in args.workers:
+        output = io.StringIO()
+        stats = crop_batch.score_file(path, output, workers=workers)
+        digest = hashlib.sha256(output.getvalue().encode('utf-8')).hexdigest()
+        if baseline_digest is None:
+            baseline_rate, baseline_digest = stats['rows_per_sec'], digest
+        elif digest != baseline_digest:
+            raise SystemExit(f"output with {workers} workers differs from the first run")
+        peak = f"{stats['peak_rss_mb']:.0f} MB" if stats['peak_rss_mb'] is not None else 'n/a'
+        print(f"{workers:>8} {stats['rows_per_sec']:>10.0f} {stats['rows_per_sec'] / baseline_rate:>7.2f}x {peak:>10}")
+
+if __name__ == "__main__":
+    main()
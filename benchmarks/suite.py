@@ -0,0 +1,259 @@
+# benchmarks/suite.py
+# Benchmark suite for the recommendation hot paths, with saved results and a baseline.
+#
+# Every benchmark is timed like timeit: the number of calls per measurement is chosen so a
+# measurement takes at least --min-time seconds, and the best/median/mean over --repeat
+# measurements are reported per call. Inputs are synthetic (synthetic.py, drawn from
+# CROP_CONDITIONS), so runs are reproducible.
+#
+#   calculate_compatibility    one sample against every crop, calculate_compatibility per crop
+#   get_suitable_crops         full result including json.dumps (Python path, as the CLI runs it)
+#   get_suitable_crops_engine  same, through the vectorized engine and interval index (daemon path)
+#   cli_cold_start             python model.py <10 features> in a new process
+#   pickle_load_cold           unpickling crop_model.pkl in a new process (includes sklearn imports)
+#   pickle_load_warm           unpickling crop_model.pkl again in this process
+#   forest_load                opening the crop_model_forest array export
+#   train                      SampleGenerator + pipeline fit from generate_crop_model.py
+#
+# Usage: python benchmarks/suite.py [-k PATTERN] [--quick] [--output results.json]
+#                                   [--compare baseline.json] [--save-baseline] [--threshold 0.2]
+#
+# --compare prints each result against the baseline (median ratio) and exits with status 1
+# if any benchmark got slower than 1 + threshold. --save-baseline writes the results to
+# benchmarks/baseline.json. Timings are machine specific, so the baseline is not checked
+# in (it is gitignored): save one on the machine the comparisons run on, e.g. from the
+# commit before a change, then --compare after it.
+
+import argparse
+import datetime
+import json
+import os
+import pickle
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import timeit
+
+from synthetic import ROOT, make_samples, model
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+MODEL_PATH = os.path.join(ROOT, 'crop_model.pkl')
+FOREST_DIR = os.path.join(ROOT, 'crop_model_forest')
+SAMPLE_ARGS = ['75', '45', '40', 'Tropical', '80', '6.5', '200', 'Clayey', 'Flat', 'High']
+
+BENCHMARKS = []
+
+def benchmark(name, description, repeat=7, subprocess_run=False):
+    """
+    Registers a setup function that returns the callable to time (or None to skip).
+    Process-spawning benchmarks (subprocess_run) are repeated less.
+    """
+    def register(setup):
+        BENCHMARKS.append({'name': name, 'description': description, 'setup': setup,
+                           'repeat': repeat, 'subprocess': subprocess_run})
+        return setup
+    return register
+
+class Cycle:
+    """
+    Calls function with the next input on every call, so repeated calls do not
+    measure a single (cache-friendly) input.
+    """
+
+    def __init__(self, function, inputs):
+        self.function = function
+        self.inputs = inputs
+        self.position = 0
+
+    def __call__(self):
+        value = self.inputs[self.position]
+        self.position = (self.position + 1) % len(self.inputs)
+        return self.function(value)
+
+@benchmark('calculate_compatibility', "One sample scored against every crop with calculate_compatibility")
+def setup_calculate_compatibility(args):
+    model.use_vectorized_engine(False)
+    crop_names = list(model.CROP_CONDITIONS)
+    def score_all(features):
+        for crop_name in crop_names:
+            model.calculate_compatibility(crop_name, features)
+    return Cycle(score_all, make_samples(args.samples))
+
+@benchmark('get_suitable_crops', "get_suitable_crops + json.dumps, Python path (CLI)")
+def setup_get_suitable_crops(args):
+    model.use_vectorized_engine(False)
+    return Cycle(model.get_suitable_crops, make_samples(args.samples))
+
+@benchmark('get_suitable_crops_engine', "get_suitable_crops + json.dumps, vectorized engine + index (daemon)")
+def setup_get_suitable_crops_engine(args):
+    model.use_vectorized_engine(True)
+    model.get_index() # Build outside the timed region
+    return Cycle(model.get_suitable_crops, make_samples(args.samples))
+
+@benchmark('cli_cold_start', "python model.py <10 features> in a new process", repeat=5, subprocess_run=True)
+def setup_cli_cold_start(args):
+    command = [sys.executable, os.path.join(ROOT, 'model.py')] + SAMPLE_ARGS
+    return lambda: subprocess.run(command, check=True, capture_output=True, cwd=ROOT)
+
+@benchmark('pickle_load_cold', "Unpickle crop_model.pkl in a new process", repeat=3, subprocess_run=True)
+def setup_pickle_load_cold(args):
+    if not os.path.exists(MODEL_PATH):
+        return None
+    command = [sys.executable, '-c', f"import pickle; pickle.load(open({MODEL_PATH!r}, 'rb'))"]
+    return lambda: subprocess.run(command, check=True, capture_output=True, cwd=ROOT)
+
+@benchmark('pickle_load_warm', "Unpickle crop_model.pkl with sklearn already imported")
+def setup_pickle_load_warm(args):
+    if not os.path.exists(MODEL_PATH):
+        return None
+    with open(MODEL_PATH, 'rb') as f:
+        data = f.read()
+    pickle.loads(data) # Pay the imports outside the timed region
+    return lambda: pickle.loads(data)
+
+@benchmark('forest_load', "Open the crop_model_forest array export (memory-mapped)")
+def setup_forest_load(args):
+    if not os.path.isdir(FOREST_DIR):
+        return None
+    import crop_forest
+    return lambda: crop_forest.ForestModel(FOREST_DIR)
+
+@benchmark('train', "Generate samples and fit the generate_crop_model.py pipeline", repeat=3)
+def setup_train(args):
+    import generate_crop_model
+    def train():
+        df = generate_crop_model.SampleGenerator().generate(args.train_samples)
+        pipeline = generate_crop_model.build_pipeline(n_jobs=args.n_jobs)
+        pipeline.fit(df[generate_crop_model.FEATURE_COLUMNS], df[generate_crop_model.TARGET_COLUMN].astype(str))
+    return train
+
+def measure(function, repeat, min_time):
+    """
+    Returns per-call timings (seconds) of repeat measurements, each running
+    function often enough to take at least min_time.
+    """
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2 if number < 4 else 4
+    return [seconds / number for seconds in timer.repeat(repeat, number)], number
+
+def summarize(timings, number):
+    return {
+        'unit': 's',
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'repeat': len(timings),
+        'number': number,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(args):
+    results = {}
+    for case in BENCHMARKS:
+        if args.k and not re.search(args.k, case['name']):
+            continue
+        function = case['setup'](args)
+        if function is None:
+            print(f"{case['name']:<28} skipped (model file missing)")
+            continue
+        repeat = 2 if args.quick else case['repeat']
+        min_time = 0.0 if case['subprocess'] else (0.05 if args.quick else args.min_time)
+        timings, number = measure(function, repeat, min_time)
+        results[case['name']] = dict(summarize(timings, number), description=case['description'])
+        print(f"{case['name']:<28} {format_seconds(results[case['name']]['median']):>10}  "
+              f"(min {format_seconds(results[case['name']]['min'])}, {repeat} x {number})")
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'samples': args.samples,
+            'train_samples': args.train_samples,
+        },
+        'results': results,
+    }
+
+def format_seconds(seconds):
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+def compare(current, baseline, threshold):
+    """
+    Prints current medians against the baseline. Returns the names of benchmarks that
+    got slower than 1 + threshold times the baseline.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<28} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<28} {'-':>10} {format_seconds(result['median']):>10}     new")
+            continue
+        ratio = result['median'] / base['median']
+        status = ''
+        if ratio > 1 + threshold:
+            status = 'SLOWER'
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            status = 'faster'
+        print(f"{name:<28} {format_seconds(base['median']):>10} {format_seconds(result['median']):>10} "
+              f"{ratio:>6.2f}x {status}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the recommendation benchmark suite.")
+    parser.add_argument('-k', default=None, help="Only run benchmarks whose name matches this regex")
+    parser.add_argument('--quick', action='store_true', help="Fewer, shorter measurements")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Minimum seconds per measurement (default: 0.2)")
+    parser.add_argument('--samples', type=int, default=200, help="Synthetic samples cycled through (default: 200)")
+    parser.add_argument('--train-samples', type=int, default=2000, help="Samples for the train benchmark (default: 2000)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Training cores (default: -1, all)")
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file")
+    parser.add_argument('--compare', nargs='?', const=BASELINE_PATH, default=None, metavar='BASELINE',
+                        help="Compare against a baseline JSON file (default: benchmarks/baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="Write the results to benchmarks/baseline.json")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown reported as a regression (default: 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    current = run_suite(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+            f.write('\n')
+        print(f"Baseline saved to {BASELINE_PATH}")
+    if args.compare:
+        try:
+            with open(args.compare, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"\nNo baseline at {args.compare}: run with --save-baseline on this machine first")
+            return 1
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# benchmarks/synthetic.py
+# Synthetic inputs for the benchmarks, generated from model.CROP_CONDITIONS.
+
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import model
+
+CLIMATES = ['Tropical', 'Temperate', 'Arid']
+SOIL_TYPES = ['Clayey', 'Loamy', 'Sandy', 'Silty', 'Peaty']
+TOPOGRAPHIES = ['Flat', 'Sloped', 'Hilly']
+WATER_LEVELS = ['Low', 'Medium', 'High']
+
+def make_catalog(num_crops, seed=42):
+    """
+    Returns a crop conditions table with num_crops entries: the real CROP_CONDITIONS
+    followed by "varieties" whose ranges are jittered copies of the real crops.
+    """
+    rng = random.Random(seed)
+    base_names = list(model.CROP_CONDITIONS.keys())
+    catalog = {}
+    for i in range(num_crops):
+        base_name = base_names[i % len(base_names)]
+        preferred = dict(model.CROP_CONDITIONS[base_name])
+        if i >= len(base_names):
+            for key in model.NUMERICAL_FEATURES:
+                if preferred.get(key) is not None:
+                    low, high = preferred[key]
+                    shift = (high - low) * rng.uniform(-0.3, 0.3)
+                    preferred[key] = (round(low + shift, 1), round(high + shift, 1))
+            base_name = f"{base_name} (variety {i // len(base_names)})"
+        catalog[base_name] = preferred
+    return catalog
+
+def make_samples(num_samples, seed=0):
+    """
+    Returns num_samples feature dicts drawn around the ranges in CROP_CONDITIONS.
+    """
+    rng = random.Random(seed)
+    conditions = list(model.CROP_CONDITIONS.values())
+    samples = []
+    for _ in range(num_samples):
+        preferred = rng.choice(conditions)
+        features = {}
+        for key in model.NUMERICAL_FEATURES:
+            low, high = preferred[key]
+            margin = (high - low) * 0.5 + 1
+            features[key] = round(rng.uniform(low - margin, high + margin), 1)
+        features['Climate'] = rng.choice(CLIMATES)
+        features['Soil_Type'] = rng.choice(SOIL_TYPES)
+        features['Topography'] = rng.choice(TOPOGRAPHIES)
+        features['Water_Availability'] = rng.choice(WATER_LEVELS)
+        samples.append(features)
+    return samples
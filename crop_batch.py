@@ -0,0 +1,265 @@
+# crop_batch.py
+# Bulk scoring of soil samples: python model.py --batch input.csv|input.jsonl
+#
+# Each input row holds the ten features (same names as model.FEATURE_NAMES; CSV headers
+# are matched case-insensitively, so the lower-case columns of the predictions table work too).
+# Rows are read in fixed-size chunks; each chunk is scored against every crop in one
+# vectorized pass (model.score_batch) and its results are written before the next chunk
+# is read, so peak memory stays constant no matter how large the input file is.
+# Output is JSONL: line i is exactly the JSON "python model.py ..." prints for row i.
+#
+# With --workers N the chunks are scored (and serialized) by a pool of N processes.
+# Each worker compiles CROP_CONDITIONS once, and results are written back in input
+# order, so the output is identical to a single-process run.
+
+import argparse
+import collections
+import contextlib
+import csv
+import itertools
+import json
+import sys
+import time
+
+import crop_metrics
+import model
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson', '.json')
+DEFAULT_CHUNK_SIZE = 10000
+# Smaller chunks when using workers: a chunk's serialized results travel back to the
+# parent in one piece, and up to 2 chunks per worker are in flight at any time.
+PARALLEL_CHUNK_SIZE = 2000
+_NOT_PROFILED = contextlib.nullcontext()
+
+_FEATURE_KEYS = {name.lower(): name for name in model.FEATURE_NAMES}
+
+def _feature_key(field):
+    """
+    The FEATURE_NAMES entry a column name stands for, ignoring case, or None.
+    """
+    return _FEATURE_KEYS.get(field.strip().lower()) if isinstance(field, str) else None
+
+def _parse_value(key, value):
+    # An empty cell is a missing feature; the scorer itself only treats None as missing
+    if value is None or value == '':
+        return None
+    if key in model.NUMERICAL_FEATURES:
+        return float(value)
+    return str(value)
+
+def _parse_row(row, key_map, line_number):
+    record = {}
+    for field, value in row.items():
+        key = key_map.get(field)
+        if key is not None:
+            try:
+                record[key] = _parse_value(key, value)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"line {line_number}: All numerical inputs must be valid numbers. {e}")
+    return record
+
+def iter_records(path):
+    """
+    Yields one features dict per row of a CSV or JSONL file. Each JSONL row may use its
+    own set of keys.
+    Raises ValueError naming the line for a numerical value that is not a valid number,
+    or a JSONL line that is not a JSON object.
+    """
+    if path.lower().endswith(JSONL_EXTENSIONS):
+        with open(path, encoding='utf-8') as f:
+            key_map = {} # Every key seen so far, so each spelling is normalized once
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"line {line_number}: Invalid JSON: {e}")
+                if not isinstance(row, dict):
+                    raise ValueError(f"line {line_number}: Expected a JSON object, got {type(row).__name__}")
+                for field in row:
+                    if field not in key_map:
+                        key_map[field] = _feature_key(field)
+                yield _parse_row(row, key_map, line_number)
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            key_map = {field: _feature_key(field) for field in reader.fieldnames or []}
+            for row in reader:
+                yield _parse_row(row, key_map, reader.line_num)
+
+def read_columns(records):
+    """
+    Collects feature dicts into the column layout accepted by model.score_batch.
+    """
+    columns = {key: [] for key in model.FEATURE_NAMES}
+    for record in records:
+        for key in model.FEATURE_NAMES:
+            columns[key].append(record.get(key))
+    return columns
+
+def iter_chunks(records, chunk_size):
+    """
+    Groups a record iterator into column chunks of at most chunk_size rows.
+    """
+    records = iter(records)
+    while True:
+        columns = read_columns(itertools.islice(records, chunk_size))
+        if not columns[model.FEATURE_NAMES[0]]:
+            return
+        yield columns
+
+def _init_worker(ml_weight=0.0):
+    """
+    Process pool initializer: compiles CROP_CONDITIONS (and loads the ML model when
+    blending) once per worker process instead of once per chunk. The array export of
+    the model is memory-mapped, so all workers share its class probability table.
+    """
+    model.use_vectorized_engine(True)
+    model.load_conditions_file() # CROP_CONDITIONS_FILE, for start methods that do not fork
+    model.get_engine()
+    if ml_weight:
+        model.get_ml_scorer()
+
+def _score_chunk(columns, top_k=None, include_incompatible=True, ml_weight=0.0, compact=False, graded=None):
+    """
+    Scores one chunk and returns (rows, serialized JSONL text). Runs in a worker.
+    """
+    percentages = model.score_blended(columns, ml_weight, graded)
+    results = model.iter_batch_results(percentages, top_k, include_incompatible, compact)
+    return len(percentages), ''.join(line + '\n' for line in results)
+
+def iter_parallel_chunks(chunks, workers, top_k=None, include_incompatible=True, ml_weight=0.0, compact=False,
+                         graded=None):
+    """
+    Scores chunks on a pool of worker processes and yields (rows, JSONL text) in input order.
+    At most 2 chunks per worker are queued, so memory stays bounded for large files.
+    """
+    import multiprocessing
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(ml_weight,)) as pool:
+        pending = collections.deque()
+        for columns in chunks:
+            pending.append(pool.apply_async(_score_chunk, (columns, top_k, include_incompatible, ml_weight, compact,
+                                                           graded)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+def score_file(path, output, chunk_size=None, workers=1, top_k=None, include_incompatible=True, ml_weight=0.0,
+               compact=False, graded=None):
+    """
+    Streams path through the scorer chunk by chunk, writing one JSON result per line
+    to output. With workers > 1 chunks are scored on a process pool.
+    top_k, include_incompatible and compact are passed on to model.iter_batch_results;
+    ml_weight > 0 blends in the ML model's probabilities (model.score_blended);
+    graded is an optional crop_engine.GradedScoring (see model.graded_scoring).
+    Returns a stats dict with rows, seconds, rows_per_sec and peak_rss_mb.
+    """
+    start = time.perf_counter()
+    num_rows = 0
+    # With --metrics: read / scoring / serialization stages per chunk; with workers the
+    # parent only sees reading plus waiting for results ('workers') and 'output'
+    m = model.metrics
+    t = start
+    if workers > 1:
+        chunks = iter_chunks(iter_records(path), chunk_size or PARALLEL_CHUNK_SIZE)
+        for rows, text in iter_parallel_chunks(chunks, workers, top_k, include_incompatible, ml_weight, compact,
+                                                   graded):
+            if m is not None:
+                t = m.lap('workers', t)
+            output.write(text)
+            num_rows += rows
+            if m is not None:
+                t = m.lap('output', t)
+                m.incr('rows', rows)
+    else:
+        for columns in iter_chunks(iter_records(path), chunk_size or DEFAULT_CHUNK_SIZE):
+            if m is not None:
+                t = m.lap('read', t)
+            # With --profile, 1 in N chunks is profiled (scoring and serialization)
+            with model.profiler.sample() if model.profiler is not None else _NOT_PROFILED:
+                percentages = model.score_blended(columns, ml_weight, graded)
+                if m is not None:
+                    t = m.lap('scoring', t)
+                for line in model.iter_batch_results(percentages, top_k, include_incompatible, compact):
+                    output.write(line)
+                    output.write('\n')
+            num_rows += len(percentages)
+            if m is not None:
+                t = m.lap('serialization', t)
+                m.incr('rows', len(percentages))
+                m.incr('crops_scored', percentages.size)
+    seconds = time.perf_counter() - start
+    return {
+        'rows': num_rows,
+        'seconds': seconds,
+        'rows_per_sec': num_rows / seconds if seconds > 0 else 0.0,
+        'peak_rss_mb': crop_metrics.peak_rss_mb(),
+    }
+
+def format_stats(stats):
+    report = f"Scored {stats['rows']} samples in {stats['seconds']:.2f} s ({stats['rows_per_sec']:.0f} rows/s)"
+    if stats['peak_rss_mb'] is not None:
+        report += f", peak RSS {stats['peak_rss_mb']:.1f} MB"
+    return report
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='model.py', description="Score a CSV/JSONL file of soil samples.")
+    parser.add_argument('--batch', required=True, metavar='INPUT', help="Input .csv or .jsonl file")
+    parser.add_argument('--output', default=None, help="Output .jsonl file (default: stdout)")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help=f"Rows read and scored per chunk (default: {DEFAULT_CHUNK_SIZE}, "
+                             f"or {PARALLEL_CHUNK_SIZE} with --workers)")
+    parser.add_argument('--workers', type=int, default=1, help="Number of scoring processes (default: 1)")
+    parser.add_argument('--top-k', type=int, default=None, help="Only output the K most compatible crops per sample")
+    parser.add_argument('--no-incompatible', action='store_true', help="Leave the incompatible_crops list out")
+    parser.add_argument('--compact', action='store_true',
+                        help="Crop indices and integer percentages (see python model.py --crop-dictionary)")
+    parser.add_argument('--ml-weight', type=float, default=0.0,
+                        help="Blend in the ML model's probabilities with this weight, 0-1 (default: 0, rules only)")
+    parser.add_argument('--graded', nargs='?', const='trapezoid', default=None, choices=['trapezoid', 'gaussian'],
+                        help="Partial credit for values near the ranges (default falloff: trapezoid)")
+    parser.add_argument('--weights', default=None, metavar='F=W,...', help="Per-feature weights for --graded")
+    parser.add_argument('--tolerances', default=None, metavar='F=T,...',
+                        help="Per-feature falloff tolerances for --graded (see crop_engine.DEFAULT_TOLERANCES)")
+    args = parser.parse_args(argv)
+    if args.chunk_size is not None and args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.top_k is not None and args.top_k < 0:
+        parser.error("--top-k must not be negative")
+    if not 0.0 <= args.ml_weight <= 1.0:
+        parser.error("--ml-weight must be between 0 and 1")
+    graded = None
+    if args.graded or args.weights or args.tolerances:
+        import crop_engine
+        try:
+            graded = model.graded_scoring(args.graded or 'trapezoid',
+                                          crop_engine.parse_feature_values(args.tolerances or ''),
+                                          crop_engine.parse_feature_values(args.weights or ''))
+        except ValueError as e:
+            parser.error(str(e))
+    options = dict(chunk_size=args.chunk_size, workers=args.workers, top_k=args.top_k,
+                   include_incompatible=not args.no_incompatible, ml_weight=args.ml_weight,
+                   compact=args.compact, graded=graded)
+
+    try:
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                stats = score_file(args.batch, output, **options)
+        else:
+            stats = score_file(args.batch, sys.stdout, **options)
+    except FileNotFoundError as e:
+        print(f"Error: File not found: {e.filename or e}")
+        return 1
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    print(format_stats(stats), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
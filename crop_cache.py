@@ -0,0 +1,154 @@
+# crop_cache.py
+# Memoizing LRU + TTL cache in front of model.get_suitable_crops.
+#
+# The form in index.php offers a small set of NPK presets and dropdown values, so many
+# requests repeat the same inputs. Results are cached as the already-serialized JSON
+# string, keyed on a normalized tuple of the ten features, so a hit skips both scoring
+# and json.dumps. Keys are exact by default. With a precision, numerical values are
+# rounded for the key only: more requests hit, but one whose value sits right at a range
+# boundary may get the result of an earlier request that rounded to the same key.
+#
+# The cache drops all entries automatically when the crop conditions change
+# (CROP_CONDITIONS replaced, or model.reset_engine() called after an in-place edit)
+# or when the model file changes on disk.
+#
+# Only the standard library is used, so the cache does not slow down cold starts.
+
+import collections
+import os
+import threading
+import time
+
+import model
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of get_suitable_crops JSON results with a time-to-live.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, precision=None, model_path='crop_model.pkl',
+                 check_interval=1.0, clock=time.monotonic):
+        """
+        maxsize: maximum number of cached results (least recently used are evicted)
+        ttl: seconds a result stays valid (None for no expiry)
+        precision: decimals numerical features are rounded to when building the key
+                   (None for exact keys); a miss always scores the caller's own values
+        model_path: model file watched for changes
+        check_interval: minimum seconds between stat() calls on model_path
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.precision = precision
+        self.model_path = model_path
+        self.check_interval = check_interval
+        self.clock = clock
+
+        self._entries = collections.OrderedDict() # key -> (expires_at, json string)
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._next_check = 0.0
+        self._model_stamp = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_key(self, features_dict):
+        """
+        Normalizes a features dict into a hashable key: numerical features as floats
+        (rounded to self.precision if set), categorical features as strings, missing
+        ones as None.
+        """
+        key = []
+        for name in model.FEATURE_NAMES:
+            value = features_dict.get(name)
+            if value is not None:
+                if name in model.NUMERICAL_FEATURES:
+                    value = float(value)
+                    if self.precision is not None:
+                        value = round(value, self.precision)
+                else:
+                    value = str(value)
+            key.append(value)
+        return tuple(key)
+
+    def _model_file_stamp(self):
+        try:
+            stat = os.stat(self.model_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _check_fingerprint(self, now):
+        """
+        Clears the cache if the crop conditions or the model file changed.
+        Must be called with the lock held.
+        """
+        if self.model_path is not None and now >= self._next_check:
+            self._model_stamp = self._model_file_stamp()
+            self._next_check = now + self.check_interval
+        fingerprint = (id(model.CROP_CONDITIONS), model.conditions_version, self._model_stamp)
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def get_suitable_crops(self, features_dict, top_k=None, include_incompatible=True, compact=False):
+        """
+        Cached equivalent of model.get_suitable_crops(features_dict, top_k, include_incompatible, compact).
+        Returns the JSON string.
+        """
+        features_key = self.make_key(features_dict)
+        key = (features_key, top_k, include_incompatible, compact)
+        now = self.clock()
+        with self._lock:
+            self._check_fingerprint(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] is None or entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    if model.metrics is not None:
+                        model.metrics.incr('cache_hits')
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            fingerprint = self._fingerprint
+        if model.metrics is not None:
+            model.metrics.incr('cache_misses')
+
+        # Score outside the lock so concurrent misses don't serialize on each other
+        result = model.get_suitable_crops(features_dict, top_k, include_incompatible, compact)
+
+        with self._lock:
+            if self.maxsize > 0 and fingerprint == self._fingerprint:
+                expires_at = now + self.ttl if self.ttl is not None else None
+                self._entries[key] = (expires_at, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns the cache counters as a dict.
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,310 @@
+# crop_db.py
+# Local SQLite stand-in for the MySQL schema in database.sql.
+#
+# The PHP site stores every recommendation in the `predictions` table. Python tools
+# (incremental retraining, bulk imports) work against a SQLite file with the same
+# columns, so they run without a MySQL server. Only the standard library is used.
+#
+# predicted_crop holds what index.php stores there: the JSON output of model.py.
+# label_from_prediction() turns it into a training label (the most compatible crop);
+# a plain crop name is accepted too.
+#
+# PredictionWriter is the compact alternative to one JSON row per request: predictions are
+# buffered and written in multi-row INSERTs, one transaction per flush. predicted_crop then
+# holds only the most compatible crop (fits the varchar(100) of database.sql) and the full
+# ranking goes to crop_scores, packed as little-endian uint16: the indices of the
+#   compatible crops (best first), then their scores in hundredths of a percent. The
+#   indices refer to the crop_catalogs row named by the catalog column
+#   (crop_json.catalog_hash). Incompatible crops are the rest of the catalog.
+# fetch_history() reads a user's latest predictions back from either kind of row.
+#
+# Benchmark against row-at-a-time JSON inserts: python benchmarks/bench_db.py
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from array import array
+
+DEFAULT_DB_PATH = os.environ.get('CROP_MODEL_DB', 'crop_recommendation.sqlite')
+
+# database.sql translated to SQLite, with the ALTER TABLE columns folded in
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    role VARCHAR(50) NOT NULL DEFAULT 'user',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    nitrogen INTEGER NOT NULL,
+    phosphorus INTEGER NOT NULL,
+    potassium INTEGER NOT NULL,
+    climate VARCHAR(50),
+    temperature DECIMAL(5,2) NOT NULL DEFAULT 0,
+    humidity DECIMAL(5,2) NOT NULL,
+    ph DECIMAL(4,2) NOT NULL,
+    rainfall DECIMAL(7,2) NOT NULL,
+    soil_type VARCHAR(50),
+    topography VARCHAR(50),
+    water_availability VARCHAR(50),
+    predicted_crop TEXT NOT NULL,
+    prediction_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+    crop_scores BLOB,
+    catalog VARCHAR(8)
+);
+
+-- Crop names of each catalog the crop_scores indices refer to, as a JSON list
+CREATE TABLE IF NOT EXISTS crop_catalogs (
+    catalog VARCHAR(8) PRIMARY KEY,
+    crop_names TEXT NOT NULL
+);
+
+-- Position of the last prediction row each consumer (e.g. the trainer) has processed
+CREATE TABLE IF NOT EXISTS watermarks (
+    name VARCHAR(50) PRIMARY KEY,
+    prediction_time DATETIME,
+    prediction_id INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# predictions column -> model feature name
+FEATURE_COLUMNS = {
+    'nitrogen': 'Nitrogen',
+    'phosphorus': 'Phosphorus',
+    'potassium': 'Potassium',
+    'climate': 'Climate',
+    'humidity': 'Humidity',
+    'ph': 'pH',
+    'rainfall': 'Rainfall',
+    'soil_type': 'Soil_Type',
+    'topography': 'Topography',
+    'water_availability': 'Water_Availability',
+}
+
+# Columns added after the first version of SCHEMA, added to older database files by connect()
+ADDED_COLUMNS = {'crop_scores': 'BLOB', 'catalog': 'VARCHAR(8)'}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS predictions_time ON predictions (prediction_time, id);
+CREATE INDEX IF NOT EXISTS predictions_user ON predictions (user_id, prediction_time);
+"""
+
+# Columns written by PredictionWriter, in INSERT order
+INSERT_COLUMNS = ('user_id',) + tuple(FEATURE_COLUMNS) + ('temperature', 'predicted_crop', 'crop_scores',
+                                                          'catalog', 'prediction_time')
+# Bound parameters per statement: SQLite's limit before 3.32 (MySQL allows far more)
+MAX_VARIABLES = 999
+
+def connect(path=DEFAULT_DB_PATH):
+    """
+    Opens (creating if needed) the SQLite database and makes sure the tables exist.
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(predictions)")}
+    for name, column_type in ADDED_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE predictions ADD COLUMN {name} {column_type}")
+    conn.executescript(INDEXES)
+    return conn
+
+def label_from_prediction(predicted_crop):
+    """
+    Training label for a stored prediction: the first compatible crop of the JSON
+    model.py output, or the value itself if it is a plain crop name. None if the
+    output lists no compatible crop.
+    """
+    try:
+        result = json.loads(predicted_crop)
+    except (TypeError, ValueError):
+        return predicted_crop or None
+    if isinstance(result, dict):
+        crops = result.get('compatible_crops') or []
+        return crops[0]['crop'] if crops else None
+    return predicted_crop
+
+def get_watermark(conn, name):
+    """
+    Returns (prediction_time, prediction_id) of the last row processed by name,
+    or (None, 0) if it has not processed any.
+    """
+    row = conn.execute("SELECT prediction_time, prediction_id FROM watermarks WHERE name = ?", (name,)).fetchone()
+    return (row[0], row[1]) if row else (None, 0)
+
+def set_watermark(conn, name, watermark):
+    conn.execute("INSERT OR REPLACE INTO watermarks (name, prediction_time, prediction_id) VALUES (?, ?, ?)",
+                 (name, watermark[0], watermark[1]))
+    conn.commit()
+
+def fetch_labelled_rows(conn, since=(None, 0)):
+    """
+    Returns (features, labels, watermark) for the prediction rows after the since
+    watermark, in (prediction_time, id) order: features is a dict of columns keyed by
+    model feature name, labels a list of crop names, watermark the position of the last
+    row read (since itself if there are no new rows). Rows without a label are skipped.
+    Pass since=(None, 0) to read every row.
+    """
+    columns = ', '.join(FEATURE_COLUMNS)
+    query = f"SELECT id, prediction_time, predicted_crop, {columns} FROM predictions"
+    params = ()
+    if since[0] is not None:
+        # (time, id) comparison, so rows sharing the watermark's second are not lost
+        query += " WHERE prediction_time > ? OR (prediction_time = ? AND id > ?)"
+        params = (since[0], since[0], since[1])
+    query += " ORDER BY prediction_time, id"
+
+    features = {name: [] for name in FEATURE_COLUMNS.values()}
+    labels = []
+    watermark = since
+    for row in conn.execute(query, params):
+        watermark = (row[1], row[0])
+        label = label_from_prediction(row[2])
+        if label is None:
+            continue
+        labels.append(label)
+        for name, value in zip(FEATURE_COLUMNS.values(), row[3:]):
+            features[name].append(value)
+    return features, labels, watermark
+
+def pack_scores(compatible, percentages):
+    """
+    crop_scores value for a ranking: compatible is the list (or NumPy array) of crop
+    indices, best first, percentages the scores of every crop in catalog order.
+    """
+    if hasattr(compatible, 'astype'):
+        # NumPy ranking (the vectorized engine): convert both halves in one call each
+        return (compatible.astype('<u2').tobytes()
+                + (percentages[compatible] * 100 + 0.5).astype('<u2').tobytes())
+    pairs = array('H', compatible)
+    pairs.extend([int(percentages[i] * 100 + 0.5) for i in compatible])
+    if sys.byteorder == 'big':
+        pairs.byteswap()
+    return pairs.tobytes()
+
+def unpack_scores(blob):
+    """
+    Inverse of pack_scores: a list of (crop index, percentage) pairs, best first.
+    """
+    pairs = array('H')
+    pairs.frombytes(blob)
+    if sys.byteorder == 'big':
+        pairs.byteswap()
+    half = len(pairs) // 2
+    return list(zip(pairs[:half], [score / 100 for score in pairs[half:]]))
+
+class PredictionWriter:
+    """
+    Buffers predictions and writes them to the predictions table in multi-row INSERTs,
+    batch_size rows (one transaction) at a time. Rows reach the database on flush(),
+    when the buffer is full, and when the writer is used as a context manager, on exit:
+
+        with crop_db.PredictionWriter(conn) as writer:
+            writer.add(user_id, features, model.rank_crops(features))
+    """
+
+    def __init__(self, conn, batch_size=500):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._rows = []
+        self._catalogs = {} # id(crop_names) -> (crop_names, catalog hash)
+        self._new_catalogs = []
+        self._statements = {}
+
+    def _catalog(self, crop_names):
+        entry = self._catalogs.get(id(crop_names))
+        if entry is None or entry[0] is not crop_names:
+            import crop_json
+            entry = (crop_names, crop_json.catalog_hash(crop_names))
+            self._catalogs[id(crop_names)] = entry
+            self._new_catalogs.append((entry[1], json.dumps(list(crop_names))))
+        return entry[1]
+
+    def add(self, user_id, features_dict, ranked, prediction_time=None):
+        """
+        Queues one prediction: the model feature dict of the request and its ranking
+        (a crop_json.RankedCrops, as model.rank_crops returns). prediction_time defaults
+        to now (UTC, like CURRENT_TIMESTAMP), the time of the request rather than of the
+        flush.
+        """
+        crop_names = ranked.crop_names
+        compatible = ranked.compatible
+        self._rows.append((user_id,) + tuple(features_dict.get(name) for name in FEATURE_COLUMNS.values()) + (
+            0, crop_names[compatible[0]] if len(compatible) else '', pack_scores(compatible, ranked.percentages),
+            self._catalog(crop_names), prediction_time or time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def _statement(self, num_rows):
+        statement = self._statements.get(num_rows)
+        if statement is None:
+            placeholders = '(' + ', '.join('?' * len(INSERT_COLUMNS)) + ')'
+            statement = (f"INSERT INTO predictions ({', '.join(INSERT_COLUMNS)}) VALUES "
+                         + ', '.join([placeholders] * num_rows))
+            self._statements[num_rows] = statement
+        return statement
+
+    def flush(self):
+        """
+        Writes the buffered rows in one transaction.
+        """
+        rows, self._rows = self._rows, []
+        if not rows and not self._new_catalogs:
+            return
+        per_statement = MAX_VARIABLES // len(INSERT_COLUMNS)
+        with self.conn:
+            if self._new_catalogs:
+                self.conn.executemany("INSERT OR IGNORE INTO crop_catalogs (catalog, crop_names) VALUES (?, ?)",
+                                      self._new_catalogs)
+                self._new_catalogs = []
+            for start in range(0, len(rows), per_statement):
+                chunk = rows[start:start + per_statement]
+                self.conn.execute(self._statement(len(chunk)), [value for row in chunk for value in row])
+        self.rows_written += len(rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+def _ranking_from_json(predicted_crop):
+    # (crop, percentage) pairs of a model.py JSON row, or of a plain crop name
+    try:
+        result = json.loads(predicted_crop)
+    except (TypeError, ValueError):
+        return [(predicted_crop, None)] if predicted_crop else []
+    if not isinstance(result, dict):
+        return [(predicted_crop, None)]
+    return [(item['crop'], item['compatibility']) for item in result.get('compatible_crops') or []]
+
+def fetch_history(conn, user_id, limit=20):
+    """
+    The latest limit predictions of user_id, newest first, as
+    (prediction_time, features, crops) tuples: features keyed by model feature name,
+    crops the compatible (crop name, percentage) pairs, best first. Compact rows and
+    JSON rows (index.php) are both read.
+    """
+    columns = ', '.join(FEATURE_COLUMNS)
+    rows = conn.execute(f"SELECT prediction_time, predicted_crop, crop_scores, catalog, {columns} FROM predictions "
+                        "WHERE user_id = ? ORDER BY prediction_time DESC, id DESC LIMIT ?", (user_id, limit)).fetchall()
+    catalogs = {}
+    history = []
+    for row in rows:
+        if row[2] is not None:
+            crop_names = catalogs.get(row[3])
+            if crop_names is None:
+                found = conn.execute("SELECT crop_names FROM crop_catalogs WHERE catalog = ?", (row[3],)).fetchone()
+                crop_names = catalogs[row[3]] = json.loads(found[0]) if found else []
+            crops = [(crop_names[i] if i < len(crop_names) else None, percentage)
+                     for i, percentage in unpack_scores(row[2])]
+        else:
+            crops = _ranking_from_json(row[1])
+        history.append((row[0], dict(zip(FEATURE_COLUMNS.values(), row[4:])), crops))
+    return history
@@ -0,0 +1,395 @@
+# crop_engine.py
+# Vectorized compatibility engine for model.py.
+#
+# CROP_CONDITIONS is compiled once into dense NumPy arrays:
+#   - min/max bound matrices (crops x numerical features), NaN where a crop has no range
+#   - integer-coded membership bitmasks (crops x categorical features): every
+#     categorical value gets a bit, and a crop's mask has the bits of its accepted values
+# Scoring an input against every crop is then a handful of array operations instead of
+# a Python loop over crops and condition keys. The percentages are computed exactly like
+# model.calculate_compatibility (score / total_conditions * 100), so results are identical.
+#
+# GradedScoring adds an optional distance-aware mode: values outside a crop's range earn
+# partial credit that falls off with the distance to the range (trapezoid or Gaussian),
+# and each feature can be weighted. It is the same whole-catalog array math as the
+# binary kernel, one (N, crops) pass per feature.
+
+import numpy as np
+
+NUMERICAL_FEATURES = ['Nitrogen', 'Phosphorus', 'Potassium', 'Humidity', 'pH', 'Rainfall']
+CATEGORICAL_FEATURES = ['Climate', 'Soil_Type', 'Topography', 'Water_Availability']
+
+MAX_CATEGORIES = 64 # One bit per category value in a uint64 mask
+
+# Rows scored per kernel call in score_columns. Bounds the (rows x crops x features)
+# temporaries to a few tens of MB regardless of how many samples are passed in.
+BATCH_ROWS = 8192
+# Graded scoring works on float64 (rows x crops) arrays; blocks of about this many cells
+# keep them cache-sized
+GRADED_BLOCK_CELLS = 1 << 18
+
+# Graded scoring: distance outside the range (in feature units) at which the trapezoid
+# falloff reaches zero credit, and the Gaussian's standard deviation
+DEFAULT_TOLERANCES = {'Nitrogen': 20.0, 'Phosphorus': 10.0, 'Potassium': 20.0,
+                      'Humidity': 10.0, 'pH': 0.5, 'Rainfall': 50.0}
+FALLOFFS = ('trapezoid', 'gaussian')
+
+def parse_feature_values(text):
+    """
+    Parses "Feature=value,Feature=value" (e.g. "pH=2,Rainfall=0.5") into a dict of floats.
+    Raises ValueError for unknown feature names or invalid numbers.
+    """
+    values = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, sep, value = item.partition('=')
+        name = name.strip()
+        if not sep or name not in NUMERICAL_FEATURES + CATEGORICAL_FEATURES:
+            raise ValueError(f"expected Feature=value with a known feature name, got {item!r}")
+        try:
+            values[name] = float(value)
+        except ValueError:
+            raise ValueError(f"{name}: {value!r} is not a number")
+    return values
+
+class GradedScoring:
+    """
+    Settings for graded scoring (CompiledConditions.score_graded). A numerical condition
+    earns full credit inside its range and partial credit outside it, falling off with
+    the distance d to the nearest bound:
+      trapezoid: max(0, 1 - d / tolerance)    (no credit from one tolerance away)
+      gaussian:  exp(-(d / tolerance)**2 / 2)
+    A tolerance of 0 gives the binary in-range check. Categorical conditions score 0 or 1.
+    Every condition counts with its feature's weight:
+      percentage = sum(weight * credit) / sum(weight) * 100
+    over the same conditions binary scoring counts, so with zero tolerances and unit
+    weights the percentages equal the binary ones.
+    """
+
+    def __init__(self, falloff='trapezoid', tolerances=None, weights=None):
+        """
+        falloff: 'trapezoid' or 'gaussian'
+        tolerances: {numerical feature: tolerance}, overriding DEFAULT_TOLERANCES
+        weights: {feature: weight} (default 1.0 for every feature)
+        """
+        if falloff not in FALLOFFS:
+            raise ValueError(f"Unknown falloff {falloff!r} (use {' or '.join(FALLOFFS)})")
+        tolerances = dict(DEFAULT_TOLERANCES, **(tolerances or {}))
+        weights = weights or {}
+        unknown = (set(tolerances) - set(NUMERICAL_FEATURES)) | (set(weights) - set(NUMERICAL_FEATURES + CATEGORICAL_FEATURES))
+        if unknown:
+            raise ValueError(f"Unknown feature(s) {', '.join(sorted(unknown))}")
+        self.falloff = falloff
+        self.tolerances = np.array([tolerances[key] for key in NUMERICAL_FEATURES], dtype=float)
+        self.numerical_weights = np.array([weights.get(key, 1.0) for key in NUMERICAL_FEATURES], dtype=float)
+        self.categorical_weights = np.array([weights.get(key, 1.0) for key in CATEGORICAL_FEATURES], dtype=float)
+        if (self.tolerances < 0).any() or (self.numerical_weights < 0).any() or (self.categorical_weights < 0).any():
+            raise ValueError("Tolerances and weights must not be negative")
+
+    def credit(self, col, distance):
+        """
+        Turns distance, a float array of signed distances to the ranges of numerical
+        feature col (<= 0 inside a range, +inf for no range), into credit in place.
+        """
+        tolerance = self.tolerances[col]
+        if tolerance == 0:
+            np.less_equal(distance, 0.0, out=distance)
+        elif self.falloff == 'trapezoid':
+            distance *= -1.0 / tolerance
+            distance += 1.0
+            np.clip(distance, 0.0, 1.0, out=distance)
+        else:
+            np.maximum(distance, 0.0, out=distance)
+            distance *= 1.0 / tolerance
+            np.square(distance, out=distance)
+            distance *= -0.5
+            np.exp(distance, out=distance)
+        return distance
+
+    def __repr__(self):
+        return f"GradedScoring({self.falloff!r})"
+
+def is_present(value):
+    """
+    Whether an input value counts as given. The one definition of "missing" shared by
+    every encoder: only None (a missing key reads as None) is absent. '' and NaN are
+    present values that match no condition, as in model.calculate_compatibility.
+    """
+    return value is not None
+
+def category_code(lookup, value):
+    """
+    Code of value in a vocab dict, -1 (no match) for unknown or unhashable values.
+    """
+    try:
+        return lookup.get(value, -1)
+    except TypeError:
+        return -1 # Unhashable input can never match a category
+
+class CompiledConditions:
+    """
+    Crop preferred conditions compiled into arrays for vectorized scoring.
+    Build it once per CROP_CONDITIONS table and reuse it for every request.
+    vocabulary: {feature: [values]} taking the first category codes (the shared
+    crop_vocab codes); values only the catalog mentions get the next ones.
+    """
+
+    def __init__(self, crop_conditions, vocabulary=None):
+        self.crop_names = list(crop_conditions.keys())
+        num_crops = len(self.crop_names)
+
+        self.lower = np.full((num_crops, len(NUMERICAL_FEATURES)), np.nan)
+        self.upper = np.full((num_crops, len(NUMERICAL_FEATURES)), np.nan)
+        self.numerical_defined = np.zeros((num_crops, len(NUMERICAL_FEATURES)), dtype=bool)
+
+        # value -> bit position, per categorical feature
+        self.vocab = {key: {} for key in CATEGORICAL_FEATURES}
+        for key in CATEGORICAL_FEATURES:
+            for value in (vocabulary or {}).get(key, ()):
+                self._code_for(key, value)
+        self.masks = np.zeros((num_crops, len(CATEGORICAL_FEATURES)), dtype=np.uint64)
+        self.categorical_defined = np.zeros((num_crops, len(CATEGORICAL_FEATURES)), dtype=bool)
+
+        for row, crop_name in enumerate(self.crop_names):
+            preferred = crop_conditions[crop_name] or {}
+            for col, key in enumerate(NUMERICAL_FEATURES):
+                if preferred.get(key) is not None:
+                    self.lower[row, col], self.upper[row, col] = preferred[key]
+                    self.numerical_defined[row, col] = True
+            for col, key in enumerate(CATEGORICAL_FEATURES):
+                preferred_val = preferred.get(key)
+                if preferred_val is None:
+                    continue
+                accepted = preferred_val if isinstance(preferred_val, list) else [preferred_val]
+                mask = 0
+                for value in accepted:
+                    mask |= 1 << self._code_for(key, value)
+                self.masks[row, col] = mask
+                self.categorical_defined[row, col] = True
+
+        # Bitmasks expanded into (codes + 1, crops) lookup tables: row c tells which crops
+        # accept category code c. The last row stands for code -1 (unknown value, no match).
+        self.membership = []
+        for col, key in enumerate(CATEGORICAL_FEATURES):
+            table = np.zeros((len(self.vocab[key]) + 1, num_crops), dtype=bool)
+            for code in range(len(self.vocab[key])):
+                table[code] = ((self.masks[:, col] >> np.uint64(code)) & np.uint64(1)) == 1
+            self.membership.append(table)
+
+        # Alphabetical order of the crops, used to sort the incompatible list
+        self.name_order = np.array(sorted(range(num_crops), key=lambda i: self.crop_names[i]), dtype=np.intp)
+
+        # Graded scoring bounds: a crop without a range gets (+inf, -inf), which is
+        # infinitely far from any value and so earns no credit without a mask
+        self.graded_lower = np.where(self.numerical_defined, self.lower, np.inf).T.copy()
+        self.graded_upper = np.where(self.numerical_defined, self.upper, -np.inf).T.copy()
+        self.defined = np.concatenate([self.numerical_defined, self.categorical_defined], axis=1).astype(float)
+
+    def _code_for(self, key, value):
+        codes = self.vocab[key]
+        if value not in codes:
+            if len(codes) >= MAX_CATEGORIES:
+                raise ValueError(f"Too many distinct values for '{key}' (max {MAX_CATEGORIES})")
+            codes[value] = len(codes)
+        return codes[value]
+
+    def encode(self, features_dict):
+        """
+        Encodes one features dict into the arrays used by the scoring kernel:
+        (numerical values, numerical present flags, categorical codes, categorical present flags).
+        Unknown categorical values get code -1 and never match.
+        """
+        values = np.zeros(len(NUMERICAL_FEATURES))
+        numerical_present = np.zeros(len(NUMERICAL_FEATURES), dtype=bool)
+        for col, key in enumerate(NUMERICAL_FEATURES):
+            input_val = features_dict.get(key)
+            if is_present(input_val):
+                values[col] = input_val
+                numerical_present[col] = True
+
+        codes = np.full(len(CATEGORICAL_FEATURES), -1, dtype=np.int64)
+        categorical_present = np.zeros(len(CATEGORICAL_FEATURES), dtype=bool)
+        for col, key in enumerate(CATEGORICAL_FEATURES):
+            input_val = features_dict.get(key)
+            if is_present(input_val):
+                categorical_present[col] = True
+                codes[col] = category_code(self.vocab[key], input_val)
+        return values, numerical_present, codes, categorical_present
+
+    def score_encoded(self, values, numerical_present, codes, categorical_present):
+        """
+        Scoring kernel. Takes encoded inputs shaped (N, features) and returns an
+        (N, crops) array of compatibility percentages.
+        """
+        num_rows = len(values)
+        score = np.zeros((num_rows, len(self.crop_names)), dtype=np.int16)
+        total_conditions = np.zeros((num_rows, len(self.crop_names)), dtype=np.int16)
+
+        # Numerical conditions: inclusive range checks, counted where both sides are defined.
+        # One (N, crops) pass per feature keeps the temporaries 2-D.
+        for col in range(len(NUMERICAL_FEATURES)):
+            v = values[:, col, None]
+            counted = self.numerical_defined[None, :, col] & numerical_present[:, col, None]
+            total_conditions += counted
+            score += (self.lower[None, :, col] <= v) & (v <= self.upper[None, :, col]) & counted
+
+        # Categorical conditions: a row gather from the bitmasks expanded per category code
+        for col in range(len(CATEGORICAL_FEATURES)):
+            counted = self.categorical_defined[None, :, col] & categorical_present[:, col, None]
+            total_conditions += counted
+            score += self.membership[col][codes[:, col]]
+
+        # Same arithmetic as calculate_compatibility: (score / total_conditions) * 100
+        percentages = np.zeros(score.shape)
+        np.divide(score, total_conditions, out=percentages, where=total_conditions > 0)
+        return percentages * 100
+
+    def score_graded_encoded(self, values, numerical_present, codes, categorical_present, graded):
+        """
+        Graded scoring kernel (see GradedScoring), same inputs and output shape as
+        score_encoded. Every step works in place on two (N, crops) float arrays.
+        """
+        shape = (len(values), len(self.crop_names))
+        score = np.zeros(shape)
+        distance = np.empty(shape)
+        other = np.empty(shape)
+
+        for col in range(len(NUMERICAL_FEATURES)):
+            weight = graded.numerical_weights[col]
+            present = numerical_present[:, col]
+            if weight == 0 or not present.any():
+                continue
+            v = values[:, col, None]
+            # Signed distance to the range: <= 0 inside it, the gap to the nearest bound outside
+            np.subtract(self.graded_lower[col], v, out=distance)
+            np.subtract(v, self.graded_upper[col], out=other)
+            np.maximum(distance, other, out=distance)
+            if not np.isfinite(v).all():
+                # NaN (and +-inf against a crop without a range, inf - inf) compare as
+                # outside every range in binary scoring: no credit here either
+                np.copyto(distance, np.inf, where=np.isnan(distance))
+            graded.credit(col, distance)
+            if weight != 1:
+                distance *= weight
+            if not present.all():
+                distance *= present[:, None]
+            score += distance
+
+        for col in range(len(CATEGORICAL_FEATURES)):
+            weight = graded.categorical_weights[col]
+            if weight == 0:
+                continue
+            # Absent inputs have code -1, whose membership row is empty
+            matches = self.membership[col][codes[:, col]]
+            if weight == 1:
+                score += matches
+            else:
+                np.multiply(matches, weight, out=other)
+                score += other
+
+        # Weight of the conditions counted for each input: present features x defined conditions
+        weights = np.concatenate([graded.numerical_weights, graded.categorical_weights])
+        present = np.concatenate([numerical_present, categorical_present], axis=1).astype(float)
+        total_weight = present @ (self.defined * weights).T
+
+        percentages = np.zeros(shape)
+        np.divide(score, total_weight, out=percentages, where=total_weight > 0)
+        return percentages * 100
+
+    def score(self, features_dict, graded=None):
+        """
+        Returns a 1-D array of compatibility percentages for every crop, in
+        catalog (CROP_CONDITIONS) order. graded: a GradedScoring for graded scoring.
+        """
+        values, numerical_present, codes, categorical_present = self.encode(features_dict)
+        kernel = self.score_encoded if graded is None else lambda *inputs: self.score_graded_encoded(*inputs, graded)
+        return kernel(values[None, :], numerical_present[None, :], codes[None, :], categorical_present[None, :])[0]
+
+    def encode_columns(self, columns):
+        """
+        Encodes many samples given as columns ({feature name: sequence of values})
+        into kernel inputs shaped (N, features). Missing features and None values are
+        absent, like a missing key in a features dict; anything else is present (see
+        is_present), exactly as in encode.
+        """
+        num_rows = max(len(column) for column in columns.values())
+        values = np.zeros((num_rows, len(NUMERICAL_FEATURES)))
+        numerical_present = np.zeros((num_rows, len(NUMERICAL_FEATURES)), dtype=bool)
+        for col, key in enumerate(NUMERICAL_FEATURES):
+            column = columns.get(key)
+            if column is None:
+                continue
+            if isinstance(column, np.ndarray) and column.dtype != object:
+                present = True # No None in a numeric array
+            else:
+                present = np.fromiter((is_present(value) for value in column), dtype=bool, count=num_rows)
+            numerical_present[:, col] = present
+            values[:, col] = np.where(present, np.asarray(column, dtype=float), 0.0) # None becomes NaN, then 0
+
+        codes = np.full((num_rows, len(CATEGORICAL_FEATURES)), -1, dtype=np.int64)
+        categorical_present = np.zeros((num_rows, len(CATEGORICAL_FEATURES)), dtype=bool)
+        for col, key in enumerate(CATEGORICAL_FEATURES):
+            column = columns.get(key)
+            if column is None:
+                continue
+            lookup = self.vocab[key]
+            codes[:, col] = [category_code(lookup, value) for value in column]
+            categorical_present[:, col] = [is_present(value) for value in column]
+        return values, numerical_present, codes, categorical_present
+
+    def score_columns(self, columns, graded=None):
+        """
+        Scores N samples (see encode_columns) against every crop and returns an
+        (N, crops) array of compatibility percentages, crops in catalog order.
+        graded: a GradedScoring for graded scoring.
+        """
+        values, numerical_present, codes, categorical_present = self.encode_columns(columns)
+        kernel = self.score_encoded if graded is None else lambda *inputs: self.score_graded_encoded(*inputs, graded)
+        block_rows = BATCH_ROWS if graded is None else max(1, GRADED_BLOCK_CELLS // max(1, len(self.crop_names)))
+        percentages = np.empty((len(values), len(self.crop_names)))
+        for start in range(0, len(values), block_rows):
+            stop = start + block_rows
+            percentages[start:stop] = kernel(values[start:stop], numerical_present[start:stop],
+                                             codes[start:stop], categorical_present[start:stop])
+        return percentages
+
+    def rank_batch(self, percentages):
+        """
+        Returns, for each row of an (N, crops) percentage array, the crop indices
+        by descending percentage (ties keep catalog order), as an (N, crops) array.
+        """
+        return np.argsort(-percentages, axis=1, kind='stable')
+
+    def rank(self, percentages):
+        """
+        Splits one row of percentages into (compatible, incompatible) crop indices,
+        ordered exactly like get_suitable_crops: compatible by descending percentage
+        (ties keep catalog order), incompatible alphabetically by name.
+        """
+        by_score = np.argsort(-percentages, kind='stable')
+        compatible = by_score[percentages[by_score] > 0]
+        return compatible, self.incompatible(percentages)
+
+    def incompatible(self, percentages):
+        """
+        Indices of the crops with a zero percentage, alphabetically by name.
+        """
+        return self.name_order[percentages[self.name_order] <= 0]
+
+    def top_k(self, percentages, k):
+        """
+        Indices of the k highest-percentage compatible crops, in the same order rank()
+        gives (descending, ties in catalog order), so the result is always the first k
+        entries of the full ranking. Uses a partial selection (np.partition) to find the
+        k-th largest value, then sorts only the k selected crops.
+        """
+        compatible = np.flatnonzero(percentages > 0)
+        if k <= 0:
+            return compatible[:0]
+        if k < len(compatible):
+            values = percentages[compatible]
+            kth_largest = np.partition(values, len(values) - k)[len(values) - k]
+            above = compatible[values > kth_largest]
+            # Ties at the boundary are taken in catalog order, like the stable full sort
+            ties = compatible[values == kth_largest][:k - len(above)]
+            compatible = np.sort(np.concatenate([above, ties]))
+        return compatible[np.argsort(-percentages[compatible], kind='stable')]
@@ -0,0 +1,274 @@
+# crop_forest.py
+# Fast, pickle-free model artifact for the RandomForest crop classifier.
+#
+# crop_model.pkl is a pickled sklearn Pipeline (ColumnTransformer + OneHotEncoder +
+# RandomForestClassifier). Unpickling it imports sklearn, is slow, uses a lot of memory
+# and only works with a compatible sklearn version. export_pipeline() flattens the forest
+# into a directory of plain .npy arrays plus a small JSON file:
+#
+#   feature.npy    int32   (nodes,)            feature column tested at each node, -1 at leaves
+#   threshold.npy  float64 (nodes,)            go left when x <= threshold
+#   left.npy       int32   (nodes,)            global index of the left child, -1 at leaves
+#   right.npy      int32   (nodes,)            global index of the right child, -1 at leaves
+#   value.npy      float64 (nodes, classes)    normalized class probabilities at each node
+#   roots.npy      int32   (trees,)            global index of each tree's root node
+#   missing_left.npy uint8 (nodes,)            1 where a missing (NaN) value goes left
+#                                              (optional, sklearn >= 1.3; otherwise NaN goes right)
+#   meta.json      classes, one-hot encoder vocabularies, column layout, max depth
+#
+# ForestModel memory-maps those arrays (so loading takes milliseconds and worker processes
+# share the pages of the per-node class probabilities, nearly all of the artifact) and
+# runs inference with NumPy alone. Its predict_proba reproduces the
+# sklearn Pipeline's predict_proba: same one-hot layout, float32 inputs, per-tree normalized
+# leaf probabilities accumulated in tree order and divided by the number of trees.
+#
+# Export an existing pickle: python crop_forest.py [--pickle crop_model.pkl] [--output crop_model_forest]
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+DEFAULT_FOREST_DIR = 'crop_model_forest'
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+OPTIONAL_ARRAY_NAMES = ('missing_left',)
+FORMAT_VERSION = 1
+
+class FeatureLayout:
+    """
+    The pipeline's ColumnTransformer output layout (one-hot columns for the categorical
+    features, then the numerical features passed through), with a precomputed
+    category-to-column map so inputs can be encoded without building a DataFrame.
+    """
+
+    def __init__(self, categorical_features, categories, numerical_features):
+        self.categorical_features = list(categorical_features)
+        self.categories = {name: list(values) for name, values in categories.items()}
+        self.numerical_features = list(numerical_features)
+
+        self.column_map = {}
+        column = 0
+        for name in self.categorical_features:
+            self.column_map[name] = {}
+            for value in self.categories[name]:
+                self.column_map[name][value] = column
+                column += 1
+        self.numerical_columns = {name: column + i for i, name in enumerate(self.numerical_features)}
+        self.n_features = column + len(self.numerical_features)
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        """
+        Reads the layout from a fitted ColumnTransformer with a 'cat' OneHotEncoder
+        and a 'num' passthrough, as built by generate_crop_model.py.
+        """
+        categorical_features, categories, numerical_features = [], {}, []
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == 'cat':
+                categorical_features = list(columns)
+                for column, values in zip(columns, transformer.categories_):
+                    categories[column] = [str(value) for value in values]
+            elif name == 'num':
+                numerical_features = list(columns)
+        return cls(categorical_features, categories, numerical_features)
+
+    def encode(self, samples):
+        """
+        One-hot encodes samples into the float32 matrix the forest expects, like the
+        pipeline's ColumnTransformer (unknown categories give all-zero columns).
+        samples is a list of feature dicts or a dict of columns keyed by feature name.
+        Missing numerical values become NaN.
+        """
+        if not isinstance(samples, dict):
+            names = self.categorical_features + self.numerical_features
+            samples = {name: [features.get(name) for features in samples] for name in names}
+        num_rows = max((len(column) for column in samples.values()), default=0)
+        X = np.zeros((num_rows, self.n_features), dtype=np.float32)
+        rows = np.arange(num_rows)
+        for name in self.categorical_features:
+            lookup = self.column_map[name]
+            column = samples.get(name)
+            if column is None:
+                continue
+            columns = np.fromiter((lookup.get(value, -1) for value in column), dtype=np.int64, count=num_rows)
+            known = columns >= 0
+            X[rows[known], columns[known]] = 1.0
+        for name, column_index in self.numerical_columns.items():
+            column = samples.get(name)
+            X[:, column_index] = np.nan if column is None else np.asarray(column, dtype=float)
+        return X
+
+def export_pipeline(pipeline, path=DEFAULT_FOREST_DIR):
+    """
+    Flattens a fitted Pipeline(preprocessor=ColumnTransformer, classifier=RandomForestClassifier),
+    as built by generate_crop_model.py, into the array directory at path.
+    The directory is written next to path and swapped in atomically.
+    """
+    layout = FeatureLayout.from_preprocessor(pipeline.named_steps['preprocessor'])
+    forest = pipeline.named_steps['classifier']
+
+    features, thresholds, lefts, rights, values, roots, missing_left = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        features.append(np.where(is_leaf, -1, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(is_leaf, -1, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, -1, tree.children_right + offset).astype(np.int32))
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, None]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+        if hasattr(tree, 'missing_go_to_left'):
+            missing_left.append(np.where(is_leaf, 0, tree.missing_go_to_left).astype(np.uint8))
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    arrays = {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+    }
+    if missing_left:
+        arrays['missing_left'] = np.concatenate(missing_left)
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'classes': [str(c) for c in forest.classes_],
+        'categorical_features': layout.categorical_features,
+        'categories': layout.categories,
+        'numerical_features': layout.numerical_features,
+        'n_features': int(forest.n_features_in_),
+        'max_depth': int(max_depth),
+    }
+    write_artifact(path, arrays, meta)
+    return path
+
+def write_artifact(path, arrays, meta):
+    """
+    Writes the arrays and meta.json into a temporary sibling directory, then swaps it
+    into place so readers never see a half-written artifact.
+    """
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    staging = tempfile.mkdtemp(prefix='.forest-', dir=parent)
+    for name in ARRAY_NAMES + OPTIONAL_ARRAY_NAMES:
+        if name in arrays:
+            np.save(os.path.join(staging, name + '.npy'), np.ascontiguousarray(arrays[name]))
+    with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=1)
+
+    if os.path.exists(path):
+        retired = tempfile.mkdtemp(prefix='.forest-old-', dir=parent)
+        os.rmdir(retired)
+        os.replace(path, retired)
+        os.replace(staging, path)
+        shutil.rmtree(retired, ignore_errors=True)
+    else:
+        os.replace(staging, path)
+
+class ForestModel:
+    """
+    RandomForest inference over the memory-mapped arrays written by export_pipeline.
+    """
+
+    def __init__(self, path=DEFAULT_FOREST_DIR, mmap=True):
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest artifact version: {self.meta.get('format_version')}")
+        mmap_mode = 'r' if mmap else None
+        for name in ARRAY_NAMES:
+            setattr(self, name, np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode))
+        missing_path = os.path.join(path, 'missing_left.npy')
+        # uint8 0/1 viewed as bool, without copying the mapping
+        self.missing_left = np.load(missing_path, mmap_mode=mmap_mode).view(bool) if os.path.exists(missing_path) else None
+
+        self.classes = self.meta['classes']
+        self.categorical_features = self.meta['categorical_features']
+        self.numerical_features = self.meta['numerical_features']
+        self.n_features = self.meta['n_features']
+        self.max_depth = self.meta['max_depth']
+
+        self.layout = FeatureLayout(self.categorical_features, self.meta['categories'], self.numerical_features)
+
+        # Traversal tables: leaves test column 0 against +inf and both their children point
+        # back to themselves, so apply() needs no leaf masking. children is flattened
+        # (left, right) pairs. These are small (one entry per node) private copies in each
+        # process: walking the mapped feature/left/right arrays directly needs leaf masking
+        # at every level and was about 1.5x slower (benchmarks/bench_ml.py).
+        is_leaf = self.feature < 0
+        node_ids = np.arange(len(self.feature))
+        self._split_feature = np.where(is_leaf, 0, self.feature).astype(np.intp)
+        self._split_threshold = np.where(is_leaf, np.inf, self.threshold)
+        self._children = np.stack([np.where(is_leaf, node_ids, self.left),
+                                   np.where(is_leaf, node_ids, self.right)], axis=1).astype(np.intp).ravel()
+
+    def encode(self, samples):
+        """
+        One-hot encodes samples (list of feature dicts or dict of columns), see FeatureLayout.encode.
+        """
+        return self.layout.encode(samples)
+
+    def apply(self, X):
+        """
+        Returns the leaf node index reached in every tree for every row, shaped (rows, trees).
+        All trees are walked together, one level per iteration.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat = X.ravel()
+        row_offsets = (np.arange(len(X)) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots.astype(np.intp), (len(X), len(self.roots))).copy()
+        has_missing = self.missing_left is not None and np.isnan(flat).any()
+        for _ in range(self.max_depth):
+            x = flat[row_offsets + self._split_feature[node]]
+            # Not (x <= threshold) rather than x > threshold: NaN goes right unless the
+            # tree learned otherwise (missing_left), as in sklearn
+            go_right = ~(x <= self._split_threshold[node])
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.missing_left[node], go_right)
+            node = self._children[2 * node + go_right]
+        return node
+
+    def predict_proba(self, X):
+        """
+        Class probabilities shaped (rows, classes), columns in self.classes order.
+        """
+        leaves = self.apply(X)
+        proba = np.zeros((len(leaves), len(self.classes)))
+        for tree in range(leaves.shape[1]):
+            proba += self.value[leaves[:, tree]]
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        """
+        Most probable crop name for every row.
+        """
+        return [self.classes[i] for i in self.predict_proba(X).argmax(axis=1)]
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Export a pickled crop model pipeline to the array format.")
+    parser.add_argument('--pickle', default='crop_model.pkl', help="Pickled pipeline (default: crop_model.pkl)")
+    parser.add_argument('--output', default=DEFAULT_FOREST_DIR, help=f"Output directory (default: {DEFAULT_FOREST_DIR})")
+    args = parser.parse_args(argv)
+
+    import pickle
+    with open(args.pickle, 'rb') as f:
+        pipeline = pickle.load(f)
+    export_pipeline(pipeline, args.output)
+    print(f"Exported '{args.pickle}' to '{args.output}'")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,324 @@
+# crop_http.py
+# asyncio HTTP endpoint for get_suitable_crops, with request micro-batching.
+#
+# Mobile clients call the recommender over HTTP instead of going through index.php:
+#   POST /recommend   body: the same JSON request as the scoring daemon (crop_server.py),
+#                     a feature array or an object with optional top_k,
+#                     include_incompatible and compact; returns the model.py JSON
+#   GET  /crops       the crop dictionary for compact responses (crop_json.py)
+#   GET  /stats       batching, reload and --metrics counters
+#   GET  /health      {"status": "ok"}
+#
+# Requests arriving within --max-delay-ms of each other (default 2 ms), up to
+# --max-batch of them (default 64), are scored together in one vectorized
+# model.score_batch call and each caller gets its own result. Under load this replaces
+# many small per-request NumPy calls with one large one; at low load a request waits at
+# most max_delay. --max-batch 1 scores every request on its own (get_suitable_crops).
+#
+# Only the standard library (plus NumPy, as for --serve) is needed: HTTP/1.1 with
+# keep-alive is handled directly on asyncio streams.
+#
+# Usage: python model.py --serve-http [--host 127.0.0.1] [--port 8080] [--max-batch 64]
+#                                     [--max-delay-ms 2] [--conditions FILE]
+# Load test: python benchmarks/bench_http.py
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import crop_json
+import crop_reload
+import crop_server
+import model
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+MAX_BODY_BYTES = 64 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+def score_requests(features, options):
+    """
+    Scores a list of feature dicts in one vectorized call. options holds a
+    (top_k, include_incompatible, compact) tuple per request. Returns the list of
+    get_suitable_crops JSON strings, in request order.
+    """
+    engine = model.get_engine() # One version for the whole batch, even during a reload
+    percentages = model.score_batch(features, engine)
+    results = [None] * len(features)
+    groups = {}
+    for i, option in enumerate(options):
+        groups.setdefault(option, []).append(i)
+    for (top_k, include_incompatible, compact), rows in groups.items():
+        block = percentages if len(rows) == len(features) else percentages[rows]
+        for i, result in zip(rows, model.iter_batch_results(block, top_k, include_incompatible, compact, engine)):
+            results[i] = result
+    return results
+
+class MicroBatcher:
+    """
+    Collects requests on the event loop and scores them together, once max_batch
+    requests are waiting or max_delay seconds after the first one arrived.
+    """
+
+    def __init__(self, max_batch=64, max_delay=0.002):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = []
+        self._timer = None
+
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    def submit(self, features, top_k=None, include_incompatible=True, compact=False):
+        """
+        Queues one request and returns a future resolving to its JSON result.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, (top_k, include_incompatible, compact), future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self):
+        """
+        Scores everything that is waiting. Runs on the event loop: a batch of 64
+        takes well under a millisecond, less than handing it to a thread would cost.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        self.requests += len(pending)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(pending))
+        m = model.metrics
+        if m is not None:
+            start = time.perf_counter()
+        try:
+            if model.profiler is None:
+                results = score_requests([item[0] for item in pending], [item[1] for item in pending])
+            else:
+                with model.profiler.sample(): # 1 in N batches with --profile-every=N
+                    results = score_requests([item[0] for item in pending], [item[1] for item in pending])
+        except Exception:
+            # Score the batch's requests one by one, so only the ones that fail get the error
+            results = []
+            for features, options, _ in pending:
+                try:
+                    results.append(score_requests([features], [options])[0])
+                except Exception as e:
+                    results.append(e)
+        if m is not None:
+            m.lap('batch_scoring', start)
+            m.incr('requests', len(pending))
+            m.incr('batches')
+        for (_, _, future), result in zip(pending, results):
+            if future.done(): # The client may have disconnected meanwhile
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            'max_batch': self.max_batch,
+            'max_delay_ms': self.max_delay * 1000,
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch': self.requests / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+        }
+
+class HTTPService:
+    """
+    Routes HTTP requests to the scorer. Without a batcher every request is scored
+    on its own with model.get_suitable_crops.
+    """
+
+    def __init__(self, batcher=None, reloader=None):
+        self.batcher = batcher
+        self.reloader = reloader
+
+    async def recommend(self, body):
+        try:
+            features, top_k, include_incompatible, compact = crop_server.parse_request(crop_json.loads(body))
+        except (IndexError, ValueError, TypeError) as e:
+            return 400, crop_server.error_response(e)
+        if self.batcher is None:
+            if model.profiler is not None:
+                with model.profiler.sample():
+                    return 200, model.get_suitable_crops(features, top_k, include_incompatible, compact)
+            return 200, model.get_suitable_crops(features, top_k, include_incompatible, compact)
+        return 200, await self.batcher.submit(features, top_k, include_incompatible, compact)
+
+    async def respond(self, method, path, body):
+        """
+        Returns (status, JSON text) for one request.
+        """
+        path = path.split('?', 1)[0]
+        if path in ('/recommend', '/'):
+            if method != 'POST':
+                return 405, json.dumps({'error': "Use POST with a JSON body"})
+            return await self.recommend(body)
+        if path not in ('/crops', '/stats', '/health'):
+            return 404, json.dumps({'error': f"Unknown path {path}"})
+        if method != 'GET':
+            return 405, json.dumps({'error': "Use GET"})
+        if path == '/crops':
+            return 200, model.crop_dictionary()
+        if path == '/stats':
+            return 200, json.dumps({'batching': self.batcher.stats() if self.batcher is not None else None,
+                                    'reload': self.reloader.stats() if self.reloader is not None else None,
+                                    'metrics': model.metrics.snapshot() if model.metrics is not None else None})
+        return 200, '{"status": "ok"}'
+
+async def read_request(reader):
+    """
+    Reads one HTTP/1.x request. Returns (method, path, version, headers, body),
+    None when the client closed the connection, or (status, message) for a request
+    that cannot be read.
+    """
+    try:
+        line = await reader.readline()
+    except ValueError: # Longer than the stream limit (LimitOverrunError)
+        return 400, "Request line too long"
+    if not line:
+        return None
+    try:
+        method, path, version = line.decode('latin-1').split()
+    except ValueError:
+        return 400, "Malformed request line"
+    headers = {}
+    while True:
+        try:
+            line = await reader.readline()
+        except ValueError:
+            return 400, "Header line too long"
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = b''
+    if 'content-length' in headers:
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            length = -1
+        if length < 0:
+            return 400, "Invalid Content-Length"
+        if length > MAX_BODY_BYTES:
+            return 413, f"Request body larger than {MAX_BODY_BYTES} bytes"
+        body = await reader.readexactly(length)
+    elif 'transfer-encoding' in headers:
+        return 411, "Content-Length required (chunked bodies are not supported)"
+    return method, path, version, headers, body
+
+def format_response(status, text, keep_alive):
+    body = text.encode('utf-8')
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+async def handle_connection(reader, writer, service):
+    """
+    Serves one client connection: any number of keep-alive requests, answered in order.
+    """
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                break
+            if len(request) == 2:
+                writer.write(format_response(request[0], json.dumps({'error': request[1]}), False))
+                await writer.drain()
+                break
+            method, path, version, headers, body = request
+            try:
+                status, text = await service.respond(method, path, body)
+            except Exception as e:
+                print(f"Error: Unhandled {type(e).__name__} for {method} {path}: {e}", file=sys.stderr)
+                status, text = 500, json.dumps({'error': "Internal server error"})
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+            writer.write(format_response(status, text, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+            if model.metrics is not None:
+                model.metrics.maybe_emit() # Periodic report with --metrics
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+
+def create_service(max_batch=64, max_delay=0.002, conditions_path=None, reload_interval=2.0):
+    """
+    Prepares the scorer (engine compiled, conditions file loaded) and returns the
+    HTTPService. max_batch 1 disables micro-batching. The caller starts
+    service.reloader when reload_interval > 0.
+    """
+    # The NumPy import is paid once here, so always use the vectorized engine
+    model.use_vectorized_engine(True)
+    reloader = crop_reload.ConditionsReloader(conditions_path, interval=reload_interval)
+    reloader.load_initial()
+    model.get_index()
+    batcher = MicroBatcher(max_batch, max_delay) if max_batch > 1 else None
+    return HTTPService(batcher, reloader)
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = await asyncio.start_server(lambda r, w: handle_connection(r, w, service), host, port)
+    where = ', '.join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+    print(f"Crop scoring HTTP server listening on {where}", file=sys.stderr, flush=True)
+    async with server:
+        await server.serve_forever()
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='model.py --serve-http', description="Run the crop scoring HTTP server.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Bind address (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument('--max-batch', type=int, default=64,
+                        help="Requests scored together at most, 1 to disable batching (default: 64)")
+    parser.add_argument('--max-delay-ms', type=float, default=2.0,
+                        help="Milliseconds a request waits for others to batch with (default: 2)")
+    parser.add_argument('--conditions', default=os.environ.get(model.CONDITIONS_FILE_ENV),
+                        help="JSON/YAML crop conditions file (default: $CROP_CONDITIONS_FILE, or the built-in table)")
+    parser.add_argument('--reload-interval', type=float, default=2.0,
+                        help="Seconds between checks for a changed conditions file, 0 to disable (default: 2)")
+    args = parser.parse_args(argv)
+    if args.max_batch < 1 or args.max_delay_ms < 0:
+        parser.error("--max-batch must be at least 1 and --max-delay-ms non-negative")
+
+    try:
+        service = create_service(args.max_batch, args.max_delay_ms / 1000, args.conditions, args.reload_interval)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: Could not start the HTTP server: {e}", file=sys.stderr)
+        return 1
+    if args.reload_interval > 0:
+        service.reloader.start()
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: Could not start the HTTP server: {e}", file=sys.stderr)
+        return 1
+    finally:
+        service.reloader.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,134 @@
+# crop_index.py
+# Precomputed interval index over the compiled crop conditions.
+#
+# Instead of comparing an input against every crop's ranges, each feature is indexed once:
+#   - numerical features: the sorted distinct range endpoints split the axis into
+#     "slots" (each endpoint itself, and the open gaps between endpoints). Every crop
+#     whose range covers a slot is recorded in that slot's bitset (one bit per crop).
+#   - categorical features: an inverted list per category value, also stored as a bitset
+#     (the crop_engine membership tables, packed).
+# A query is a binary search per numerical feature plus a lookup per categorical feature,
+# giving ten precomputed bitsets. Unpacking and summing them yields per-crop match counts
+# without evaluating a single range or membership condition at query time. Crops with a
+# zero count are exactly the incompatible ones.
+
+import numpy as np
+
+from crop_engine import CATEGORICAL_FEATURES, NUMERICAL_FEATURES, category_code, is_present
+
+SLOT_BUILD_ROWS = 1024 # Slots materialized at once while building the numerical bitsets
+
+def _pack(mask):
+    """
+    Packs a boolean array along its last axis into bytes (bit i of the crop axis -> byte i // 8).
+    """
+    return np.packbits(mask, axis=-1, bitorder='little')
+
+class IntervalIndex:
+    """
+    Bitset index over a crop_engine.CompiledConditions table.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.num_crops = len(engine.crop_names)
+
+        self.endpoints = []       # per numerical feature: sorted distinct endpoints
+        self.slot_bitsets = []    # per numerical feature: (2 * endpoints + 1, bytes) covering crops
+        for col in range(len(NUMERICAL_FEATURES)):
+            defined = engine.numerical_defined[:, col]
+            lower = engine.lower[:, col]
+            upper = engine.upper[:, col]
+            endpoints = np.unique(np.concatenate([lower[defined], upper[defined]]))
+            self.endpoints.append(endpoints)
+            self.slot_bitsets.append(self._build_slots(endpoints, lower, upper, defined))
+
+        # Inverted lists per category code; the extra last row (unknown value) is empty
+        self.category_bitsets = [_pack(table) for table in engine.membership]
+
+        # Compatibility denominators depend only on which features the input has,
+        # so they are computed once per presence pattern (almost always "all ten")
+        self.defined = np.concatenate([engine.numerical_defined, engine.categorical_defined], axis=1).T
+        self._totals_by_presence = {}
+
+    def _build_slots(self, endpoints, lower, upper, defined):
+        """
+        Builds the covering-crop bitset of every slot. Slot 2i+1 is the endpoint
+        endpoints[i] itself; slot 2i is the open gap just below it (slot 0 is
+        everything below the first endpoint, the last slot everything above the last).
+        """
+        num_endpoints = len(endpoints)
+        # A representative value for each slot; gaps use their midpoint
+        representatives = np.empty(2 * num_endpoints + 1)
+        representatives[1::2] = endpoints
+        if num_endpoints:
+            representatives[0] = endpoints[0] - 1
+            representatives[2:-1:2] = (endpoints[:-1] + endpoints[1:]) / 2
+            representatives[-1] = endpoints[-1] + 1
+        else:
+            representatives[0] = 0.0
+
+        bitsets = np.zeros((len(representatives), (self.num_crops + 7) // 8), dtype=np.uint8)
+        for start in range(0, len(representatives), SLOT_BUILD_ROWS):
+            rep = representatives[start:start + SLOT_BUILD_ROWS, None]
+            bitsets[start:start + SLOT_BUILD_ROWS] = _pack((lower <= rep) & (rep <= upper) & defined)
+        return bitsets
+
+    def _slot(self, col, value):
+        endpoints = self.endpoints[col]
+        i = int(np.searchsorted(endpoints, value, side='left'))
+        if i < len(endpoints) and endpoints[i] == value:
+            return 2 * i + 1
+        return 2 * i
+
+    def _totals(self, present_cols):
+        """
+        Per-crop number of counted conditions for inputs having the features at
+        present_cols (indices into NUMERICAL_FEATURES + CATEGORICAL_FEATURES).
+        """
+        totals = self._totals_by_presence.get(present_cols)
+        if totals is None:
+            totals = self.defined[list(present_cols)].sum(axis=0, dtype=np.int64)
+            self._totals_by_presence[present_cols] = totals
+        return totals
+
+    def query(self, features_dict):
+        """
+        Finds the crops matching at least one condition of the input.
+        Returns (crop_ids, matched, total_conditions): crop indices in catalog order,
+        how many conditions each matches, and how many of its conditions were counted.
+        """
+        bitsets = []
+        present_cols = []
+        for col, key in enumerate(NUMERICAL_FEATURES):
+            input_val = features_dict.get(key)
+            if is_present(input_val):
+                present_cols.append(col)
+                bitsets.append(self.slot_bitsets[col][self._slot(col, input_val)])
+
+        for col, key in enumerate(CATEGORICAL_FEATURES):
+            input_val = features_dict.get(key)
+            if not is_present(input_val):
+                continue
+            present_cols.append(len(NUMERICAL_FEATURES) + col)
+            code = category_code(self.engine.vocab[key], input_val)
+            bitsets.append(self.category_bitsets[col][code])
+
+        if not bitsets:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        matched = np.unpackbits(np.stack(bitsets), axis=1, count=self.num_crops,
+                                bitorder='little').sum(axis=0, dtype=np.int64)
+        crop_ids = np.flatnonzero(matched)
+        return crop_ids, matched[crop_ids], self._totals(tuple(present_cols))[crop_ids]
+
+    def score(self, features_dict):
+        """
+        Same result as CompiledConditions.score (percentages for every crop in catalog
+        order), computed from the index: only candidate crops are filled in.
+        """
+        crop_ids, matched, total_conditions = self.query(features_dict)
+        percentages = np.zeros(self.num_crops)
+        # Same arithmetic as calculate_compatibility: (score / total_conditions) * 100
+        percentages[crop_ids] = (matched / total_conditions) * 100
+        return percentages
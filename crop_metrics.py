@@ -0,0 +1,138 @@
+# crop_metrics.py
+# Opt-in instrumentation: per-stage timings and counters for model.py, the batch scorer
+# and the scoring daemon.
+#
+# Enable it with the CROP_MODEL_METRICS environment variable or the --metrics[=SPEC] flag:
+#   json  (or 1, stderr)    one JSON object per report on stderr
+#   prom:PATH or PATH.prom  Prometheus text format written to PATH (replaced atomically,
+#                           as the node_exporter textfile collector expects)
+#
+# Stages (wall-clock seconds, with call counts): imports, argv_parse, scoring, sorting,
+# serialization, output, and read / workers for --batch. startup_cpu is the exception: the
+# CPU seconds the interpreter spent before model.py ran, since a process cannot time its
+# own startup on the wall clock. Counters: requests, crops_scored, conditions_evaluated,
+# cache_hits, cache_misses, rows.
+#
+# When disabled this module is never imported: model.metrics stays None and the hot
+# paths only pay an "is not None" check at each stage boundary.
+
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = 'CROP_MODEL_METRICS'
+PROMETHEUS_PREFIX = 'crop_model'
+
+class Metrics:
+    """
+    Thread-safe accumulator of stage timings and counters.
+    """
+
+    def __init__(self, path=None, flush_interval=10.0, clock=time.perf_counter):
+        """
+        path: Prometheus text file to write; None reports JSON on stderr
+        flush_interval: minimum seconds between reports from maybe_emit (long-running processes)
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.stages = {}   # name -> [calls, seconds]
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._next_flush = clock() + flush_interval
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                self.stages[stage] = [1, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+
+    def lap(self, stage, start):
+        """
+        Records the time since start for stage and returns the current time, so
+        consecutive stages can be chained: t = metrics.lap('scoring', t).
+        """
+        now = self.clock()
+        self.add_time(stage, now - start)
+        return now
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'stages': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self.stages.items()},
+                'counters': dict(self.counters),
+            }
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_seconds Time spent per processing stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds summary",
+        ]
+        for name, stage in snapshot['stages'].items():
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds_sum{{stage="{name}"}} {stage["seconds"]!r}')
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds_count{{stage="{name}"}} {stage["calls"]}')
+        for name, value in snapshot['counters'].items():
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name}_total counter")
+            lines.append(f"{PROMETHEUS_PREFIX}_{name}_total {value}")
+        return '\n'.join(lines) + '\n'
+
+    def emit(self):
+        """
+        Writes the current totals: a JSON line on stderr, or the Prometheus file.
+        """
+        if self.path is None:
+            print(json.dumps({'metrics': self.snapshot()}), file=sys.stderr, flush=True)
+            return
+        staging = f"{self.path}.{os.getpid()}.tmp"
+        with open(staging, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(staging, self.path)
+
+    def maybe_emit(self):
+        """
+        emit(), at most once per flush_interval. For long-running processes.
+        """
+        now = self.clock()
+        if now >= self._next_flush:
+            self._next_flush = now + self.flush_interval
+            self.emit()
+
+def peak_rss_mb():
+    """
+    Peak resident set size in MB of this process or its largest finished worker,
+    whichever is higher. None where the resource module is not available (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def from_spec(spec):
+    """
+    Creates a Metrics for a --metrics / CROP_MODEL_METRICS value, or returns None
+    if spec is empty or disables instrumentation ('0', 'off').
+    """
+    if not spec or spec.lower() in ('0', 'off', 'false', 'no'):
+        return None
+    if spec.lower() in ('1', 'json', 'stderr', 'on', 'true', 'yes'):
+        return Metrics()
+    if spec.startswith('prom:'):
+        return Metrics(path=spec[len('prom:'):])
+    if spec.endswith(('.prom', '.txt')):
+        return Metrics(path=spec)
+    raise ValueError(f"Unknown metrics output {spec!r} (use json, prom:PATH or a .prom file)")
@@ -0,0 +1,82 @@
+# crop_ml.py
+# Vectorized batch inference for the RandomForest crop model, and blending of its
+# probabilities with the rule-based compatibility percentages.
+#
+# The old ML path in model.py built a one-row pandas DataFrame and called
+# pipeline.predict once per request, which is mostly overhead. MLScorer instead
+# one-hot encodes whole batches with a precomputed category-to-column map
+# (crop_forest.FeatureLayout) and runs predict_proba once per batch, either with the
+# NumPy-only array export (crop_forest.ForestModel, preferred) or with the classifier
+# step of the pickled sklearn pipeline, skipping its ColumnTransformer.
+
+import os
+
+import numpy as np
+
+import crop_forest
+
+class MLScorer:
+    """
+    Batch predict_proba over feature dicts or columns, without building DataFrames.
+    """
+
+    def __init__(self, layout, predict_proba, classes):
+        self.layout = layout
+        self._predict_proba = predict_proba
+        self.classes = list(classes)
+        self._class_index = {name: i for i, name in enumerate(self.classes)}
+
+    @classmethod
+    def from_forest(cls, forest_model):
+        return cls(forest_model.layout, forest_model.predict_proba, forest_model.classes)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        layout = crop_forest.FeatureLayout.from_preprocessor(pipeline.named_steps['preprocessor'])
+        classifier = pipeline.named_steps['classifier']
+        return cls(layout, classifier.predict_proba, [str(c) for c in classifier.classes_])
+
+    def predict_proba(self, samples):
+        """
+        Class probabilities for a batch: samples is a list of feature dicts or a dict
+        of columns. Returns an (N, classes) array, columns in self.classes order.
+        """
+        return self._predict_proba(self.layout.encode(samples))
+
+    def crop_probabilities(self, samples, crop_names):
+        """
+        predict_proba re-ordered onto crop_names (e.g. the rule catalog). Crops the
+        model was not trained on get probability 0.
+        """
+        proba = self.predict_proba(samples)
+        aligned = np.zeros((len(proba), len(crop_names)))
+        for column, name in enumerate(crop_names):
+            index = self._class_index.get(name)
+            if index is not None:
+                aligned[:, column] = proba[:, index]
+        return aligned
+
+def blend(rule_percentages, ml_probabilities, ml_weight):
+    """
+    Weighted mix of rule-based compatibility percentages and ML probabilities (scaled to
+    percent), both shaped (N, crops) in the same crop order. ml_weight 0 gives the rule
+    scores unchanged, 1 gives the ML probabilities alone.
+    """
+    if not 0.0 <= ml_weight <= 1.0:
+        raise ValueError("ml_weight must be between 0 and 1")
+    if ml_weight == 0.0:
+        return rule_percentages
+    return (1.0 - ml_weight) * rule_percentages + ml_weight * 100.0 * ml_probabilities
+
+def load_scorer(forest_dir=crop_forest.DEFAULT_FOREST_DIR, pickle_path='crop_model.pkl'):
+    """
+    Returns an MLScorer for the array export if it exists (fast, NumPy only), else for
+    the pickled pipeline, else None.
+    """
+    if os.path.isdir(forest_dir):
+        return MLScorer.from_forest(crop_forest.ForestModel(forest_dir))
+    import model
+    pipeline = model.load_ml_pipeline(pickle_path)
+    if pipeline is None:
+        return None
+    return MLScorer.from_pipeline(pipeline)
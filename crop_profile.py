@@ -0,0 +1,229 @@
+# crop_profile.py
+# Built-in profiling: cProfile and tracemalloc captures of a run, or of sampled requests.
+#
+#   python model.py --profile[=PREFIX] [--profile-every=N] <usual arguments>
+#   python generate_crop_model.py --profile[=PREFIX] <usual arguments>
+#
+# Writes three files (PREFIX defaults to model_profile / generate_crop_model_profile):
+#   PREFIX.pstats      cProfile statistics: python -m pstats PREFIX.pstats, snakeviz, ...
+#   PREFIX.collapsed   collapsed stacks ("frame;frame;frame microseconds" per line) for
+#                      flamegraph.pl, speedscope or inferno, rebuilt from the cProfile
+#                      caller graph (time split across callers in proportion to each
+#                      caller's share of the callee's cumulative time; calls below
+#                      MIN_STACK_SHARE of the total are folded into their caller)
+#   PREFIX.alloc.txt   top allocation sites (tracemalloc, by file and line) of the memory
+#                      still held at the end of each profiled section, summed over the
+#                      sections, and the peak traced memory
+#
+# A single recommendation (and --raster, --sensitivity, the trainer) is profiled as a
+# whole. In --serve, --serve-http and --batch modes only 1 in every N requests (batch
+# chunks; HTTP micro-batches) is profiled, the first one included: unsampled requests
+# pay a counter increment, so --profile-every=1000 can stay on in production. The files
+# are rewritten at most every DUMP_INTERVAL seconds while sampling, and on exit. With
+# --batch --workers the worker processes are not profiled.
+#
+# Only the standard library is used; this module is imported only when profiling is on.
+
+import contextlib
+import cProfile
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+TOP_N = 25
+DUMP_INTERVAL = 60.0
+TRACEBACK_FRAMES = 1
+MAX_STACK_DEPTH = 128
+MIN_STACK_SHARE = 1e-4 # Calls below this fraction of the total time are folded into their caller
+_NOT_SAMPLED = contextlib.nullcontext()
+
+def frame_name(function):
+    """
+    Flame graph frame label for a pstats function key (filename, line, name).
+    """
+    filename, line, name = function
+    if filename == '~': # Built-in functions
+        label = name
+    else:
+        label = f"{os.path.basename(filename)}:{name}:{line}"
+    return label.replace(';', ',')
+
+def collapse_stats(stats, min_share=MIN_STACK_SHARE):
+    """
+    Collapsed stacks from a pstats.Stats: {"root;...;frame": microseconds of self time}.
+    Calls holding less than min_share of the total time are folded into their caller.
+    """
+    entries = stats.stats
+    children = {}
+    for callee, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            if caller in entries:
+                children.setdefault(caller, []).append(callee)
+    roots = [function for function, (_, _, _, _, callers) in entries.items()
+             if not any(caller in entries for caller in callers)]
+    minimum = min_share * sum(entries[function][3] for function in roots)
+    stacks = {}
+
+    def walk(function, path, cumulative):
+        _, _, own, total, _ = entries[function]
+        share = cumulative / total if total > 0 else 0.0
+        frames = path + (frame_name(function),)
+        rest = cumulative # Self time, plus the callees too small to get their own stacks
+        if len(frames) < MAX_STACK_DEPTH:
+            # The callees never get more than this frame's time minus its own: cumulative
+            # times overlap in recursive call chains (nested imports, ...), and this keeps
+            # the stacks adding up to the profiled time.
+            edges = [(callee, entries[callee][4][function][3] * share) for callee in children.get(function, ())]
+            spent = sum(edge for _, edge in edges)
+            scale = min(1.0, max(0.0, cumulative - own * share) / spent) if spent > 0 else 0.0
+            for callee, edge in edges:
+                if edge * scale >= minimum:
+                    walk(callee, frames, edge * scale)
+                    rest -= edge * scale
+        if rest > 0:
+            key = ';'.join(frames)
+            stacks[key] = stacks.get(key, 0) + rest * 1e6
+
+    for function in roots:
+        walk(function, (), entries[function][3])
+    return stacks
+
+class Profiler:
+    """
+    Accumulates cProfile statistics and tracemalloc allocation sites over profiled
+    sections, and writes them to PREFIX.pstats, PREFIX.collapsed and PREFIX.alloc.txt.
+    """
+
+    def __init__(self, prefix, every=1, top=TOP_N, trace_memory=True, dump_interval=DUMP_INTERVAL):
+        self.prefix = prefix
+        self.every = max(1, every)
+        self.top = top
+        self.trace_memory = trace_memory
+        self.dump_interval = dump_interval
+        self.samples = 0
+        self.peak_bytes = 0
+        self._profile = cProfile.Profile()
+        self._allocations = {} # (filename, line) -> [bytes, blocks]
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._dumped_samples = 0
+        self._next_dump = time.monotonic() + dump_interval
+
+    def sample(self):
+        """
+        Context manager around one request: profiles it if it is the first of a group
+        of every requests, otherwise does nothing. Sections running concurrently in
+        other threads are skipped.
+        """
+        if next(self._counter) % self.every or not self._lock.acquire(blocking=False):
+            return _NOT_SAMPLED
+        return _Section(self)
+
+    def _record(self, snapshot, peak):
+        self.samples += 1
+        self.peak_bytes = max(self.peak_bytes, peak)
+        if snapshot is None:
+            return
+        for statistic in snapshot.statistics('lineno'):
+            frame = statistic.traceback[0]
+            entry = self._allocations.setdefault((frame.filename, frame.lineno), [0, 0])
+            entry[0] += statistic.size
+            entry[1] += statistic.count
+
+    def paths(self):
+        return {kind: f"{self.prefix}.{kind}" for kind in ('pstats', 'collapsed', 'alloc.txt')}
+
+    def _write(self):
+        # Called with the lock held
+        if not self.samples:
+            return
+        paths = self.paths()
+        self._profile.dump_stats(paths['pstats'])
+        stacks = collapse_stats(pstats.Stats(paths['pstats']))
+        with open(paths['collapsed'], 'w', encoding='utf-8') as f:
+            for stack, micros in sorted(stacks.items()):
+                if round(micros):
+                    f.write(f"{stack} {round(micros)}\n")
+        with open(paths['alloc.txt'], 'w', encoding='utf-8') as f:
+            f.write(self.allocation_report())
+        self._dumped_samples = self.samples
+
+    def allocation_report(self):
+        lines = [f"# {self.samples} profiled section(s), 1 in {self.every}; "
+                 f"peak traced memory {self.peak_bytes / 1024:.1f} KiB",
+                 f"# Memory still held at the end of each section, summed; top {self.top} sites",
+                 f"{'KiB':>12} {'blocks':>9}  site"]
+        ranked = sorted(self._allocations.items(), key=lambda item: item[1][0], reverse=True)[:self.top]
+        for (filename, line), (size, count) in ranked:
+            lines.append(f"{size / 1024:>12.1f} {count:>9}  {filename}:{line}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self):
+        """
+        Writes the three files (nothing before the first profiled section).
+        """
+        with self._lock:
+            self._write()
+
+    def _maybe_dump(self):
+        # Called with the lock held, after a section
+        now = time.monotonic()
+        if now >= self._next_dump and self.samples > self._dumped_samples:
+            self._next_dump = now + self.dump_interval
+            self._write()
+
+    def report(self):
+        """
+        One line for stderr: what was profiled and where it was written.
+        """
+        if not self.samples:
+            return "Profile: no section was profiled"
+        return (f"Profile: {self.samples} section(s), peak traced memory {self.peak_bytes / 1024:.1f} KiB, "
+                f"written to {', '.join(self.paths().values())}")
+
+class _Section:
+    """
+    One profiled section; holds the Profiler's lock from sample() until it exits.
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.started_tracing = False
+
+    def __enter__(self):
+        if self.profiler.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+            self.started_tracing = True
+        self.profiler._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        profiler = self.profiler
+        profiler._profile.disable()
+        try:
+            snapshot, peak = None, 0
+            if self.started_tracing:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            profiler._record(snapshot, peak)
+            profiler._maybe_dump()
+        finally:
+            profiler._lock.release()
+
+def profile_call(prefix, function, *args, top=TOP_N):
+    """
+    Calls function(*args) as one profiled section, writes the files and reports
+    them on stderr. Returns the function's result.
+    """
+    profiler = Profiler(prefix, top=top)
+    try:
+        with profiler.sample():
+            return function(*args)
+    finally:
+        profiler.dump()
+        print(profiler.report(), file=sys.stderr)
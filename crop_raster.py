@@ -0,0 +1,265 @@
+# crop_raster.py
+# Region-scale scoring of gridded inputs: python model.py --raster INPUT_DIR --output OUT_DIR
+#
+# INPUT_DIR holds one .npy grid per feature, all of the same (rows, cols) shape and named
+# after the feature (case-insensitively, e.g. nitrogen.npy or Soil_Type.npy). A feature
+# without a grid is absent in every cell, like a missing key in a features dict.
+#   numerical features    any numeric dtype, NaN = no data
+#   categorical features  integer codes into the value lists of INPUT_DIR/categories.json,
+#                         e.g. {"Climate": ["Tropical", "Temperate", "Arid"], ...};
+#                         negative (or out of range) codes = no data
+#
+# Every cell is scored against every crop by the vectorized engine, with the same rules and
+# percentages as get_suitable_crops. Outputs in OUT_DIR, .npy files written through memory maps:
+#   best_crop.npy   (rows, cols) int16: catalog index of the most compatible crop (ties in
+#                   catalog order, as in the compatible list), -1 where none is compatible
+#   best_score.npy  (rows, cols) uint8: its percentage, rounded half up
+#   scores.npy      (crops, rows, cols) uint8, with --cube: the percentage map of every crop
+#   crops.json      the index -> crop name dictionary (as python model.py --crop-dictionary)
+#
+# The grid is processed in bands of whole rows (--tile-rows, default: about TILE_CELLS cells),
+# read from and written to the memory-mapped files, and each band is scored in blocks of
+# at most BLOCK_CELLS (cell, crop) pairs, so memory stays bounded however large the grid.
+# The files are mapped per band and unmapped after it, so the pages already processed do
+# not pile up in the resident set. Bands are scored by a pool of --workers processes
+# (default: all cores), each writing its own rows of the outputs.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import crop_metrics
+import model
+
+CATEGORIES_FILE = 'categories.json'
+TILE_CELLS = 1 << 18
+BLOCK_CELLS = 1 << 20
+NO_CROP = -1
+
+_worker = None # (RasterInputs, engine, output paths) of this process
+
+def find_grids(directory):
+    """
+    Maps feature names to the .npy files of directory, matched case-insensitively.
+    """
+    wanted = {name.lower(): name for name in model.FEATURE_NAMES}
+    grids = {}
+    for entry in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(entry)
+        if extension.lower() == '.npy' and stem.lower() in wanted:
+            grids[wanted[stem.lower()]] = os.path.join(directory, entry)
+    return grids
+
+def load_categories(directory, features):
+    """
+    The category value lists of the categorical features among features, from
+    directory/categories.json. Raises ValueError if one is missing.
+    """
+    needed = [key for key in model.CATEGORICAL_FEATURES if key in features]
+    if not needed:
+        return {}
+    try:
+        with open(os.path.join(directory, CATEGORIES_FILE), encoding='utf-8') as f:
+            categories = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"{CATEGORIES_FILE} is required to decode the grids of {', '.join(needed)}") from None
+    missing = [key for key in needed if not isinstance(categories.get(key), list)]
+    if missing:
+        raise ValueError(f"{CATEGORIES_FILE} has no value list for {', '.join(missing)}")
+    return {key: categories[key] for key in needed}
+
+class RasterInputs:
+    """
+    The feature grids of an input directory, with the lookup tables that translate
+    their category codes into the engine's.
+    Raises ValueError if the grids are missing or do not fit together.
+    """
+
+    def __init__(self, directory, engine):
+        self.paths = find_grids(directory)
+        if not self.paths:
+            raise ValueError(f"No feature grids (.npy) found in {directory}")
+        grids = self.open()
+        shapes = {grid.shape for grid in grids.values()}
+        if len(shapes) != 1 or len(next(iter(shapes))) != 2:
+            raise ValueError(f"Feature grids must be 2-D and all of the same shape, got {sorted(shapes)}")
+        self.shape = shapes.pop()
+        for key in model.CATEGORICAL_FEATURES:
+            if key in grids and not np.issubdtype(grids[key].dtype, np.integer):
+                raise ValueError(f"The {key} grid must hold integer category codes, got {grids[key].dtype}")
+
+        # Raster code -> engine code per categorical feature. Values the catalog never
+        # mentions get -1 (present, matches nothing); the extra last entry is for no data.
+        self.lookups = {}
+        for key, values in load_categories(directory, grids).items():
+            vocab = engine.vocab[key]
+            self.lookups[key] = np.array([vocab.get(value, -1) for value in values] + [-1], dtype=np.int64)
+
+    def open(self):
+        """
+        Memory-maps the grids: {feature name: read-only array}.
+        """
+        return {key: np.load(path, mmap_mode='r') for key, path in self.paths.items()}
+
+    def encode(self, row_start, row_stop):
+        """
+        Kernel inputs (see CompiledConditions.encode_columns) for the cells of rows
+        row_start:row_stop, in row-major order.
+        """
+        grids = self.open()
+        num_cells = (row_stop - row_start) * self.shape[1]
+        values = np.zeros((num_cells, len(model.NUMERICAL_FEATURES)))
+        numerical_present = np.zeros((num_cells, len(model.NUMERICAL_FEATURES)), dtype=bool)
+        for col, key in enumerate(model.NUMERICAL_FEATURES):
+            grid = grids.get(key)
+            if grid is None:
+                continue
+            column = np.asarray(grid[row_start:row_stop], dtype=float).reshape(-1)
+            present = ~np.isnan(column)
+            numerical_present[:, col] = present
+            values[:, col] = np.where(present, column, 0.0)
+
+        codes = np.full((num_cells, len(model.CATEGORICAL_FEATURES)), -1, dtype=np.int64)
+        categorical_present = np.zeros((num_cells, len(model.CATEGORICAL_FEATURES)), dtype=bool)
+        for col, key in enumerate(model.CATEGORICAL_FEATURES):
+            grid = grids.get(key)
+            if grid is None:
+                continue
+            lookup = self.lookups[key]
+            raw = np.asarray(grid[row_start:row_stop]).reshape(-1)
+            present = (raw >= 0) & (raw < len(lookup) - 1)
+            codes[:, col] = lookup[np.where(present, raw, len(lookup) - 1)]
+            categorical_present[:, col] = present
+        return values, numerical_present, codes, categorical_present
+
+def create_outputs(directory, shape, num_crops, cube=False):
+    """
+    Creates the output .npy files (see the header) and returns {name: path}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    outputs = {
+        'best_crop': (np.int16 if num_crops <= np.iinfo(np.int16).max else np.int32, shape),
+        'best_score': (np.uint8, shape),
+    }
+    if cube:
+        outputs['scores'] = (np.uint8, (num_crops,) + tuple(shape))
+    paths = {}
+    for name, (dtype, output_shape) in outputs.items():
+        paths[name] = os.path.join(directory, name + '.npy')
+        np.lib.format.open_memmap(paths[name], mode='w+', dtype=dtype, shape=output_shape).flush()
+    return paths
+
+def _open_worker(input_dir, output_paths, load_conditions=True):
+    """
+    Prepares this process for _score_band. Process pool initializer; the conditions
+    are loaded again for start methods that do not fork.
+    """
+    global _worker
+    model.use_vectorized_engine(True)
+    if load_conditions:
+        model.load_conditions_file()
+    engine = model.get_engine()
+    _worker = (RasterInputs(input_dir, engine), engine, output_paths)
+
+def _score_band(band):
+    """
+    Scores rows band[0]:band[1] and writes their results. Returns the number of cells.
+    """
+    row_start, row_stop = band
+    inputs, engine, output_paths = _worker
+    num_crops = len(engine.crop_names)
+    encoded = inputs.encode(row_start, row_stop)
+    num_cells = len(encoded[0])
+
+    # Flat views of the band's rows in the memory-mapped outputs
+    outputs = {name: np.load(path, mmap_mode='r+') for name, path in output_paths.items()}
+    best_crop = outputs['best_crop'][row_start:row_stop].reshape(-1)
+    best_score = outputs['best_score'][row_start:row_stop].reshape(-1)
+    cube = outputs.get('scores')
+    if cube is not None:
+        cube = cube[:, row_start:row_stop].reshape(num_crops, -1)
+
+    block = max(1, BLOCK_CELLS // max(1, num_crops))
+    for start in range(0, num_cells, block):
+        stop = min(start + block, num_cells)
+        percentages = engine.score_encoded(*(array[start:stop] for array in encoded))
+        best = np.argmax(percentages, axis=1) # First maximum: ties in catalog order
+        top = percentages[np.arange(stop - start), best]
+        best_crop[start:stop] = np.where(top > 0, best, NO_CROP)
+        best_score[start:stop] = top + 0.5
+        if cube is not None:
+            cube[:, start:stop] = percentages.T + 0.5
+    for output in outputs.values():
+        output.flush()
+    return num_cells
+
+def score_raster(input_dir, output_dir, cube=False, workers=None, tile_rows=None):
+    """
+    Scores every cell of the grids in input_dir and writes the outputs to output_dir
+    (see the header). workers defaults to the number of cores, tile_rows to bands of
+    about TILE_CELLS cells. Returns a stats dict with cells, crops, seconds,
+    cells_per_sec and peak_rss_mb.
+    Raises ValueError for unusable inputs.
+    """
+    start = time.perf_counter()
+    model.use_vectorized_engine(True)
+    engine = model.get_engine()
+    rows, cols = RasterInputs(input_dir, engine).shape
+    tile_rows = tile_rows or max(1, TILE_CELLS // max(1, cols))
+    bands = [(row, min(row + tile_rows, rows)) for row in range(0, rows, tile_rows)]
+    output_paths = create_outputs(output_dir, (rows, cols), len(engine.crop_names), cube)
+
+    workers = min(workers or os.cpu_count() or 1, max(1, len(bands)))
+    if workers > 1:
+        import multiprocessing
+        with multiprocessing.Pool(workers, initializer=_open_worker, initargs=(input_dir, output_paths)) as pool:
+            for _ in pool.imap_unordered(_score_band, bands):
+                pass
+    else:
+        _open_worker(input_dir, output_paths, load_conditions=False)
+        for band in bands:
+            _score_band(band)
+
+    with open(os.path.join(output_dir, 'crops.json'), 'w', encoding='utf-8') as f:
+        f.write(model.get_encoder(engine.crop_names).dictionary())
+    seconds = time.perf_counter() - start
+    return {
+        'cells': rows * cols,
+        'crops': len(engine.crop_names),
+        'seconds': seconds,
+        'cells_per_sec': rows * cols / seconds if seconds > 0 else 0.0,
+        'peak_rss_mb': crop_metrics.peak_rss_mb(),
+    }
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='model.py', description="Score gridded (.npy) inputs cell by cell.")
+    parser.add_argument('--raster', required=True, metavar='INPUT_DIR', help="Directory of feature grids (.npy)")
+    parser.add_argument('--output', required=True, metavar='OUT_DIR', help="Directory for the output grids")
+    parser.add_argument('--cube', action='store_true', help="Also write scores.npy, every crop's percentage map")
+    parser.add_argument('--workers', type=int, default=None, help="Number of scoring processes (default: all cores)")
+    parser.add_argument('--tile-rows', type=int, default=None,
+                        help=f"Grid rows per band (default: about {TILE_CELLS} cells)")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.tile_rows is not None and args.tile_rows < 1:
+        parser.error("--tile-rows must be at least 1")
+
+    try:
+        stats = score_raster(args.raster, args.output, args.cube, args.workers, args.tile_rows)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    report = (f"Scored {stats['cells']} cells x {stats['crops']} crops in {stats['seconds']:.2f} s "
+              f"({stats['cells_per_sec']:.0f} cells/s)")
+    if stats['peak_rss_mb'] is not None:
+        report += f", peak RSS {stats['peak_rss_mb']:.1f} MB"
+    print(report, file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
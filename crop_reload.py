@@ -0,0 +1,228 @@
+# crop_reload.py
+# Crop conditions from an external JSON/YAML file, and hot reloading of the conditions
+# and the trained model in long-running processes (the scoring daemon).
+#
+# The file maps crop names to their preferred conditions, in the same shape as
+# model.CROP_CONDITIONS (numerical ranges as [min, max] lists):
+#
+#   {"Rice": {"Nitrogen": [60, 90], ..., "Soil_Type": ["Clayey", "Loamy"], "Water_Availability": "High"}, ...}
+#
+# Use it with CROP_CONDITIONS_FILE=path (model.py, --batch) or --conditions path (--serve).
+# Write the built-in table out as a starting point: python crop_reload.py --export crop_conditions.json
+#
+# ConditionsReloader polls the conditions file and the model files (crop_model.pkl,
+# crop_model_forest/meta.json) for mtime changes from a background thread. A changed
+# version is fully loaded and compiled in that thread, then swapped in with a single
+# assignment (model.install_conditions / model.install_ml_scorer): requests in flight keep
+# the version they started with, and none of them waits for the rebuild. If the new file
+# is invalid the error is reported and the current version stays in place.
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+
+import model
+
+YAML_EXTENSIONS = ('.yaml', '.yml')
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def validate_conditions(conditions):
+    """
+    Checks a loaded conditions mapping and returns it in CROP_CONDITIONS form (numerical
+    ranges as (min, max) tuples). Raises ValueError describing the first problem found.
+    """
+    if not isinstance(conditions, dict) or not conditions:
+        raise ValueError("expected a non-empty mapping of crop names to conditions")
+    validated = {}
+    for crop_name, preferred in conditions.items():
+        if not isinstance(preferred, dict):
+            raise ValueError(f"{crop_name}: expected a mapping of feature names to conditions")
+        unknown = set(preferred) - set(model.FEATURE_NAMES)
+        if unknown:
+            raise ValueError(f"{crop_name}: unknown feature(s) {', '.join(sorted(map(str, unknown)))}")
+        crop = {}
+        for key, value in preferred.items():
+            if value is not None and key in model.NUMERICAL_FEATURES:
+                if (not isinstance(value, (list, tuple)) or len(value) != 2
+                        or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value)):
+                    raise ValueError(f"{crop_name}: {key} must be a [min, max] range")
+                if not all(math.isfinite(v) for v in value):
+                    raise ValueError(f"{crop_name}: {key} bounds must be finite numbers")
+                if value[0] > value[1]:
+                    raise ValueError(f"{crop_name}: {key} range has min {value[0]} above max {value[1]}")
+                value = tuple(value)
+            elif value is not None and not isinstance(value, (str, list)):
+                raise ValueError(f"{crop_name}: {key} must be a value or a list of values")
+            elif isinstance(value, list) and not all(isinstance(v, str) for v in value):
+                raise ValueError(f"{crop_name}: {key} values must be strings")
+            crop[key] = value
+        validated[str(crop_name)] = crop
+    return validated
+
+def load_conditions(path):
+    """
+    Reads and validates a crop conditions file (.json, or .yaml/.yml with PyYAML installed).
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith(YAML_EXTENSIONS):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("Reading YAML crop conditions requires PyYAML (pip install pyyaml)")
+            try:
+                conditions = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"invalid YAML: {e}")
+        else:
+            conditions = json.load(f)
+    return validate_conditions(conditions)
+
+def export_conditions(path, conditions=None):
+    """
+    Writes conditions (default: the current model.CROP_CONDITIONS) to a JSON file.
+    """
+    conditions = model.CROP_CONDITIONS if conditions is None else conditions
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(conditions, f, indent=2)
+        f.write('\n')
+
+class ConditionsReloader:
+    """
+    Watches the conditions file and the model files, and swaps in rebuilt versions
+    from a background thread.
+    """
+
+    def __init__(self, conditions_path=None, model_path='crop_model.pkl', forest_dir='crop_model_forest',
+                 interval=2.0):
+        """
+        conditions_path: JSON/YAML conditions file (None: keep the built-in table)
+        model_path, forest_dir: model files whose changes trigger a model reload
+        interval: seconds between checks
+        """
+        self.conditions_path = conditions_path
+        self.model_path = model_path
+        self.forest_dir = forest_dir
+        self.interval = interval
+
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+
+        self._conditions_stamp = None
+        self._model_stamp = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _model_files_stamp(self):
+        return (_file_stamp(self.model_path), _file_stamp(os.path.join(self.forest_dir, 'meta.json')))
+
+    def load_initial(self):
+        """
+        Loads the current versions synchronously (at startup). Errors propagate.
+        """
+        if self.conditions_path:
+            self._conditions_stamp = _file_stamp(self.conditions_path)
+            self._install_conditions(load_conditions(self.conditions_path))
+        self._model_stamp = self._model_files_stamp()
+
+    def _install_conditions(self, conditions):
+        # Compile here, outside any lock, so the swap itself is instantaneous
+        import crop_engine
+        import crop_index
+        index = crop_index.IntervalIndex(crop_engine.CompiledConditions(conditions, model.get_vocabulary().categories))
+        model.install_conditions(conditions, index=index)
+
+    def check(self):
+        """
+        Reloads whatever changed since the last check. Returns the list of what was
+        reloaded ('conditions', 'model'). Errors are recorded and reported on stderr;
+        the running version is kept.
+        """
+        reloaded = []
+        if self.conditions_path:
+            stamp = _file_stamp(self.conditions_path)
+            if stamp is not None and stamp != self._conditions_stamp:
+                self._conditions_stamp = stamp
+                if self._reload('conditions', lambda: self._install_conditions(load_conditions(self.conditions_path))):
+                    reloaded.append('conditions')
+        stamp = self._model_files_stamp()
+        if stamp != self._model_stamp:
+            self._model_stamp = stamp
+            if self._reload('model', self._reload_model):
+                reloaded.append('model')
+        return reloaded
+
+    def _reload_model(self):
+        if model.ml_scorer_loaded():
+            import crop_ml
+            model.install_ml_scorer(crop_ml.load_scorer(self.forest_dir, self.model_path))
+
+    def _reload(self, what, function):
+        try:
+            function()
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"{what}: {e}"
+            print(f"Reload of {what} failed, keeping the current version: {e}", file=sys.stderr, flush=True)
+            return False
+        self.reloads += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """
+        Starts the background polling thread.
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='crop-reloader', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            'conditions_path': self.conditions_path,
+            'conditions_version': model.conditions_version,
+            'reloads': self.reloads,
+            'errors': self.errors,
+            'last_error': self.last_error,
+        }
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Export or check a crop conditions file.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--export', metavar='PATH', help="Write the built-in CROP_CONDITIONS to a JSON file")
+    group.add_argument('--check', metavar='PATH', help="Validate a JSON/YAML conditions file")
+    args = parser.parse_args(argv)
+
+    if args.export:
+        export_conditions(args.export)
+        print(f"Wrote {len(model.CROP_CONDITIONS)} crops to '{args.export}'")
+        return 0
+    try:
+        conditions = load_conditions(args.check)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"'{args.check}' is valid ({len(conditions)} crops)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
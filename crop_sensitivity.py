@@ -0,0 +1,281 @@
+# crop_sensitivity.py
+# What-if analysis: how the compatibility of every crop changes as one or two features of
+# a base input vary.
+#
+#   python model.py --sensitivity <N> <P> <K> <climate> <humidity> <ph> <rainfall> <soil_type>
+#                   <topography> <water_availability> --sweep pH[=4:9:0.5] [--sweep Rainfall=100,200]
+#
+# A percentage is (conditions matched) / (conditions counted), summed over the ten features,
+# so only the swept features' terms change along a sweep. Sensitivity computes the match
+# vector (one flag per crop) of every feature of the base input once; a sweep evaluates
+# the swept features' conditions for all of its values in one array pass and adds the
+# unchanged vectors back. Results are the same percentages get_suitable_crops gives.
+#
+# A crop's compatibility only changes where a swept value enters or leaves its range, so
+# the exact breakpoints are the CROP_CONDITIONS endpoints: inside [low, high] (both ends
+# included) the crop scores its "inside" level, anywhere else its "outside" level. With two
+# features there are four levels (outside/inside for each). A sweep without values covers
+# every distinct state: each endpoint, a value between consecutive endpoints, and one
+# beyond each end (categorical features: every value the catalog knows).
+#
+# JSON output: {"features": [...], "values": [[...]], "crops": [per crop whose compatibility
+# depends on a swept feature: crop, base, conditions ([low, high] or the accepted values
+# per swept feature), breakpoints, levels, flips, compatibility over the sweep],
+# "unaffected": [{"crop", "compatibility"} per crop with no condition on the swept features]}.
+# breakpoints lists, per swept feature the crop has a condition on, the swept values where
+# its compatibility changes, in sweep order: {"value": v, "change": "enter"} where the
+# sweep enters the condition (v is the first value meeting it) and {"value": v, "change":
+# "leave"} where it leaves (v is the last value meeting it). Both ends are inclusive, so a
+# default sweep reports exactly [low, high]: enter at low, leave at high.
+# flips is true when the crop is incompatible at some level and compatible at another.
+
+import argparse
+import sys
+
+import numpy as np
+
+import crop_json
+import model
+from crop_engine import CATEGORICAL_FEATURES, NUMERICAL_FEATURES
+
+def parse_sweep(text):
+    """
+    Parses a --sweep value: FEATURE, FEATURE=START:STOP:STEP (STOP included) or
+    FEATURE=V1,V2,... Feature names are matched case-insensitively.
+    Returns (feature name, list of values or None for every distinct state).
+    Raises ValueError for an unknown feature or malformed values.
+    """
+    name, _, spec = text.partition('=')
+    names = {key.lower(): key for key in model.FEATURE_NAMES}
+    key = names.get(name.strip().lower())
+    if key is None:
+        raise ValueError(f"Unknown feature '{name}' (expected one of {', '.join(model.FEATURE_NAMES)})")
+    if not spec:
+        return key, None
+    if key in CATEGORICAL_FEATURES:
+        return key, [value.strip() for value in spec.split(',')]
+    if ':' in spec:
+        try:
+            start, stop, step = (float(part) for part in spec.split(':'))
+        except ValueError:
+            raise ValueError(f"Expected {key}=START:STOP:STEP, got '{spec}'") from None
+        if step <= 0 or stop < start:
+            raise ValueError(f"Empty sweep '{spec}': STEP must be positive and STOP not below START")
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        return key, np.round(start + step * np.arange(count), 10).tolist()
+    try:
+        return key, [float(value) for value in spec.split(',')]
+    except ValueError:
+        raise ValueError(f"Expected numbers for {key}, got '{spec}'") from None
+
+class Sensitivity:
+    """
+    Compatibility of every crop as one or two features of a base input vary, for a
+    crop_engine.CompiledConditions table.
+    """
+
+    def __init__(self, features_dict, engine):
+        self.engine = engine
+        self.features = dict(features_dict)
+        values, numerical_present, codes, categorical_present = engine.encode(features_dict)
+
+        # Per feature: which crops the base input matches, and which count the condition
+        self.matched = {}
+        self.counted = {}
+        for col, key in enumerate(NUMERICAL_FEATURES):
+            self.matched[key] = self.matches(key, values[col:col + 1])[0] & numerical_present[col]
+            self.counted[key] = engine.numerical_defined[:, col] & numerical_present[col]
+        for col, key in enumerate(CATEGORICAL_FEATURES):
+            self.matched[key] = engine.membership[col][codes[col]]
+            self.counted[key] = engine.categorical_defined[:, col] & categorical_present[col]
+
+    def defined(self, key):
+        """
+        Which crops have a condition on key.
+        """
+        if key in NUMERICAL_FEATURES:
+            return self.engine.numerical_defined[:, NUMERICAL_FEATURES.index(key)]
+        return self.engine.categorical_defined[:, CATEGORICAL_FEATURES.index(key)]
+
+    def matches(self, key, values):
+        """
+        (len(values), crops) boolean array: the crops whose condition on key each value meets.
+        """
+        engine = self.engine
+        if key in NUMERICAL_FEATURES:
+            col = NUMERICAL_FEATURES.index(key)
+            v = np.asarray(values, dtype=float)[:, None]
+            return (engine.lower[:, col] <= v) & (v <= engine.upper[:, col]) & engine.numerical_defined[:, col]
+        col = CATEGORICAL_FEATURES.index(key)
+        vocab = engine.vocab[key]
+        return engine.membership[col][[vocab.get(value, -1) for value in values]]
+
+    def states(self, key):
+        """
+        One value per distinct state of key: for a numerical feature every range endpoint,
+        a value between consecutive endpoints and one beyond each end; for a categorical
+        feature every value the catalog mentions.
+        """
+        if key in CATEGORICAL_FEATURES:
+            return list(self.engine.vocab[key])
+        col = NUMERICAL_FEATURES.index(key)
+        defined = self.engine.numerical_defined[:, col]
+        endpoints = np.unique(np.concatenate([self.engine.lower[defined, col], self.engine.upper[defined, col]]))
+        if not len(endpoints):
+            return [self.features.get(key) or 0.0]
+        states = np.empty(2 * len(endpoints) + 1)
+        states[1::2] = endpoints
+        states[0] = endpoints[0] - 1
+        states[2:-1:2] = (endpoints[:-1] + endpoints[1:]) / 2
+        states[-1] = endpoints[-1] + 1
+        return states.tolist()
+
+    def _split(self, keys):
+        # Matched and counted conditions of the features that do not change, swept features counted
+        other = np.zeros(len(self.engine.crop_names), dtype=np.int64)
+        total = np.zeros(len(self.engine.crop_names), dtype=np.int64)
+        for key in model.FEATURE_NAMES:
+            if key in keys:
+                total += self.defined(key)
+            else:
+                other += self.matched[key]
+                total += self.counted[key]
+        return other, total
+
+    @staticmethod
+    def _percentages(score, total):
+        # Same arithmetic as calculate_compatibility: (score / total_conditions) * 100
+        percentages = np.zeros(score.shape)
+        np.divide(score, total, out=percentages, where=total > 0)
+        return percentages * 100
+
+    def sweep(self, key, values, key2=None, values2=None):
+        """
+        Percentages of every crop (catalog order) with key set to each of values:
+        shape (len(values), crops); with a second feature, (len(values), len(values2), crops).
+        """
+        other, total = self._split((key, key2))
+        score = other + self.matches(key, values)
+        if key2 is not None:
+            score = score[:, None, :] + self.matches(key2, values2)[None, :, :]
+        return self._percentages(score, total)
+
+    def levels(self, keys):
+        """
+        The percentages each crop can reach along a sweep of keys, with its condition on
+        every swept feature failed (index 0) or met (index 1): shape (2,) * len(keys) + (crops,).
+        """
+        other, total = self._split(keys)
+        score = other
+        for axis, key in enumerate(keys):
+            met = np.array([np.zeros_like(other), self.defined(key).astype(np.int64)])
+            score = score[..., None, :] + met.reshape((1,) * axis + met.shape)
+        return self._percentages(score, total)
+
+    def base(self):
+        other, total = self._split(())
+        return self._percentages(other, total)
+
+    def condition(self, key, crop):
+        """
+        Crop's condition on key as JSON: [low, high] or the accepted values.
+        """
+        engine = self.engine
+        if key in NUMERICAL_FEATURES:
+            col = NUMERICAL_FEATURES.index(key)
+            return [float(engine.lower[crop, col]), float(engine.upper[crop, col])]
+        col = CATEGORICAL_FEATURES.index(key)
+        mask = int(engine.masks[crop, col])
+        return [value for value, code in engine.vocab[key].items() if mask >> code & 1]
+
+    def breakpoints(self, key, values, crops):
+        """
+        For each crop index in crops, the changes along a sweep of key over values: a list of
+        {"value", "change"} dicts, "enter" at the first value meeting the crop's condition
+        and "leave" at the last one (both ends inclusive, see the header).
+        """
+        met = self.matches(key, values)[:, crops]
+        changes = [[] for _ in range(len(crops))]
+        for step, position in zip(*np.nonzero(met[1:] != met[:-1])):
+            if met[step + 1, position]:
+                changes[position].append({'value': values[step + 1], 'change': 'enter'})
+            else:
+                changes[position].append({'value': values[step], 'change': 'leave'})
+        return changes
+
+    def report(self, key, values=None, key2=None, values2=None):
+        """
+        The JSON-ready analysis of a sweep (see the header). values default to every
+        distinct state of the feature.
+        """
+        keys = (key,) if key2 is None else (key, key2)
+        values = self.states(key) if values is None else list(values)
+        if key2 is not None:
+            values2 = self.states(key2) if values2 is None else list(values2)
+        percentages = self.sweep(key, values, key2, values2)
+        levels = self.levels(keys)
+        base = self.base().tolist()
+        defined = {k: self.defined(k) for k in keys}
+        affected = np.flatnonzero(np.logical_or.reduce(list(defined.values())))
+
+        # Crop-major copies, converted to Python lists in one call each
+        crop_levels = np.moveaxis(levels[..., affected], -1, 0)
+        flat_levels = crop_levels.reshape(len(affected), 2 ** len(keys))
+        flips = ((flat_levels.min(axis=1) <= 0) & (flat_levels.max(axis=1) > 0)).tolist()
+        crop_levels = crop_levels.tolist()
+        compatibility = np.moveaxis(percentages[..., affected], -1, 0).tolist()
+        breakpoints = {k: self.breakpoints(k, v, affected) for k, v in zip(keys, [values, values2])}
+
+        crops = []
+        for position, i in enumerate(affected.tolist()):
+            crops.append({
+                'crop': self.engine.crop_names[i],
+                'base': base[i],
+                'conditions': {k: self.condition(k, i) for k in keys if defined[k][i]},
+                'breakpoints': {k: breakpoints[k][position] for k in keys if defined[k][i]},
+                'levels': crop_levels[position] if key2 is not None else
+                          dict(zip(('outside', 'inside'), crop_levels[position])),
+                'flips': flips[position],
+                'compatibility': compatibility[position],
+            })
+        unaffected = [{'crop': self.engine.crop_names[i], 'compatibility': base[i]}
+                      for i in np.setdiff1d(np.arange(len(base)), affected).tolist()]
+        return {'features': list(keys), 'values': [values] if key2 is None else [values, values2],
+                'crops': crops, 'unaffected': unaffected}
+
+def analyze(features_dict, key, values=None, key2=None, values2=None):
+    """
+    Sensitivity report for features_dict swept over key (and key2), against the
+    current CROP_CONDITIONS. See Sensitivity.report.
+    """
+    return Sensitivity(features_dict, model.get_engine()).report(key, values, key2, values2)
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='model.py --sensitivity',
+                                     description="Sweep one or two features of an input and report every crop's "
+                                                 "compatibility and breakpoints.")
+    parser.add_argument('features', nargs=len(model.FEATURE_NAMES), metavar='FEATURE',
+                        help="The ten inputs, in python model.py order")
+    parser.add_argument('--sweep', action='append', required=True, metavar='FEATURE[=VALUES]',
+                        help="Feature to vary: FEATURE (every distinct state), FEATURE=START:STOP:STEP or "
+                             "FEATURE=V1,V2,...; give it twice for a two-feature sweep")
+    args = parser.parse_args(argv)
+    if len(args.sweep) > 2:
+        parser.error("--sweep can be given at most twice")
+
+    try:
+        sweeps = [parse_sweep(text) for text in args.sweep]
+        features = model.parse_features(args.features)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    if len(sweeps) == 2 and sweeps[0][0] == sweeps[1][0]:
+        print("Error: The two --sweep features must differ")
+        return 1
+    model.use_vectorized_engine(True)
+    (key, values), (key2, values2) = sweeps[0], sweeps[1] if len(sweeps) == 2 else (None, None)
+    print(crop_json.dumps(analyze(features, key, values, key2, values2)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
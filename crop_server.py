@@ -0,0 +1,209 @@
+# crop_server.py
+# Long-lived scoring daemon for model.py.
+#
+# Spawning "python model.py ..." for every form submit pays interpreter startup and
+# all module imports on each request. This server is started once
+# (python model.py --serve), keeps CROP_CONDITIONS compiled, and answers requests over
+# a Unix domain socket or localhost TCP.
+#
+# Protocol: one JSON request per line, one JSON response per line.
+#   Request:  a JSON array with the ten features in command-line order, e.g.
+#             [40, 20, 10, "Tropical", 70, 6.5, 150, "Loamy", "Flat", "High"]
+#             or a JSON object keyed by feature name ({"Nitrogen": 40, ...}), which may
+#             also set "top_k", "include_incompatible" and "compact" (see
+#             model.get_suitable_crops).
+#   Response: exactly the JSON printed by "python model.py ..." for the same input,
+#             or {"error": "..."} if the request could not be scored.
+#   {"command": "stats"} returns the result cache and reload counters (and the
+#   crop_metrics totals with --metrics) instead; {"command": "crops"} the crop dictionary
+#   that compact responses refer to (see crop_json.py).
+#
+# Repeated inputs are answered from a crop_cache.ResultCache (see --cache-size,
+# --cache-ttl and --cache-precision; --cache-size 0 disables it).
+#
+# Crop conditions can come from a JSON/YAML file (--conditions, or CROP_CONDITIONS_FILE).
+# That file and the model files are watched (--reload-interval) and changed versions are
+# rebuilt in the background and swapped in without a restart, see crop_reload.py.
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+
+import crop_cache
+import crop_json
+import crop_reload
+import model
+
+DEFAULT_SOCKET = os.environ.get('CROP_MODEL_SOCKET', '/tmp/crop_model.sock')
+DEFAULT_HOST = '127.0.0.1'
+
+def parse_request(payload):
+    """
+    Validates a decoded scoring request (feature array or object, see above).
+    Returns (features, top_k, include_incompatible, compact). Raises IndexError if
+    features are missing, ValueError or TypeError if the request is malformed.
+    """
+    top_k = None
+    include_incompatible = True
+    compact = False
+    if isinstance(payload, dict):
+        top_k = payload.get('top_k')
+        if top_k is not None and (not isinstance(top_k, int) or top_k < 0):
+            raise ValueError("top_k must be a non-negative integer")
+        include_incompatible = bool(payload.get('include_incompatible', True))
+        compact = bool(payload.get('compact', False))
+        values = [payload.get(key) for key in model.FEATURE_NAMES]
+        if any(value is None for value in values):
+            raise IndexError(len([v for v in values if v is not None]))
+    elif isinstance(payload, list):
+        values = payload
+    else:
+        raise TypeError("request must be a JSON array or object")
+    return model.parse_features(values), top_k, include_incompatible, compact
+
+def error_response(e):
+    """
+    The {"error": ...} response for an exception raised by parse_request.
+    """
+    if isinstance(e, IndexError):
+        return json.dumps({'error': f"Expected {len(model.FEATURE_NAMES)} features, received {e.args[0] if e.args else 'fewer'}"})
+    return json.dumps({'error': f"Invalid request: {e}"})
+
+def handle_request_line(line, cache=None, reloader=None):
+    """
+    Scores one request line and returns the response line (without newline).
+    Uses cache (a crop_cache.ResultCache) when given; reloader (a
+    crop_reload.ConditionsReloader) only feeds the stats command.
+    Never raises: errors are reported as {"error": ...} so a bad request
+    does not take down the connection.
+    """
+    try:
+        payload = crop_json.loads(line)
+        if isinstance(payload, dict) and 'command' in payload:
+            if payload['command'] == 'stats':
+                return json.dumps({'cache': cache.stats() if cache is not None else None,
+                                   'reload': reloader.stats() if reloader is not None else None,
+                                   'metrics': model.metrics.snapshot() if model.metrics is not None else None})
+            if payload['command'] == 'crops':
+                return model.crop_dictionary()
+            raise ValueError(f"unknown command {payload['command']!r}")
+        features, top_k, include_incompatible, compact = parse_request(payload)
+        if cache is not None:
+            return cache.get_suitable_crops(features, top_k, include_incompatible, compact)
+        return model.get_suitable_crops(features, top_k, include_incompatible, compact)
+    except (IndexError, ValueError, TypeError) as e:
+        return error_response(e)
+
+class ScoringHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one client connection. A client may send any number of requests,
+    one per line, and gets one response line for each.
+    """
+    def handle(self):
+        for raw_line in self.rfile:
+            line = raw_line.strip()
+            if not line:
+                continue
+            if model.profiler is None:
+                response = handle_request_line(line, self.server.result_cache, self.server.reloader)
+            else:
+                with model.profiler.sample(): # 1 in N requests with --profile-every=N
+                    response = handle_request_line(line, self.server.result_cache, self.server.reloader)
+            self.wfile.write(response.encode('utf-8') + b'\n')
+            self.wfile.flush()
+            if model.metrics is not None:
+                model.metrics.maybe_emit() # Periodic report with --metrics
+
+class UnixScoringServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class TCPScoringServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def create_server(socket_path=None, port=None, host=DEFAULT_HOST,
+                  cache_size=1024, cache_ttl=300.0, cache_precision=None,
+                  conditions_path=None, reload_interval=2.0):
+    """
+    Creates (but does not start) the scoring server. Uses TCP on host:port when
+    a port is given, otherwise a Unix domain socket at socket_path.
+    cache_size 0 disables the result cache. conditions_path loads the crop conditions
+    from a file; server.reloader.start() watches it and the model for changes every
+    reload_interval seconds.
+    """
+    if port is not None:
+        server = TCPScoringServer((host, port), ScoringHandler)
+    else:
+        socket_path = socket_path or DEFAULT_SOCKET
+        if os.path.exists(socket_path):
+            os.unlink(socket_path) # Stale socket from a previous run
+        server = UnixScoringServer(socket_path, ScoringHandler)
+    # The NumPy import is paid once here, so always use the vectorized engine
+    model.use_vectorized_engine(True)
+    server.reloader = crop_reload.ConditionsReloader(conditions_path, interval=reload_interval)
+    server.reloader.load_initial()
+    model.get_index()
+    server.result_cache = None
+    if cache_size > 0:
+        server.result_cache = crop_cache.ResultCache(maxsize=cache_size, ttl=cache_ttl, precision=cache_precision)
+    return server
+
+def request_recommendation(values, socket_path=None, port=None, host=DEFAULT_HOST, timeout=5.0):
+    """
+    Minimal Python client: sends one request and returns the raw JSON response string.
+    """
+    if port is not None:
+        sock = socket.create_connection((host, port), timeout=timeout)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(socket_path or DEFAULT_SOCKET)
+    with sock, sock.makefile('rwb') as stream:
+        stream.write(json.dumps(list(values)).encode('utf-8') + b'\n')
+        stream.flush()
+        return stream.readline().decode('utf-8').strip()
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='model.py --serve', description="Run the crop scoring daemon.")
+    parser.add_argument('--socket', default=None, help=f"Unix socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument('--port', type=int, default=None, help="Listen on localhost TCP instead of a Unix socket")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="TCP bind address (default: 127.0.0.1)")
+    parser.add_argument('--cache-size', type=int, default=1024, help="Cached results, 0 to disable (default: 1024)")
+    parser.add_argument('--cache-ttl', type=float, default=300.0, help="Seconds a cached result stays valid (default: 300)")
+    parser.add_argument('--cache-precision', type=int, default=None,
+                        help="Decimals numerical inputs are rounded to in cache keys; more hits, but inputs "
+                             "near a range boundary may share a result (default: exact keys)")
+    parser.add_argument('--conditions', default=os.environ.get(model.CONDITIONS_FILE_ENV),
+                        help="JSON/YAML crop conditions file (default: $CROP_CONDITIONS_FILE, or the built-in table)")
+    parser.add_argument('--reload-interval', type=float, default=2.0,
+                        help="Seconds between checks for changed conditions/model files, 0 to disable (default: 2)")
+    args = parser.parse_args(argv)
+
+    try:
+        server = create_server(args.socket, args.port, args.host,
+                               cache_size=args.cache_size, cache_ttl=args.cache_ttl,
+                               cache_precision=args.cache_precision,
+                               conditions_path=args.conditions, reload_interval=args.reload_interval)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: Could not start the scoring server: {e}", file=sys.stderr)
+        return 1
+    where = f"{args.host}:{args.port}" if args.port is not None else (args.socket or DEFAULT_SOCKET)
+    print(f"Crop scoring server listening on {where}", file=sys.stderr, flush=True)
+    if args.reload_interval > 0:
+        server.reloader.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.reloader.stop()
+        server.server_close()
+        if args.port is None and os.path.exists(args.socket or DEFAULT_SOCKET):
+            os.unlink(args.socket or DEFAULT_SOCKET)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
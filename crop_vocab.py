@@ -0,0 +1,260 @@
+# crop_vocab.py
+# Shared integer vocabularies of the crops and category values, and the consistency check
+# between the two hand-maintained crop tables: model.CROP_CONDITIONS (scoring rules) and
+# generate_crop_model's all_crops/base_conditions (training data).
+#
+#   python crop_vocab.py [--output crop_vocab.json] [--strict]   check the tables, write the artifact
+#   python crop_vocab.py --check [--strict]                      check the tables and the artifact on disk
+#
+# The single source of truth is CROP_CONDITIONS for the crops (their order gives the crop
+# codes, the indices of the crop dictionary) and CATEGORY_VALUES below for the categorical
+# features (list position = code). Errors (the build fails): crops missing from one table,
+# category values outside CATEGORY_VALUES, training rows missing a feature. Warnings
+# (errors with --strict): a categorical feature no crop rule uses (except RULELESS_FEATURES),
+# values neither table uses, training base values the crop's own rule rejects, an exported
+# model (crop_model_forest) whose one-hot columns do not follow the vocabulary.
+# The committed tables pass --strict, so python crop_vocab.py --check --strict can gate CI.
+#
+# crop_vocab.json: {"format_version": 1, "crops": [...], "categories": {feature: [values]}}
+# Both sides load it (model.get_vocabulary, generate_crop_model.py): crop_engine's category
+# bit positions and the trainer's category codes and one-hot columns all use its codes, so
+# a one-hot column of the model and a bit of the rule masks stand for the same value.
+# Values a custom catalog adds get the next codes after these.
+#
+# Only the standard library is imported at module level; the training tables are
+# imported only to check them.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+DEFAULT_VOCAB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crop_vocab.json')
+FORMAT_VERSION = 1
+
+# Accepted values of the categorical features, in code order. Sorted, like the columns
+# sklearn's OneHotEncoder picks by itself, so models trained before the vocabulary
+# existed already line up.
+CATEGORY_VALUES = {
+    'Climate': ['Arid', 'Temperate', 'Tropical'],
+    'Soil_Type': ['Clayey', 'Loamy', 'Peaty', 'Sandy', 'Silty'],
+    'Topography': ['Flat', 'Hilly', 'Sloped'],
+    'Water_Availability': ['High', 'Low', 'Medium'],
+}
+
+# Categorical features the crop rules leave out on purpose: CROP_CONDITIONS has no
+# Topography condition, only the trained model learns from it. No warning that no rule
+# uses them; their values are still checked.
+RULELESS_FEATURES = ('Topography',)
+
+class Vocabulary:
+    """
+    Crop names and category values with their integer codes (positions in the lists).
+    """
+
+    def __init__(self, crops, categories):
+        self.crops = list(crops)
+        self.categories = {key: list(values) for key, values in categories.items()}
+        self.crop_codes = {crop: code for code, crop in enumerate(self.crops)}
+        self.codes = {key: {value: code for code, value in enumerate(values)}
+                      for key, values in self.categories.items()}
+
+    def category_codes(self, conditions, features):
+        """
+        {feature: {value: code}} for features: these codes, then the next ones for values
+        only the crop conditions table mentions, in catalog order.
+        Raises TypeError for an unhashable condition value.
+        """
+        codes = {key: dict(self.codes.get(key, {})) for key in features}
+        for preferred in conditions.values():
+            for key in features:
+                preferred_val = (preferred or {}).get(key)
+                if preferred_val is None:
+                    continue
+                for value in _accepted(preferred_val):
+                    codes[key].setdefault(value, len(codes[key]))
+        return codes
+
+    def to_json(self):
+        return {'format_version': FORMAT_VERSION, 'crops': self.crops, 'categories': self.categories}
+
+    def __eq__(self, other):
+        return isinstance(other, Vocabulary) and self.to_json() == other.to_json()
+
+def compile_vocabulary(conditions=None):
+    """
+    The Vocabulary of a crop conditions table (default: model.CROP_CONDITIONS) and
+    CATEGORY_VALUES.
+    """
+    if conditions is None:
+        import model
+        conditions = model.CROP_CONDITIONS
+    return Vocabulary(conditions, CATEGORY_VALUES)
+
+def load_vocabulary(path=None):
+    """
+    The Vocabulary in the artifact at path (default: crop_vocab.json next to this file),
+    or compile_vocabulary() when there is none.
+    Raises ValueError for an unsupported artifact.
+    """
+    try:
+        with open(path or DEFAULT_VOCAB_PATH, encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return compile_vocabulary()
+    if data.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported vocabulary artifact version: {data.get('format_version')}")
+    return Vocabulary(data['crops'], data['categories'])
+
+def write_vocabulary(vocabulary, path=DEFAULT_VOCAB_PATH):
+    """
+    Writes the artifact through a temporary file renamed into place.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, staging = tempfile.mkstemp(prefix='.crop_vocab-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(vocabulary.to_json(), f, indent=1)
+            f.write('\n')
+        os.replace(staging, path)
+    except BaseException:
+        os.unlink(staging)
+        raise
+
+def _accepted(preferred_val):
+    return preferred_val if isinstance(preferred_val, list) else [preferred_val]
+
+def check_consistency(conditions, training_crops, training_conditions, training_keys=None):
+    """
+    Compares a crop conditions table with the training tables (crop list and per-crop
+    base values; training_keys maps feature names to base value keys, e.g. Nitrogen -> N)
+    and both with CATEGORY_VALUES. Returns (errors, warnings), lists of messages.
+    """
+    import model
+    training_keys = training_keys or {}
+    errors, warnings = [], []
+
+    crops = list(conditions)
+    same_crops = True
+    for label, names in (('all_crops', training_crops), ('base_conditions', list(training_conditions))):
+        missing = [crop for crop in crops if crop not in names]
+        extra = [crop for crop in names if crop not in conditions]
+        if missing:
+            errors.append(f"{label} lacks {len(missing)} crop(s) of CROP_CONDITIONS: {', '.join(missing)}")
+        if extra:
+            errors.append(f"{label} has {len(extra)} crop(s) CROP_CONDITIONS does not: {', '.join(extra)}")
+        same_crops = same_crops and not missing and not extra
+    if same_crops and list(training_crops) != crops:
+        warnings.append("all_crops lists the crops in a different order than CROP_CONDITIONS")
+
+    for key in model.CATEGORICAL_FEATURES:
+        known = CATEGORY_VALUES.get(key, [])
+        rule_values, training_values = set(), set()
+        for crop, preferred in conditions.items():
+            preferred_val = (preferred or {}).get(key)
+            if preferred_val is None:
+                continue
+            for value in _accepted(preferred_val):
+                rule_values.add(value)
+                if value not in known:
+                    errors.append(f"CROP_CONDITIONS['{crop}']['{key}']: '{value}' is not in CATEGORY_VALUES")
+        for crop, base in training_conditions.items():
+            value = base.get(training_keys.get(key, key))
+            if value is None:
+                continue
+            training_values.add(value)
+            if value not in known:
+                errors.append(f"base_conditions['{crop}']['{key}']: '{value}' is not in CATEGORY_VALUES")
+        if not rule_values and key not in RULELESS_FEATURES:
+            warnings.append(f"{key}: no crop rule uses it, so it never counts in the compatibility "
+                            f"(training data uses {', '.join(map(str, sorted(training_values))) or 'nothing'})")
+        unused = [value for value in known if value not in rule_values and value not in training_values]
+        if unused:
+            warnings.append(f"{key}: {', '.join(unused)} used by neither table")
+        if rule_values:
+            training_only = sorted(map(str, training_values - rule_values))
+            if training_only:
+                warnings.append(f"{key}: {', '.join(training_only)} only in the training data")
+
+    for crop, base in training_conditions.items():
+        missing = [key for key in model.FEATURE_NAMES if training_keys.get(key, key) not in base]
+        if missing:
+            errors.append(f"base_conditions['{crop}'] lacks {', '.join(missing)}")
+        preferred = conditions.get(crop) or {}
+        for key in model.FEATURE_NAMES:
+            value, rule = base.get(training_keys.get(key, key)), preferred.get(key)
+            if value is None or rule is None:
+                continue
+            if key in model.NUMERICAL_FEATURES:
+                rejected = not rule[0] <= value <= rule[1]
+            else:
+                rejected = value not in _accepted(rule)
+            if rejected:
+                warnings.append(f"base_conditions['{crop}']['{key}'] = {value!r} is outside its rule {rule!r}")
+    return errors, warnings
+
+def check_tables(trainer=None):
+    """
+    check_consistency for model.CROP_CONDITIONS and the tables of trainer (default:
+    the generate_crop_model module).
+    """
+    import model
+    if trainer is None:
+        import generate_crop_model as trainer
+    training_keys = {column: key for column, (key, _, _) in trainer.NUMERICAL_NOISE.items()}
+    return check_consistency(model.CROP_CONDITIONS, trainer.all_crops, trainer.base_conditions, training_keys)
+
+def check_model_layout(vocabulary, forest_dir):
+    """
+    Messages for the categorical features whose one-hot columns in the exported model
+    at forest_dir (crop_forest meta.json) differ from the vocabulary's codes.
+    """
+    try:
+        with open(os.path.join(forest_dir, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return []
+    return [f"{forest_dir}: one-hot columns of {key} are {values}, not {vocabulary.categories.get(key)} "
+            f"(retrain with python generate_crop_model.py)"
+            for key, values in meta.get('categories', {}).items() if values != vocabulary.categories.get(key)]
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Check the crop tables and compile the shared vocabulary artifact.")
+    parser.add_argument('--output', default=DEFAULT_VOCAB_PATH, help="Artifact path (default: crop_vocab.json)")
+    parser.add_argument('--check', action='store_true',
+                        help="Do not write; fail if the artifact on disk differs from the compiled one")
+    parser.add_argument('--forest-dir', default='crop_model_forest',
+                        help="Exported model whose one-hot columns are checked (default: crop_model_forest)")
+    parser.add_argument('--strict', action='store_true', help="Treat warnings as errors")
+    args = parser.parse_args(argv)
+
+    vocabulary = compile_vocabulary()
+    errors, warnings = check_tables()
+    warnings += check_model_layout(vocabulary, args.forest_dir)
+    for message in warnings:
+        print(f"Warning: {message}")
+    for message in errors:
+        print(f"Error: {message}")
+    if errors or (args.strict and warnings):
+        return 1
+
+    if args.check:
+        try:
+            with open(args.output, encoding='utf-8') as f:
+                current = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read {args.output}: {e}")
+            return 1
+        if current != vocabulary.to_json():
+            print(f"Error: {args.output} is out of date; run python crop_vocab.py")
+            return 1
+        print(f"{args.output} is up to date")
+        return 0
+    write_vocabulary(vocabulary, args.output)
+    sizes = ', '.join(f"{key} {len(values)}" for key, values in vocabulary.categories.items())
+    print(f"Wrote {args.output}: {len(vocabulary.crops)} crops; {sizes}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -69,5 +69,20 @@ ADD COLUMN `topography` VARCHAR(50) AFTER `soil_type`;
 ALTER TABLE `predictions`
 ADD COLUMN `water_availability` VARCHAR(50) AFTER `topography`;
 
+-- Compact results written by crop_db.PredictionWriter (see crop_db.py): predicted_crop
+-- holds the most compatible crop and crop_scores the whole ranking as packed
+-- (crop index, score) pairs, the indices referring to the crop_catalogs row of `catalog`.
+ALTER TABLE `predictions`
+ADD COLUMN `crop_scores` BLOB AFTER `prediction_time`,
+ADD COLUMN `catalog` CHAR(8) AFTER `crop_scores`,
+ADD KEY `user_time` (`user_id`, `prediction_time`),
+ADD KEY `prediction_time` (`prediction_time`, `id`);
+
+CREATE TABLE `crop_catalogs` (
+  `catalog` char(8) NOT NULL,
+  `crop_names` text NOT NULL,
+  PRIMARY KEY (`catalog`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- You can manually set a user to be an admin by running this SQL command:
 -- UPDATE users SET role = 'admin' WHERE username = 'your_admin_username';
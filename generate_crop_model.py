@@ -4,17 +4,43 @@
 # YOU NEED TO REPLACE THE DUMMY DATA AND MODEL TRAINING WITH YOUR ACTUAL DATA AND PROCESS.
 # For the model to "process each crop according to their preferred conditions,"
 # your training data MUST contain examples of these preferred conditions for each crop.
+#
+# Usage: python generate_crop_model.py [--samples N] [--seed S] [--n-jobs J] [--n-estimators T]
+#        python generate_crop_model.py --samples 5000000 --data-output samples.parquet --no-train
+#        python generate_crop_model.py --data samples.parquet
+#        python generate_crop_model.py --incremental [--db crop_recommendation.sqlite] [--add-trees T] [--compare-full]
+#        Any form also accepts --profile[=PREFIX] (see crop_profile.py)
+#
+# Samples are drawn for all crops at once with vectorized NumPy RNG calls, so millions of
+# rows take seconds; --data-output writes them to CSV/Parquet chunk by chunk (bounded memory).
+# Training uses all CPU cores by default (--n-jobs -1). Timings and peak memory are reported.
+#
+# --incremental loads the existing crop_model.pkl and grows its forest (warm_start) with
+# trees trained only on the prediction rows stored since the last run, tracked by a
+# watermark on predictions.prediction_time in the SQLite stand-in for database.sql (crop_db.py).
+# The pickle and the array export are swapped in atomically before the watermark moves.
+#
+# Generated data and the one-hot encoder use the crop order and category codes of
+# crop_vocab.json, shared with the scorer; the crop tables must pass its consistency
+# check (python crop_vocab.py) before data is generated.
+#
+# pandas and sklearn are only imported when needed, so the crop tables below
+# (all_crops, base_conditions) can be imported cheaply by other scripts.
 
-import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
+import argparse
+import os
 import pickle
+import sys
+import tempfile
+import time
 
-print("Starting model generation script...")
+import numpy as np
+
+import crop_db
+import crop_forest
+import crop_metrics
+import crop_vocab
+import model
 
 # --- 1. Prepare Dummy Data (REPLACE THIS WITH YOUR ACTUAL DATASET) ---
 # Your real data should have columns for:
@@ -41,9 +67,12 @@ all_crops = [
     'Spinach', 'Strawberry', 'Sweet potato', 'Tangerine', 'Taro', 'Yam', 'Watermelon'
 ]
 
-# Generate dummy data for 100 samples, cycling through the expanded crop list
-num_samples = 100
-np.random.seed(42) # for reproducibility
+# Generate dummy data for 100 samples by default, cycling through the expanded crop list
+DEFAULT_NUM_SAMPLES = 100
+DEFAULT_SEED = 42 # for reproducibility
+DEFAULT_CHUNK_SIZE = 1000000 # Rows generated and written at once with --data-output
+DEFAULT_PROFILE_PREFIX = 'generate_crop_model_profile' # --profile output files
+WATERMARK_NAME = 'crop_model' # Row in the watermarks table tracking what --incremental has trained on
 
 # Create base data points for each crop type
 # This is a simplified way to create 'plausible' data for each crop
@@ -110,98 +139,406 @@ base_conditions = {
     'Watermelon': {'N': 75, 'P': 40, 'K': 85, 'Climate': 'Tropical', 'Humidity': 70, 'pH': 6.5, 'Rainfall': 90, 'Soil_Type': 'Sandy', 'Topography': 'Flat', 'Water_Availability': 'Medium'},
 }
 
-# Create lists to hold the data for the DataFrame
-nitrogen_data = []
-phosphorus_data = []
-potassium_data = []
-climate_data = []
-humidity_data = []
-ph_data = []
-rainfall_data = []
-soil_type_data = []
-topography_data = []
-water_availability_data = []
-recommended_crop_data = []
-
-# Populate the lists by cycling through the crops and adding some noise
-for i in range(num_samples):
-    crop_name = all_crops[i % len(all_crops)] # Cycle through all crops
-    base = base_conditions[crop_name]
-
-    # Add some random noise to numerical features
-    nitrogen_data.append(max(0, base['N'] + np.random.randint(-10, 10)))
-    phosphorus_data.append(max(0, base['P'] + np.random.randint(-5, 5)))
-    potassium_data.append(max(0, base['K'] + np.random.randint(-10, 10)))
-    humidity_data.append(max(0, min(100, base['Humidity'] + np.random.randint(-5, 5))))
-    ph_data.append(max(0.0, min(14.0, round(base['pH'] + np.random.uniform(-0.5, 0.5), 1))))
-    rainfall_data.append(max(0, base['Rainfall'] + np.random.randint(-20, 20)))
-
-    # Categorical features remain the same for simplicity or can be varied if needed
-    climate_data.append(base['Climate'])
-    soil_type_data.append(np.random.choice(base['Soil_Type']) if isinstance(base['Soil_Type'], list) else base['Soil_Type'])
-    topography_data.append(base['Topography'])
-    water_availability_data.append(base['Water_Availability'])
-    recommended_crop_data.append(crop_name)
-
-data = {
-    'Nitrogen': nitrogen_data,
-    'Phosphorus': phosphorus_data,
-    'Potassium': potassium_data,
-    'Climate': climate_data,
-    'Humidity': humidity_data,
-    'pH': ph_data,
-    'Rainfall': rainfall_data,
-    'Soil_Type': soil_type_data,
-    'Topography': topography_data,
-    'Water_Availability': water_availability_data,
-    'Recommended_Crop': recommended_crop_data,
-}
-
-df = pd.DataFrame(data)
-
-# Define features (X) and target (y)
-X = df[['Nitrogen', 'Phosphorus', 'Potassium', 'Climate', 'Humidity', 'pH', 'Rainfall',
-        'Soil_Type', 'Topography', 'Water_Availability']]
-y = df['Recommended_Crop']
+FEATURE_COLUMNS = ['Nitrogen', 'Phosphorus', 'Potassium', 'Climate', 'Humidity', 'pH', 'Rainfall',
+                   'Soil_Type', 'Topography', 'Water_Availability']
+TARGET_COLUMN = 'Recommended_Crop'
 
 # Identify categorical and numerical features
 categorical_features = ['Climate', 'Soil_Type', 'Topography', 'Water_Availability']
 numerical_features = ['Nitrogen', 'Phosphorus', 'Potassium', 'Humidity', 'pH', 'Rainfall']
 
-# Create a column transformer for preprocessing
-# This will apply OneHotEncoder to categorical features and pass numerical features through
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features),
-        ('num', 'passthrough', numerical_features)
-    ])
-
-# --- 2. Train a Machine Learning Model (REPLACE RandomForestClassifier if needed) ---
-# Create a pipeline that first preprocesses the data and then trains the model
-model_pipeline = Pipeline(steps=[('preprocessor', preprocessor),
-                               ('classifier', RandomForestClassifier(random_state=42))])
-
-# Split data into training and testing sets (optional, but good practice)
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Train the model
-print("Training the model...")
-model_pipeline.fit(X_train, y_train)
-print("Model training complete.")
-
-# Evaluate the model (optional)
-accuracy = model_pipeline.score(X_test, y_test)
-print(f"Model accuracy on test set: {accuracy:.2f}")
-
-# --- 3. Save the Trained Model and Preprocessor ---
-# It's best practice to save the entire pipeline, including the preprocessor,
-# so that when you load the model, it knows how to transform new data.
-model_filename = 'crop_model.pkl'
-try:
-    with open(model_filename, 'wb') as file:
-        pickle.dump(model_pipeline, file)
-    print(f"Model saved successfully as '{model_filename}'")
-except Exception as e:
-    print(f"Error saving model: {e}")
-
-print("Script finished.")
+# Random noise added to each base value: numerical column -> (base_conditions key, low, high).
+# Integer noise is drawn from [low, high), like np.random.randint.
+NUMERICAL_NOISE = {
+    'Nitrogen': ('N', -10, 10),
+    'Phosphorus': ('P', -5, 5),
+    'Potassium': ('K', -10, 10),
+    'Humidity': ('Humidity', -5, 5),
+    'Rainfall': ('Rainfall', -20, 20),
+}
+
+class SampleGenerator:
+    """
+    Vectorized generator of training rows from base_conditions. The per-crop base values
+    are compiled into arrays once; each call then draws a whole batch of rows with a
+    handful of RNG calls instead of several per row.
+    vocabulary: a crop_vocab.Vocabulary whose category codes the categorical columns use
+    (values it lacks are appended); without one, each column's values are sorted.
+    """
+
+    def __init__(self, crops=None, conditions=None, seed=DEFAULT_SEED, vocabulary=None):
+        self.crops = list(all_crops if crops is None else crops)
+        conditions = base_conditions if conditions is None else conditions
+        self.rng = np.random.default_rng(seed)
+        self.position = 0 # Rows generated so far; rows keep cycling through the crops
+
+        # Integer base values stay integer arrays, so generated N/P/K etc. are whole numbers
+        self.base = {key: np.array([conditions[crop][key] for crop in self.crops])
+                     for key in ('N', 'P', 'K', 'Humidity', 'pH', 'Rainfall')}
+        # Categorical features: category list plus a padded (crops, options) table of codes,
+        # so crops listing several allowed values (e.g. a list of soil types) pick one per row
+        self.categories = {}
+        self.option_codes = {}
+        self.option_counts = {}
+        for name in categorical_features:
+            options = [conditions[crop][name] for crop in self.crops]
+            options = [value if isinstance(value, list) else [value] for value in options]
+            used = sorted({value for values in options for value in values})
+            categories = list(vocabulary.categories.get(name, [])) if vocabulary is not None else []
+            categories += [value for value in used if value not in categories]
+            codes = {value: code for code, value in enumerate(categories)}
+            table = np.zeros((len(self.crops), max(len(values) for values in options)), dtype=np.int32)
+            for row, values in enumerate(options):
+                table[row, :len(values)] = [codes[value] for value in values]
+            self.categories[name] = categories
+            self.option_codes[name] = table
+            self.option_counts[name] = np.array([len(values) for values in options])
+
+    def generate(self, num_rows):
+        """
+        Returns the next num_rows samples as a pandas DataFrame (FEATURE_COLUMNS plus
+        Recommended_Crop; categorical columns use the pandas category dtype).
+        """
+        import pandas as pd
+        crop_ids = (self.position + np.arange(num_rows)) % len(self.crops)
+        self.position += num_rows
+
+        columns = {}
+        # Add some random noise to numerical features
+        for column, (key, low, high) in NUMERICAL_NOISE.items():
+            columns[column] = np.maximum(0, self.base[key][crop_ids] + self.rng.integers(low, high, num_rows))
+        columns['Humidity'] = np.minimum(100, columns['Humidity'])
+        columns['pH'] = np.clip(np.round(self.base['pH'][crop_ids] + self.rng.uniform(-0.5, 0.5, num_rows), 1), 0.0, 14.0)
+
+        # Categorical features remain the same per crop, unless it lists several options
+        for name in categorical_features:
+            counts = self.option_counts[name][crop_ids]
+            if counts.max() > 1:
+                choice = (self.rng.random(num_rows) * counts).astype(np.int64)
+            else:
+                choice = np.zeros(num_rows, dtype=np.int64)
+            codes = self.option_codes[name][crop_ids, choice]
+            columns[name] = pd.Categorical.from_codes(codes, categories=self.categories[name])
+        columns[TARGET_COLUMN] = pd.Categorical.from_codes(crop_ids, categories=self.crops)
+
+        return pd.DataFrame({column: columns[column] for column in FEATURE_COLUMNS + [TARGET_COLUMN]})
+
+    def iter_chunks(self, num_samples, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Yields num_samples rows as DataFrames of at most chunk_size rows.
+        """
+        for start in range(0, num_samples, chunk_size):
+            yield self.generate(min(chunk_size, num_samples - start))
+
+def write_samples(path, chunks):
+    """
+    Writes DataFrame chunks to a .parquet (needs pyarrow) or .csv file one chunk at a
+    time, so the whole dataset never has to fit in memory. Returns the number of rows.
+    """
+    num_rows = 0
+    if path.lower().endswith('.parquet'):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Writing Parquet requires pyarrow (pip install pyarrow), or use a .csv file")
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                num_rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            for chunk in chunks:
+                chunk.to_csv(f, header=num_rows == 0, index=False)
+                num_rows += len(chunk)
+    return num_rows
+
+def read_samples(path):
+    """
+    Loads a dataset written by write_samples (or any CSV/Parquet with the same columns).
+    """
+    import pandas as pd
+    if path.lower().endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+def build_pipeline(n_jobs=-1, n_estimators=100, random_state=42, categories=None):
+    """
+    One-hot encoding for the categorical features + RandomForestClassifier, trained on
+    n_jobs cores (-1: all of them). categories ({feature: [values]}, e.g. the shared
+    crop_vocab categories) fixes the one-hot columns and their order; by default they
+    are the values seen in training, sorted.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    # Create a column transformer for preprocessing
+    # This will apply OneHotEncoder to categorical features and pass numerical features through
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('cat', OneHotEncoder(categories=[categories[name] for name in categorical_features] if categories else 'auto',
+                                  handle_unknown='ignore'), categorical_features),
+            ('num', 'passthrough', numerical_features)
+        ])
+
+    # Create a pipeline that first preprocesses the data and then trains the model
+    return Pipeline(steps=[('preprocessor', preprocessor),
+                           ('classifier', RandomForestClassifier(n_estimators=n_estimators, n_jobs=n_jobs,
+                                                                 random_state=random_state))])
+
+def grow_forest(pipeline, features, labels, add_trees=10, n_jobs=-1):
+    """
+    Adds add_trees trees, trained on the new rows only, to the pipeline's forest (warm_start).
+    features is a dict of columns, labels the crop names. The fitted encoder is kept as is
+    (unseen categories are ignored), and rows labelled with a crop the model does not know
+    are dropped, since adding a class needs a full retrain. Returns the number of rows used.
+    """
+    import pandas as pd
+
+    classifier = pipeline.named_steps['classifier']
+    classes = [str(c) for c in classifier.classes_]
+    known = set(classes)
+    keep = [i for i, label in enumerate(labels) if label in known]
+    if not keep:
+        return 0
+    X_new = pd.DataFrame({name: [features[name][i] for i in keep] for name in FEATURE_COLUMNS})
+    X_new[numerical_features] = X_new[numerical_features].astype(float)
+    y_new = [labels[i] for i in keep]
+
+    # fit() recomputes classes_ from y, and all trees must share the same output columns,
+    # so one zero-weight row per known class is appended: classes_ stays unchanged while
+    # the new trees are shaped by the new rows alone.
+    anchors = X_new.iloc[[0] * len(classes)]
+    X_fit = pipeline.named_steps['preprocessor'].transform(pd.concat([X_new, anchors]))
+    y_fit = np.array(y_new + classes, dtype=object)
+    weights = np.concatenate([np.ones(len(y_new)), np.zeros(len(classes))])
+
+    classifier.set_params(warm_start=True, n_estimators=len(classifier.estimators_) + add_trees, n_jobs=n_jobs)
+    classifier.fit(X_fit, y_fit, sample_weight=weights)
+    classifier.set_params(warm_start=False)
+    return len(keep)
+
+def save_pipeline(pipeline, path):
+    """
+    Pickles the pipeline to a temporary file next to path and renames it into place,
+    so readers never load a half-written model.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, staging = tempfile.mkstemp(prefix='.crop_model-', suffix='.pkl', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(pipeline, file)
+        os.replace(staging, path)
+    except BaseException:
+        os.unlink(staging)
+        raise
+
+class StageTimer:
+    """
+    Records wall time per named stage and prints it as the stage finishes.
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    def run(self, name, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.timings[name] = time.perf_counter() - start
+        print(f"  {name}: {self.timings[name]:.2f} s")
+        return result
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Generate crop training data and train crop_model.pkl.",
+                                     epilog=f"--profile[=PREFIX]: profile the run (cProfile + tracemalloc of the main "
+                                            f"thread) into PREFIX.pstats, .collapsed and .alloc.txt (default prefix: "
+                                            f"{DEFAULT_PROFILE_PREFIX})")
+    parser.add_argument('--samples', type=int, default=DEFAULT_NUM_SAMPLES,
+                        help=f"Number of generated samples (default: {DEFAULT_NUM_SAMPLES})")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f"Random seed (default: {DEFAULT_SEED})")
+    parser.add_argument('--data', default=None, help="Train on this .csv/.parquet dataset instead of generating one")
+    parser.add_argument('--data-output', default=None, help="Write the generated samples to this .csv/.parquet file")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows generated and written per chunk with --data-output (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--no-train', action='store_true', help="Only generate data (use with --data-output)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="CPU cores used for training (default: -1, all)")
+    parser.add_argument('--n-estimators', type=int, default=100, help="Number of trees (default: 100)")
+    parser.add_argument('--test-size', type=float, default=0.2, help="Held-out fraction for evaluation (default: 0.2)")
+    parser.add_argument('--model', default='crop_model.pkl', help="Pickled pipeline output (default: crop_model.pkl)")
+    parser.add_argument('--forest-dir', default=crop_forest.DEFAULT_FOREST_DIR,
+                        help=f"Array model output directory (default: {crop_forest.DEFAULT_FOREST_DIR})")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Grow the existing model with the predictions stored since the last run")
+    parser.add_argument('--db', default=crop_db.DEFAULT_DB_PATH,
+                        help=f"SQLite predictions database for --incremental (default: {crop_db.DEFAULT_DB_PATH})")
+    parser.add_argument('--add-trees', type=int, default=10, help="Trees added per --incremental run (default: 10)")
+    parser.add_argument('--compare-full', action='store_true',
+                        help="With --incremental, also time a full retrain on all data (not saved)")
+    # Same --profile[=PREFIX] syntax as model.py, parsed by the same function
+    try:
+        argv, profile_prefix, profile_every = model.split_profile_options(argv, DEFAULT_PROFILE_PREFIX)
+    except ValueError as e:
+        parser.error(str(e))
+    args = parser.parse_args(argv)
+    if profile_every != 1:
+        parser.error("--profile-every only applies to model.py's --serve, --serve-http and --batch modes")
+    if args.incremental:
+        if args.add_trees < 1:
+            parser.error("--add-trees must be at least 1")
+    else:
+        if args.samples < 1:
+            parser.error("--samples must be at least 1")
+        if args.chunk_size < 1:
+            parser.error("--chunk-size must be at least 1")
+        if args.no_train and not args.data_output:
+            parser.error("--no-train needs --data-output")
+
+    run_script = run_incremental if args.incremental else run_training
+    if profile_prefix is not None:
+        import crop_profile
+        return crop_profile.profile_call(profile_prefix, run_script, args)
+    return run_script(args)
+
+def run_training(args):
+    print("Starting model generation script...")
+    timer = StageTimer()
+    # Crop order and category codes shared with the scorer, so the one-hot columns
+    # line up with the rule masks (see crop_vocab.py)
+    vocabulary = crop_vocab.load_vocabulary()
+
+    # --- 1. Prepare Dummy Data (REPLACE THIS WITH YOUR ACTUAL DATASET) ---
+    df = None
+    if args.data:
+        df = timer.run('load data', read_samples, args.data)
+    else:
+        errors, _ = crop_vocab.check_tables(sys.modules[__name__])
+        if errors:
+            for message in errors:
+                print(f"Error: {message}")
+            print("Fix the crop tables (python crop_vocab.py lists the problems) before generating data.")
+            return 1
+        generator = SampleGenerator(crops=vocabulary.crops, seed=args.seed, vocabulary=vocabulary)
+        if args.data_output:
+            chunks = generator.iter_chunks(args.samples, args.chunk_size)
+            rows = timer.run('generate + write data', write_samples, args.data_output, chunks)
+            print(f"Wrote {rows} samples to '{args.data_output}'")
+            if not args.no_train:
+                df = timer.run('load data', read_samples, args.data_output)
+        else:
+            df = timer.run('generate data', generator.generate, args.samples)
+
+    if df is not None:
+        from sklearn.model_selection import train_test_split
+
+        # Define features (X) and target (y)
+        X = df[FEATURE_COLUMNS]
+        y = df[TARGET_COLUMN].astype(str)
+        print(f"{len(df)} samples, {y.nunique()} crops")
+
+        # --- 2. Train a Machine Learning Model (REPLACE RandomForestClassifier if needed) ---
+        model_pipeline = build_pipeline(n_jobs=args.n_jobs, n_estimators=args.n_estimators,
+                                        categories=vocabulary.categories)
+
+        # Split data into training and testing sets (optional, but good practice)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=args.test_size, random_state=42)
+
+        # Train the model
+        print("Training the model...")
+        timer.run('train', model_pipeline.fit, X_train, y_train)
+        print("Model training complete.")
+
+        # Evaluate the model (optional)
+        accuracy = timer.run('evaluate', model_pipeline.score, X_test, y_test)
+        print(f"Model accuracy on test set: {accuracy:.2f}")
+
+        # --- 3. Save the Trained Model and Preprocessor ---
+        # It's best practice to save the entire pipeline, including the preprocessor,
+        # so that when you load the model, it knows how to transform new data.
+        try:
+            timer.run('save pickle', save_pipeline, model_pipeline, args.model)
+            print(f"Model saved successfully as '{args.model}'")
+        except Exception as e:
+            print(f"Error saving model: {e}")
+
+        # --- 4. Export the Fast Array Artifact ---
+        # Flattened forest arrays + encoder vocabularies that model.py can memory-map and
+        # run with NumPy alone (no unpickling, no sklearn at prediction time).
+        try:
+            timer.run('export arrays', crop_forest.export_pipeline, model_pipeline, args.forest_dir)
+            print(f"Array model exported as '{args.forest_dir}'")
+        except Exception as e:
+            print(f"Error exporting array model: {e}")
+
+    print(format_report(timer))
+    print("Script finished.")
+    return 0
+
+def format_report(timer):
+    report = f"Total {sum(timer.timings.values()):.2f} s"
+    peak = crop_metrics.peak_rss_mb()
+    if peak is not None:
+        report += f", peak RSS {peak:.1f} MB"
+    return report
+
+def run_incremental(args):
+    print("Starting incremental model update...")
+    timer = StageTimer()
+    conn = crop_db.connect(args.db)
+    try:
+        since = crop_db.get_watermark(conn, WATERMARK_NAME)
+        features, labels, watermark = timer.run('read new predictions', crop_db.fetch_labelled_rows, conn, since)
+        print(f"{len(labels)} new labelled predictions since {since[0] or 'the beginning'}")
+        if not labels:
+            crop_db.set_watermark(conn, WATERMARK_NAME, watermark)
+            print("Nothing to train on; model unchanged.")
+            return 0
+
+        with open(args.model, 'rb') as file:
+            model_pipeline = timer.run('load pickle', pickle.load, file)
+        used = timer.run('grow forest', grow_forest, model_pipeline, features, labels, args.add_trees, args.n_jobs)
+        if used < len(labels):
+            print(f"Skipped {len(labels) - used} rows labelled with crops the model does not know (needs a full retrain)")
+        if used:
+            timer.run('save pickle', save_pipeline, model_pipeline, args.model)
+            timer.run('export arrays', crop_forest.export_pipeline, model_pipeline, args.forest_dir)
+            trees = len(model_pipeline.named_steps['classifier'].estimators_)
+            print(f"Model updated with {used} rows ({trees} trees), saved as '{args.model}' and '{args.forest_dir}'")
+        # Only move the watermark once the new artifacts are in place
+        crop_db.set_watermark(conn, WATERMARK_NAME, watermark)
+        incremental_seconds = sum(timer.timings.values())
+        print(f"Incremental update: {format_report(timer)}")
+
+        if args.compare_full:
+            import pandas as pd
+            all_features, all_labels, _ = crop_db.fetch_labelled_rows(conn)
+            stored = pd.DataFrame({name: all_features[name] for name in FEATURE_COLUMNS})
+            stored[numerical_features] = stored[numerical_features].astype(float)
+            vocabulary = crop_vocab.load_vocabulary()
+            generated = SampleGenerator(crops=vocabulary.crops, seed=args.seed, vocabulary=vocabulary).generate(args.samples)
+            X = pd.concat([generated[FEATURE_COLUMNS].astype({name: str for name in categorical_features}), stored])
+            y = list(generated[TARGET_COLUMN].astype(str)) + all_labels
+            trees = len(model_pipeline.named_steps['classifier'].estimators_)
+            full = StageTimer()
+            full.run('full retrain', build_pipeline(n_jobs=args.n_jobs, n_estimators=trees,
+                                                    categories=vocabulary.categories).fit, X, y)
+            full_seconds = full.timings['full retrain']
+            grow_seconds = timer.timings['grow forest']
+            print(f"Full retrain on {len(y)} rows ({trees} trees): {full_seconds:.2f} s of training versus "
+                  f"{grow_seconds:.2f} s for the incremental trees ({full_seconds / max(grow_seconds, 1e-9):.1f}x); "
+                  f"whole incremental run {incremental_seconds:.2f} s")
+    finally:
+        conn.close()
+    print("Script finished.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -3,6 +3,7 @@
 
 // Include config file and check if user is logged in
 require_once "config.php";
+require_once "model_client.php";
 
 if(!isset($_SESSION["loggedin"]) || $_SESSION["loggedin"] !== true){
     header("location: login.php");
@@ -124,13 +125,11 @@ if ($is_admin_view) {
 
 if ($should_process_prediction) {
     // --- Call Python Model ---
-    // The data is passed as command line arguments to the python script.
+    // The scoring daemon (python model.py --serve) is used when it is running;
+    // otherwise model_client.php falls back to running model.py per request.
     // Ensure the order and number of arguments matches your model.py's expected input.
-    $command = escapeshellcmd("python model.py " .
-               escapeshellarg($nitrogen) . " " . escapeshellarg($phosphorus) . " " . escapeshellarg($potassium) . " " . // Corrected typo here
-               escapeshellarg($climate) . " " . escapeshellarg($humidity) . " " . escapeshellarg($ph) . " " . escapeshellarg($rainfall) . " " .
-               escapeshellarg($soil_type) . " " . escapeshellarg($topography) . " " . escapeshellarg($water_availability));
-    $output = shell_exec($command);
+    $output = crop_model_predict($nitrogen, $phosphorus, $potassium, $climate, $humidity, $ph, $rainfall,
+                                 $soil_type, $topography, $water_availability);
 
     if ($output !== null) {
         $prediction_result = trim($output);
@@ -139,6 +138,8 @@ if ($should_process_prediction) {
         $decoded_output = json_decode($prediction_result, true);
 
         if (json_last_error() === JSON_ERROR_NONE && isset($decoded_output['compatible_crops']) && isset($decoded_output['incompatible_crops'])) {
+            // Valid model output is already JSON: it is stored as is, without a re-encode
+            $model_json = $prediction_result;
             $recommended_crops_data = $decoded_output['compatible_crops'];
             $incompatible_crops_data = $decoded_output['incompatible_crops'];
 
@@ -152,6 +153,8 @@ if ($should_process_prediction) {
         } else {
             // If JSON decoding fails, or expected keys are missing, treat as an error
             $error_message = "Error parsing model output: " . $prediction_result;
+            // Store the decoded result as before, never the raw error text
+            $model_json = json_encode($decoded_output);
             $prediction_result = ""; // Clear prediction result if there's a parsing error
         }
 
@@ -165,7 +168,7 @@ if ($should_process_prediction) {
             if($stmt = mysqli_prepare($link, $sql)){
                 $dummy_temperature = 0.0; // Placeholder for temperature
                 // Store the full JSON output in a variable before binding
-                $json_encoded_output = json_encode($decoded_output);
+                $json_encoded_output = $model_json;
 
                 // Corrected type definition string: 'iiiisddddssss' (13 parameters)
                 // i: user_id, nitrogen, phosphorus, potassium
@@ -3,12 +3,19 @@
 # and uses it to predict a crop. It now calculates compatibility for all crops
 # and returns them as a JSON string, separated into compatible and incompatible lists.
 
+# Only the standard library is imported at module level: the rule-based scoring
+# needs nothing else, and numpy/pandas/sklearn add hundreds of milliseconds to
+# every cold start. The ML dependencies are imported lazily where they are used.
+import time
+# Optional instrumentation (crop_metrics.py): CPU time the interpreter used before this
+# module started, and when it started, for the "startup_cpu" and "imports" stages
+_STARTUP_CPU = time.process_time()
+_MODULE_START = time.perf_counter()
+import os
 import sys
-import pickle
-import numpy as np
-import pandas as pd
-import traceback
+import heapq
 import json # Import json module
+import _thread # Low-level lock; the threading module costs several ms to import
 
 # --- Hardcoded Crop Preferred Conditions ---
 # IMPORTANT: For a robust ML system, these conditions should primarily be learned
@@ -315,25 +322,204 @@ CROP_CONDITIONS = {
     },
 }
 
-def calculate_compatibility(crop_name, features_dict):
+# Order of the ten features as they are passed on the command line (and by index.php).
+FEATURE_NAMES = ['Nitrogen', 'Phosphorus', 'Potassium', 'Climate', 'Humidity', 'pH',
+                 'Rainfall', 'Soil_Type', 'Topography', 'Water_Availability']
+NUMERICAL_FEATURES = ['Nitrogen', 'Phosphorus', 'Potassium', 'Humidity', 'pH', 'Rainfall']
+CATEGORICAL_FEATURES = ['Climate', 'Soil_Type', 'Topography', 'Water_Availability']
+
+# Catalogs at least this large are scored with the vectorized engine in crop_engine.py.
+# Smaller ones use the plain Python loop, which avoids importing NumPy on a cold
+# CLI start (see tests/test_import_time.py). Long-running processes such as
+# the scoring daemon call use_vectorized_engine() to always use the engine.
+VECTORIZED_MIN_CROPS = 200
+
+# Compiled scoring structures, published as one immutable tuple
+# (source conditions dict, crop_engine.CompiledConditions, crop_index.IntervalIndex or None)
+# so readers never see an engine and an index built from different conditions.
+# Readers take no lock; only building and swapping in a new tuple does.
+_compiled = None
+_compile_lock = _thread.allocate_lock()
+_ml_scorer = None
+_force_vectorized = False
+# crop_json.ResponseEncoder for the last catalog results were encoded for
+_encoder = None
+# get_records() result: CROP_CONDITIONS compiled for the plain Python scoring loop
+_records = None
+# crop_vocab.Vocabulary shared with the trainer (crop_vocab.json), loaded on first use
+_vocabulary = None
+# Bumped whenever the crop conditions change, so caches built on top of them
+# (see crop_cache.py) know to drop their entries.
+conditions_version = 0
+
+# crop_metrics.Metrics when instrumentation is enabled (enable_metrics), otherwise None.
+# Hot paths check "metrics is not None" before recording anything.
+metrics = None
+
+# crop_profile.Profiler with --profile in the server and batch modes, otherwise None.
+# Request handlers wrap each request in "with profiler.sample():" when it is set.
+profiler = None
+DEFAULT_PROFILE_PREFIX = 'model_profile'
+SAMPLED_PROFILE_MODES = ('--serve', '--serve-http', '--batch')
+
+# Optional crop conditions file (JSON or YAML) replacing the built-in CROP_CONDITIONS,
+# see crop_reload.py
+CONDITIONS_FILE_ENV = 'CROP_CONDITIONS_FILE'
+
+def use_vectorized_engine(enabled=True):
+    """
+    Forces (or stops forcing) the vectorized engine regardless of catalog size.
+    Worth it in long-lived processes, where the NumPy import is paid only once.
+    """
+    global _force_vectorized
+    _force_vectorized = enabled
+
+def _compile(with_index=False):
+    """
+    Builds (under the lock) whatever part of the compiled tuple is missing or stale
+    for the current CROP_CONDITIONS, publishes it and returns it.
+    """
+    global _compiled
+    with _compile_lock:
+        conditions = CROP_CONDITIONS
+        compiled = _compiled
+        if compiled is None or compiled[0] is not conditions:
+            import crop_engine
+            compiled = (conditions, crop_engine.CompiledConditions(conditions, get_vocabulary().categories), None)
+        if with_index and compiled[2] is None:
+            import crop_index
+            compiled = (compiled[0], compiled[1], crop_index.IntervalIndex(compiled[1]))
+        _compiled = compiled
+        return compiled
+
+def get_vocabulary():
+    """
+    Returns the crop_vocab.Vocabulary the scorer and the trainer share: the category
+    codes of the compiled table (crop_engine mask bits) and of the model's one-hot
+    columns. Loaded from crop_vocab.json on first use.
+    """
+    global _vocabulary
+    if _vocabulary is None:
+        import crop_vocab
+        _vocabulary = crop_vocab.load_vocabulary()
+    return _vocabulary
+
+def get_engine():
+    """
+    Returns the CROP_CONDITIONS table compiled by crop_engine.CompiledConditions,
+    building it on first use and again whenever CROP_CONDITIONS is replaced.
+    """
+    compiled = _compiled
+    if compiled is None or compiled[0] is not CROP_CONDITIONS:
+        compiled = _compile()
+    return compiled[1]
+
+def get_index():
+    """
+    Returns the crop_index.IntervalIndex over the compiled table, building it on first use.
+    Single-sample scoring in the vectorized path goes through the index, which only
+    looks up precomputed per-feature bitsets instead of checking every crop's conditions.
+    The index's engine attribute is the matching compiled table.
+    """
+    compiled = _compiled
+    if compiled is None or compiled[0] is not CROP_CONDITIONS or compiled[2] is None:
+        compiled = _compile(with_index=True)
+    return compiled[2]
+
+def reset_engine():
+    """
+    Drops the compiled table so it is rebuilt from CROP_CONDITIONS on next use,
+    and invalidates cached results. Call this after editing CROP_CONDITIONS at runtime.
+    """
+    global _compiled, _records, conditions_version
+    with _compile_lock:
+        _compiled = None
+        _records = None
+        conditions_version += 1
+
+def install_conditions(conditions, engine=None, index=None):
+    """
+    Replaces CROP_CONDITIONS with a new dict, together with its compiled table and index
+    if the caller already built them (e.g. crop_reload.py, in a background thread), so
+    requests never wait for a rebuild. The swap is copy-on-write: the new dict must not
+    be modified afterwards, and requests already running keep using the old version.
+    """
+    global CROP_CONDITIONS, _compiled, conditions_version
+    if index is not None and engine is None:
+        engine = index.engine
+    with _compile_lock:
+        _compiled = (conditions, engine, index) if engine is not None else None
+        CROP_CONDITIONS = conditions
+        conditions_version += 1
+
+def load_conditions_file(path=None):
+    """
+    Installs the crop conditions from a JSON/YAML file (path, or the file named by the
+    CROP_CONDITIONS_FILE environment variable). Returns False if neither is set.
+    """
+    path = path or os.environ.get(CONDITIONS_FILE_ENV)
+    if not path:
+        return False
+    import crop_reload
+    install_conditions(crop_reload.load_conditions(path))
+    return True
+
+def enable_metrics(spec=None):
+    """
+    Turns on instrumentation from a --metrics value or, if spec is None, from the
+    CROP_MODEL_METRICS environment variable (see crop_metrics.py). Returns the
+    crop_metrics.Metrics, or None if instrumentation stays off.
+    """
+    global metrics
+    if spec is None:
+        spec = os.environ.get('CROP_MODEL_METRICS')
+        if not spec:
+            return None
+    import crop_metrics
+    metrics = crop_metrics.from_spec(spec)
+    return metrics
+
+def run_profiled(argv, prefix=DEFAULT_PROFILE_PREFIX, every=1):
+    """
+    run() under crop_profile: the whole run, or 1 in every requests in the server and
+    batch modes (SAMPLED_PROFILE_MODES). Writes the profile files on exit.
+    """
+    global profiler
+    import crop_profile
+    profiler = crop_profile.Profiler(prefix, every)
+    try:
+        if argv and argv[0] in SAMPLED_PROFILE_MODES:
+            return run(argv)
+        with profiler.sample():
+            return run(argv)
+    finally:
+        profiler.dump()
+        print(profiler.report(), file=sys.stderr)
+
+def count_conditions(features_dict, conditions=None):
+    """
+    Number of crop conditions evaluated when scoring features_dict (conditions defined
+    for a crop and present in the input), for instrumentation.
+    """
+    present = [key for key in FEATURE_NAMES if features_dict.get(key) is not None]
+    conditions = CROP_CONDITIONS if conditions is None else conditions
+    return sum(1 for preferred in conditions.values() for key in present if preferred.get(key) is not None)
+
+def calculate_compatibility(crop_name, features_dict, conditions=None):
     """
     Calculates a compatibility percentage for a given crop based on input features
-    and the crop's preferred conditions.
+    and the crop's preferred conditions (from conditions, default CROP_CONDITIONS).
     Returns a float (percentage).
     """
-    preferred = CROP_CONDITIONS.get(crop_name)
+    preferred = (CROP_CONDITIONS if conditions is None else conditions).get(crop_name)
     if not preferred:
         return 0.0 # No specific conditions defined, cannot calculate compatibility
 
     score = 0
     total_conditions = 0
 
-    # Define the keys for numerical and categorical features
-    numerical_keys = ['Nitrogen', 'Phosphorus', 'Potassium', 'Humidity', 'pH', 'Rainfall']
-    categorical_keys = ['Climate', 'Soil_Type', 'Topography', 'Water_Availability']
-
     # Check numerical ranges
-    for key in numerical_keys:
+    for key in NUMERICAL_FEATURES:
         if key in preferred and preferred[key] is not None:
             min_val, max_val = preferred[key]
             input_val = features_dict.get(key)
@@ -341,11 +527,11 @@ def calculate_compatibility(crop_name, features_dict):
                 total_conditions += 1
                 if min_val <= input_val <= max_val:
                     score += 1
-                # Optional: Add partial scoring for values close to the range
-                # For simplicity, keeping it binary for now.
+                # Binary on purpose; partial scoring for values close to the range is the
+                # graded mode (crop_engine.GradedScoring, get_suitable_crops(graded=...)).
 
     # Check categorical values
-    for key in categorical_keys:
+    for key in CATEGORICAL_FEATURES:
         if key in preferred and preferred[key] is not None:
             preferred_val = preferred[key]
             input_val = features_dict.get(key)
@@ -364,96 +550,556 @@ def calculate_compatibility(crop_name, features_dict):
     compatibility_percentage = (score / total_conditions) * 100
     return compatibility_percentage
 
-def get_suitable_crops(features_dict): # Removed threshold parameter
+class CropRecord:
+    """
+    One crop's preferred conditions compiled for the plain Python scoring loop:
+    ranges as (column, min, max) and categorical conditions as (column, accepted values)
+    tuples, columns indexing RECORD_FEATURES. Only the conditions that are defined are
+    kept, so scoring does no key lookups or None checks on the conditions.
+    shared: dict used to reuse identical condition tuples across the crops of a catalog
+    (most crops share their categorical conditions).
+    """
+
+    __slots__ = ('name', 'ranges', 'categories')
+
+    def __init__(self, name, preferred, shared=None):
+        self.name = name
+        preferred = preferred or {}
+        ranges = []
+        for col, key in enumerate(NUMERICAL_FEATURES):
+            if preferred.get(key) is not None:
+                min_val, max_val = preferred[key]
+                ranges.append(_share(shared, (col, min_val, max_val)))
+        categories = []
+        for col, key in enumerate(CATEGORICAL_FEATURES):
+            preferred_val = preferred.get(key)
+            if preferred_val is not None:
+                # A single accepted value becomes a 1-tuple: "in" compares with == like the list case
+                accepted = tuple(preferred_val) if isinstance(preferred_val, list) else (preferred_val,)
+                categories.append(_share(shared, (len(NUMERICAL_FEATURES) + col, accepted)))
+        self.ranges = _share(shared, tuple(ranges))
+        self.categories = _share(shared, tuple(categories))
+
+def _share(shared, value):
+    # The equal tuple already in shared if there is one (value itself otherwise)
+    if shared is None:
+        return value
+    try:
+        return shared.setdefault(value, value)
+    except TypeError:
+        return value # Contains an unhashable condition value
+
+# Input order CropRecord columns refer to
+RECORD_FEATURES = NUMERICAL_FEATURES + CATEGORICAL_FEATURES
+
+def get_records():
+    """
+    Returns (conditions, crop names, CropRecords, crop indices in name order) for the
+    current CROP_CONDITIONS, compiling them on first use and whenever it is replaced.
+    """
+    global _records
+    conditions = CROP_CONDITIONS
+    cached = _records
+    if cached is None or cached[0] is not conditions:
+        crop_names = list(conditions)
+        shared = {}
+        records = tuple(CropRecord(name, conditions[name], shared) for name in crop_names)
+        name_order = sorted(range(len(crop_names)), key=crop_names.__getitem__)
+        cached = _records = (conditions, crop_names, records, name_order)
+    return cached
+
+def score_records(records, features_dict):
+    """
+    Compatibility percentages of every CropRecord for one input, with the same
+    semantics and arithmetic as calculate_compatibility.
+    """
+    values = [features_dict.get(key) for key in RECORD_FEATURES]
+    percentages = []
+    append = percentages.append
+    for record in records:
+        score = 0
+        total_conditions = 0
+        for col, min_val, max_val in record.ranges:
+            input_val = values[col]
+            if input_val is not None:
+                total_conditions += 1
+                if min_val <= input_val <= max_val:
+                    score += 1
+        for col, accepted in record.categories:
+            input_val = values[col]
+            if input_val is not None:
+                total_conditions += 1
+                if input_val in accepted:
+                    score += 1
+        append((score / total_conditions) * 100 if total_conditions else 0.0)
+    return percentages
+
+def _rank_crops_python(features_dict, top_k=None, include_incompatible=True):
+    """
+    Plain Python scoring loop over CROP_CONDITIONS (compiled into CropRecords), used
+    for small catalogs. Returns a crop_json.RankedCrops view.
+    With top_k, only the top_k best compatible crops are kept.
+    """
+    import crop_json
+    m = metrics
+    if m is not None:
+        start = time.perf_counter()
+    # One version throughout, even if CROP_CONDITIONS is swapped meanwhile
+    conditions, crop_names, records, name_order = get_records()
+    percentages = score_records(records, features_dict)
+    if m is not None:
+        start = m.lap('scoring', start)
+        m.incr('crops_scored', len(records))
+        m.incr('conditions_evaluated', count_conditions(features_dict, conditions))
+
+    compatible = [i for i, percentage in enumerate(percentages) if percentage > 0]
+    if top_k is not None:
+        # Partial selection; the index breaks ties in catalog order, like the stable sort below
+        compatible = heapq.nsmallest(top_k, compatible, key=lambda i: (-percentages[i], i))
+    else:
+        # Sort compatible crops by percentage in descending order
+        compatible.sort(key=percentages.__getitem__, reverse=True)
+    # Incompatible crops are listed alphabetically by name
+    incompatible = [i for i in name_order if percentages[i] <= 0] if include_incompatible else None
+    if m is not None:
+        m.lap('sorting', start)
+    return crop_json.RankedCrops(get_encoder(crop_names), percentages, compatible, incompatible)
+
+def rank_crops(features_dict, top_k=None, include_incompatible=True, graded=None):
+    """
+    Like get_suitable_crops, but returns the ranking as a crop_json.RankedCrops view
+    over the score arrays instead of a JSON string: nothing is serialized (and no
+    per-crop dict is built) unless the caller asks for it.
+    """
+    if graded is None and not (_force_vectorized or len(CROP_CONDITIONS) >= VECTORIZED_MIN_CROPS):
+        return _rank_crops_python(features_dict, top_k, include_incompatible)
+
+    import crop_json
+    m = metrics
+    if m is not None:
+        start = time.perf_counter()
+    if graded is None:
+        index = get_index()
+        engine = index.engine
+        percentages = index.score(features_dict)
+    else:
+        # Partial credit needs the distance to every range, so the index does not apply
+        engine = get_engine()
+        percentages = engine.score(features_dict, graded)
+    if m is not None:
+        start = m.lap('scoring', start)
+        m.incr('crops_scored', len(engine.crop_names))
+        m.incr('conditions_evaluated', int(engine.numerical_defined[:, [
+            col for col, key in enumerate(NUMERICAL_FEATURES) if features_dict.get(key) is not None]].sum())
+            + int(engine.categorical_defined[:, [
+            col for col, key in enumerate(CATEGORICAL_FEATURES) if features_dict.get(key) is not None]].sum()))
+    if top_k is not None:
+        compatible = engine.top_k(percentages, top_k)
+        incompatible = engine.incompatible(percentages) if include_incompatible else None
+    else:
+        compatible, incompatible = engine.rank(percentages)
+        if not include_incompatible:
+            incompatible = None
+    if m is not None:
+        m.lap('sorting', start)
+    return crop_json.RankedCrops(get_encoder(engine.crop_names), percentages, compatible, incompatible)
+
+def get_suitable_crops(features_dict, top_k=None, include_incompatible=True, compact=False, graded=None): # Removed threshold parameter
     """
     Calculates compatibility for all crops, separates them into compatible and incompatible,
     and returns a JSON string with sorted lists.
+    top_k: only return the top_k most compatible crops (ties broken by catalog order, so
+           this is always the start of the full list)
+    include_incompatible: False drops the 'incompatible_crops' list from the output
+    compact: crop indices and integer percentages instead of names, see crop_json.py
+    graded: a crop_engine.GradedScoring (see graded_scoring) for partial credit near the
+            ranges and per-feature weights, instead of binary in-range checks
+    """
+    m = metrics
+    if m is None:
+        return rank_crops(features_dict, top_k, include_incompatible, graded).to_json(compact)
+    m.incr('requests')
+    ranked = rank_crops(features_dict, top_k, include_incompatible, graded)
+    start = time.perf_counter()
+    result = ranked.to_json(compact)
+    m.lap('serialization', start)
+    return result
+
+def get_encoder(crop_names):
+    """
+    Returns the crop_json.ResponseEncoder for a crop catalog (a crop names list, e.g.
+    get_engine().crop_names), reused as long as the same list is passed in.
+    """
+    global _encoder
+    encoder = _encoder
+    if encoder is None or encoder.crop_names is not crop_names:
+        import crop_json
+        encoder = _encoder = crop_json.ResponseEncoder(crop_names)
+    return encoder
+
+def crop_dictionary():
+    """
+    The index -> crop name dictionary that compact results refer to, as JSON.
+    """
+    return get_encoder(get_records()[1]).dictionary()
+
+def format_ranked_crops(crop_names, percentages, compatible, incompatible, compact=False):
+    """
+    Builds the get_suitable_crops JSON from engine output: per-crop percentages in
+    catalog order plus the ordered crop indices of the compatible and incompatible lists.
+    incompatible=None leaves the 'incompatible_crops' list out.
+    """
+    encoder = get_encoder(crop_names)
+    if compact:
+        return encoder.encode_compact(percentages, compatible, incompatible)
+    return encoder.encode(percentages, compatible, incompatible)
+
+def score_batch(samples, engine=None, graded=None):
+    """
+    Scores many soil samples against every crop in one vectorized pass, with the same
+    semantics as calculate_compatibility.
+    samples is a list of feature dicts, or a dict of columns keyed by feature name.
+    Returns an (N, crops) NumPy array of compatibility percentages; the columns follow
+    CROP_CONDITIONS order (get_engine().crop_names).
+    engine: a specific get_engine() result to use, so a caller can keep scoring and
+    formatting on the same version while the conditions are being reloaded.
+    graded: a crop_engine.GradedScoring for graded scoring.
+    """
+    if engine is None:
+        engine = get_engine()
+    if not isinstance(samples, dict):
+        samples = {key: [sample.get(key) for sample in samples] for key in FEATURE_NAMES}
+    return engine.score_columns(samples, graded)
+
+def iter_batch_results(percentages, top_k=None, include_incompatible=True, compact=False, engine=None):
+    """
+    Yields the get_suitable_crops JSON string (with the same top_k, include_incompatible
+    and compact options) for each row returned by score_batch (with the same engine).
     """
-    all_crops_data = []
-    for crop_name in CROP_CONDITIONS.keys():
-        compatibility = calculate_compatibility(crop_name, features_dict)
-        all_crops_data.append({'crop': crop_name, 'compatibility': compatibility})
+    if engine is None:
+        engine = get_engine()
+    name_order = engine.name_order.tolist()
+    encoder = get_encoder(engine.crop_names)
+    encode = encoder.encode_compact if compact else encoder.encode
+    if top_k is not None:
+        for row in percentages:
+            compatible = engine.top_k(row, top_k).tolist()
+            row = row.tolist()
+            incompatible = [i for i in name_order if row[i] <= 0] if include_incompatible else None
+            yield encode(row, compatible, incompatible)
+        return
+    by_score = engine.rank_batch(percentages)
+    for row, order in zip(percentages.tolist(), by_score.tolist()):
+        compatible = [i for i in order if row[i] > 0]
+        incompatible = [i for i in name_order if row[i] <= 0] if include_incompatible else None
+        yield encode(row, compatible, incompatible)
 
-    compatible_crops = []
-    incompatible_crops = []
+def graded_scoring(falloff='trapezoid', tolerances=None, weights=None):
+    """
+    Returns the crop_engine.GradedScoring to pass as graded= to get_suitable_crops,
+    rank_crops or score_batch. falloff is 'trapezoid' or 'gaussian'; tolerances and
+    weights are dicts keyed by feature name (see crop_engine.GradedScoring).
+    Raises ValueError for invalid settings.
+    """
+    import crop_engine
+    return crop_engine.GradedScoring(falloff, tolerances, weights)
+
+def get_ml_scorer():
+    """
+    Returns the crop_ml.MLScorer for the trained model (array export preferred over the
+    pickle), loading it on first use. Raises FileNotFoundError if no model is available.
+    """
+    global _ml_scorer
+    if _ml_scorer is None:
+        import crop_ml
+        _ml_scorer = crop_ml.load_scorer()
+        if _ml_scorer is None:
+            raise FileNotFoundError("No trained model found (crop_model_forest/ or crop_model.pkl)")
+    return _ml_scorer
+
+def install_ml_scorer(scorer):
+    """
+    Replaces the ML scorer returned by get_ml_scorer (None: load again on next use).
+    """
+    global _ml_scorer
+    _ml_scorer = scorer
+
+def ml_scorer_loaded():
+    return _ml_scorer is not None
 
-    for item in all_crops_data:
-        if item['compatibility'] > 0:
-            compatible_crops.append(item)
+def predict_ml_batch(samples):
+    """
+    ML model class probabilities for many samples in one call (list of feature dicts or
+    dict of columns). Returns (class names, (N, classes) NumPy array).
+    """
+    scorer = get_ml_scorer()
+    return scorer.classes, scorer.predict_proba(samples)
+
+def score_blended(samples, ml_weight=0.5, graded=None):
+    """
+    Like score_batch, but mixes the rule-based percentages with the ML model's
+    probabilities (as percentages): (1 - ml_weight) * rule + ml_weight * ML.
+    Returns an (N, crops) array in CROP_CONDITIONS order.
+    """
+    import crop_ml
+    percentages = score_batch(samples, graded=graded)
+    if ml_weight == 0:
+        return percentages
+    ml_probabilities = get_ml_scorer().crop_probabilities(samples, get_engine().crop_names)
+    return crop_ml.blend(percentages, ml_probabilities, ml_weight)
+
+USAGE = ("Usage: python model.py <N> <P> <K> <climate> <humidity> <ph> <rainfall> <soil_type> <topography> <water_availability>\n"
+         "                       [--top-k K] [--no-incompatible] [--compact]\n"
+         "                       [--graded[=trapezoid|gaussian]] [--weights F=W,...] [--tolerances F=T,...]\n"
+         "       python model.py --crop-dictionary\n"
+         "       python model.py --serve [--socket PATH | --port PORT]\n"
+         "       python model.py --serve-http [--port PORT] [--max-batch N] [--max-delay-ms MS]\n"
+         "       python model.py --batch input.csv|input.jsonl [--output results.jsonl] [--chunk-size ROWS] [--workers N]\n"
+         "                       [--top-k K] [--no-incompatible] [--compact] [--ml-weight W]\n"
+         "                       [--graded[=trapezoid|gaussian]] [--weights F=W,...] [--tolerances F=T,...]\n"
+         "       python model.py --sensitivity <10 features> --sweep FEATURE[=START:STOP:STEP|=V1,V2,...] [--sweep ...]\n"
+         "       python model.py --raster INPUT_DIR --output OUT_DIR [--cube] [--workers N] [--tile-rows ROWS]\n"
+         "       Any form also accepts --metrics[=json|prom:PATH] (or CROP_MODEL_METRICS) for stage timings\n"
+         "       and --profile[=PREFIX] [--profile-every=N] for cProfile/tracemalloc output (see crop_profile.py)")
+
+def parse_features(values):
+    """
+    Converts the ten raw feature values (in FEATURE_NAMES order, usually strings
+    from argv or a server request) into the features dict used for scoring.
+    Raises ValueError if a numerical value is not a valid number.
+    """
+    if len(values) != len(FEATURE_NAMES):
+        raise IndexError(len(values))
+    features = {}
+    for key, value in zip(FEATURE_NAMES, values):
+        features[key] = float(value) if key in NUMERICAL_FEATURES else str(value)
+    return features
+
+def split_result_options(argv):
+    """
+    Pulls the result options (--top-k K, --no-incompatible, --compact) out of the command line.
+    Returns (remaining arguments, top_k, include_incompatible, compact).
+    Raises ValueError if --top-k is not followed by a non-negative integer.
+    """
+    remaining = []
+    top_k = None
+    include_incompatible = True
+    compact = False
+    args = iter(argv)
+    for arg in args:
+        if arg == '--top-k' or arg.startswith('--top-k='):
+            value = arg.split('=', 1)[1] if '=' in arg else next(args, '')
+            if not value.isdigit():
+                raise ValueError(f"--top-k expects a non-negative integer, got {value!r}")
+            top_k = int(value)
+        elif arg == '--no-incompatible':
+            include_incompatible = False
+        elif arg == '--compact':
+            compact = True
         else:
-            incompatible_crops.append(item)
+            remaining.append(arg)
+    return remaining, top_k, include_incompatible, compact
 
-    # Sort compatible crops by percentage in descending order
-    compatible_crops.sort(key=lambda x: x['compatibility'], reverse=True)
-    # Incompatible crops can remain unsorted or sorted alphabetically by name
-    incompatible_crops.sort(key=lambda x: x['crop'])
+def split_scoring_options(argv):
+    """
+    Pulls the graded scoring options (--graded[=trapezoid|gaussian], --weights F=W,...,
+    --tolerances F=T,...) out of the command line. Returns (remaining arguments,
+    GradedScoring or None). --weights and --tolerances imply --graded.
+    Raises ValueError for invalid values.
+    """
+    remaining = []
+    falloff = None
+    settings = {'--weights': None, '--tolerances': None}
+    args = iter(argv)
+    for arg in args:
+        name = arg.split('=', 1)[0]
+        if name == '--graded':
+            falloff = arg.split('=', 1)[1] if '=' in arg else 'trapezoid'
+        elif name in settings:
+            settings[name] = arg.split('=', 1)[1] if '=' in arg else next(args, '')
+        else:
+            remaining.append(arg)
+    if falloff is None and settings['--weights'] is None and settings['--tolerances'] is None:
+        return remaining, None
+    import crop_engine
+    weights, tolerances = ({} if settings[key] is None else crop_engine.parse_feature_values(settings[key])
+                           for key in ('--weights', '--tolerances'))
+    return remaining, graded_scoring(falloff or 'trapezoid', tolerances, weights)
 
-    # Prepare the data structure for JSON output
-    output_data = {
-        'compatible_crops': compatible_crops,
-        'incompatible_crops': incompatible_crops
-    }
+def load_ml_pipeline(model_path='crop_model.pkl'):
+    """
+    Loads the optional pickled sklearn pipeline produced by generate_crop_model.py.
+    Returns None if the file is missing or its dependencies are not installed,
+    since the rule-based scoring does not need it.
+    """
+    import pickle # Unpickling pulls in sklearn/numpy, so keep it off the fast path
+    try:
+        with open(model_path, 'rb') as model_file:
+            return pickle.load(model_file)
+    except FileNotFoundError:
+        return None
+    except ImportError:
+        return None
 
-    return json.dumps(output_data) # Return JSON string
+def load_forest_model(model_dir='crop_model_forest'):
+    """
+    Loads the array export of the model written by generate_crop_model.py (see crop_forest.py).
+    The arrays are memory-mapped, so this takes milliseconds, needs only NumPy and shares
+    the class probability table between processes. Returns None if the export does not exist.
+    """
+    if not os.path.isdir(model_dir):
+        return None
+    import crop_forest
+    return crop_forest.ForestModel(model_dir)
 
-if __name__ == "__main__":
-    # Expecting 11 arguments: script_name (sys.argv[0]) + 10 features
-    if len(sys.argv) != 11:
-        print("Usage: python model.py <N> <P> <K> <climate> <humidity> <ph> <rainfall> <soil_type> <topography> <water_availability>")
-        sys.exit(1)
+def split_metrics_option(argv):
+    """
+    Pulls --metrics (JSON on stderr) or --metrics=SPEC (see crop_metrics.py) out of the
+    command line. Returns (remaining arguments, spec or None).
+    """
+    remaining = []
+    spec = None
+    for arg in argv:
+        if arg == '--metrics':
+            spec = 'json'
+        elif arg.startswith('--metrics='):
+            spec = arg.split('=', 1)[1]
+        else:
+            remaining.append(arg)
+    return remaining, spec
+
+def split_profile_options(argv, default_prefix=DEFAULT_PROFILE_PREFIX):
+    """
+    Pulls --profile[=PREFIX] and --profile-every=N out of the command line (also used
+    by generate_crop_model.py, so both accept the same forms).
+    Returns (remaining arguments, prefix or None when not profiling, every).
+    Raises ValueError if N is not a positive integer.
+    """
+    remaining = []
+    prefix = None
+    every = 1
+    for arg in argv:
+        if arg == '--profile':
+            prefix = default_prefix
+        elif arg.startswith('--profile='):
+            prefix = arg.split('=', 1)[1] or default_prefix
+        elif arg.startswith('--profile-every='):
+            value = arg.split('=', 1)[1]
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f"--profile-every expects a positive integer, got {value!r}")
+            every = int(value)
+        else:
+            remaining.append(arg)
+    return remaining, prefix, every
+
+def main(argv):
+    argv, metrics_spec = split_metrics_option(argv)
+    try:
+        argv, profile_prefix, profile_every = split_profile_options(argv)
+        m = enable_metrics(metrics_spec)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    if profile_prefix is None:
+        run_main = run
+    else:
+        run_main = lambda args: run_profiled(args, profile_prefix, profile_every)
+    if m is None:
+        return run_main(argv)
+    m.add_time('startup_cpu', _STARTUP_CPU) # CPU seconds, the one stage not timed by the wall clock
+    m.add_time('imports', time.perf_counter() - _MODULE_START)
+    try:
+        return run_main(argv)
+    finally:
+        m.emit()
+
+def run(argv):
+    if argv and argv[0] == '--serve':
+        # Long-lived scoring daemon, see crop_server.py
+        import crop_server
+        return crop_server.main(argv[1:])
+    if argv and argv[0] == '--serve-http':
+        # asyncio HTTP endpoint with micro-batching, see crop_http.py
+        import crop_http
+        return crop_http.main(argv[1:])
+
+    try:
+        load_conditions_file() # Only if CROP_CONDITIONS_FILE is set
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: Could not load crop conditions: {e}")
+        return 1
+
+    if argv and argv[0] == '--batch':
+        # Bulk scoring of a CSV/JSONL file, see crop_batch.py
+        import crop_batch
+        return crop_batch.main(argv)
+    if argv and argv[0] == '--sensitivity':
+        # What-if sweeps over one or two features, see crop_sensitivity.py
+        import crop_sensitivity
+        return crop_sensitivity.main(argv[1:])
+    if argv and argv[0] == '--raster':
+        # Suitability maps over gridded (.npy) inputs, see crop_raster.py
+        import crop_raster
+        return crop_raster.main(argv)
+
+    if argv == ['--crop-dictionary']:
+        print(crop_dictionary())
+        return 0
+
+    m = metrics
+    if m is not None:
+        start = time.perf_counter()
+    try:
+        argv, top_k, include_incompatible, compact = split_result_options(argv)
+        argv, graded = split_scoring_options(argv)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    # Expecting 10 features after the script name
+    if len(argv) != 10:
+        print(USAGE)
+        return 1
 
     try:
-        nitrogen = float(sys.argv[1])
-        phosphorus = float(sys.argv[2])
-        potassium = float(sys.argv[3])
-        climate_str = sys.argv[4]
-        humidity = float(sys.argv[5])
-        ph = float(sys.argv[6])
-        rainfall = float(sys.argv[7])
-        soil_type_str = sys.argv[8]
-        topography_str = sys.argv[9]
-        water_availability_str = sys.argv[10]
-
-        input_features_raw = {
-            'Nitrogen': nitrogen,
-            'Phosphorus': phosphorus,
-            'Potassium': potassium,
-            'Climate': climate_str,
-            'Humidity': humidity,
-            'pH': ph,
-            'Rainfall': rainfall,
-            'Soil_Type': soil_type_str,
-            'Topography': topography_str,
-            'Water_Availability': water_availability_str
-        }
+        input_features_raw = parse_features(argv)
+        if m is not None:
+            m.lap('argv_parse', start)
 
         # Call the new function to get suitable crops based on compatibility
         # No threshold here, as all crops are returned, separated into compatible/incompatible
-        result = get_suitable_crops(input_features_raw)
+        result = get_suitable_crops(input_features_raw, top_k, include_incompatible, compact, graded)
+        if m is not None:
+            start = time.perf_counter()
         print(result)
+        if m is not None:
+            sys.stdout.flush()
+            m.lap('output', start)
 
         # Optional: You can still load and use the ML model prediction internally
         # if you need it for other purposes, but it won't be printed as the main output.
         # try:
-        #     with open('crop_model.pkl', 'rb') as model_file:
-        #         ml_model_pipeline = pickle.load(model_file)
-        #     input_df = pd.DataFrame([input_features_raw])
-        #     ml_prediction = ml_model_pipeline.predict(input_df)[0]
+        #     forest_model = load_forest_model() # Much faster to load than load_ml_pipeline()
+        #     ml_prediction = forest_model.predict(forest_model.encode([input_features_raw]))[0]
         #     # You can use ml_prediction here for internal logic or logging
-        # except FileNotFoundError:
-        #     pass # Handle if model file is not found
         # except Exception as e:
-        #     pass # Handle other ML model loading/prediction errors
-
+        #     pass # Handle ML model loading/prediction errors
 
     except ValueError:
         print("Error: All numerical inputs must be valid numbers. Check your form inputs.")
-        sys.exit(1)
+        return 1
     except IndexError:
-        print("Error: Missing command-line arguments. Please provide all required inputs. Expected 10 arguments, received " + str(len(sys.argv) - 1))
-        sys.exit(1)
+        print("Error: Missing command-line arguments. Please provide all required inputs. Expected 10 arguments, received " + str(len(argv)))
+        return 1
     except Exception as e:
+        import traceback
         error_info = traceback.format_exc()
         print(f"An unexpected error occurred in main execution: {e}\nTraceback:\n{error_info}")
-        sys.exit(1)
+        return 1
+    return 0
 
+if __name__ == "__main__":
+    # crop_batch, crop_server etc. "import model": make that this module, so they share
+    # its state (metrics, conditions loaded from a file) instead of importing a second copy
+    sys.modules.setdefault('model', sys.modules[__name__])
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,41 @@
+<?php
+/*
+* model_client.php
+*
+* Small client shim for the crop scoring daemon (python model.py --serve).
+* It sends the ten features to the daemon over its Unix socket (or localhost TCP)
+* and returns the same JSON string that "python model.py ..." prints.
+* If the daemon is not running, it falls back to spawning model.py as before,
+* so the site keeps working without the daemon.
+*/
+
+// --- Daemon Address ---
+// Set CROP_MODEL_PORT to use localhost TCP instead of the Unix socket.
+define('CROP_MODEL_SOCKET', getenv('CROP_MODEL_SOCKET') ?: '/tmp/crop_model.sock');
+define('CROP_MODEL_PORT', getenv('CROP_MODEL_PORT') ?: '');
+define('CROP_MODEL_TIMEOUT', 5); // seconds
+
+function crop_model_predict($nitrogen, $phosphorus, $potassium, $climate, $humidity, $ph, $rainfall, $soil_type, $topography, $water_availability) {
+    $values = array($nitrogen, $phosphorus, $potassium, $climate, $humidity, $ph, $rainfall, $soil_type, $topography, $water_availability);
+
+    // --- Try the daemon first ---
+    $address = CROP_MODEL_PORT !== '' ? "tcp://127.0.0.1:" . CROP_MODEL_PORT : "unix://" . CROP_MODEL_SOCKET;
+    $stream = @stream_socket_client($address, $errno, $errstr, CROP_MODEL_TIMEOUT);
+    if ($stream !== false) {
+        stream_set_timeout($stream, CROP_MODEL_TIMEOUT);
+        fwrite($stream, json_encode($values) . "\n");
+        $response = fgets($stream);
+        fclose($stream);
+        if ($response !== false) {
+            return $response;
+        }
+    }
+
+    // --- Fall back to one process per request ---
+    $command = escapeshellcmd("python model.py " .
+               escapeshellarg($nitrogen) . " " . escapeshellarg($phosphorus) . " " . escapeshellarg($potassium) . " " .
+               escapeshellarg($climate) . " " . escapeshellarg($humidity) . " " . escapeshellarg($ph) . " " . escapeshellarg($rainfall) . " " .
+               escapeshellarg($soil_type) . " " . escapeshellarg($topography) . " " . escapeshellarg($water_availability));
+    return shell_exec($command);
+}
+?>
@@ -0,0 +1,23 @@
+# tests/conftest.py
+# Makes the repository modules importable and restores model.py's global scoring state
+# after each test.
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import model
+
+BASE_FEATURES = dict(zip(model.FEATURE_NAMES, [75, 45, 40, 'Tropical', 80, 6.5, 200, 'Clayey', 'Flat', 'High']))
+
+@pytest.fixture(autouse=True)
+def restore_model_state():
+    conditions = model.CROP_CONDITIONS
+    yield
+    model.use_vectorized_engine(False)
+    if model.CROP_CONDITIONS is not conditions:
+        model.install_conditions(conditions)
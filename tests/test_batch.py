@@ -0,0 +1,67 @@
+# tests/test_batch.py
+# crop_batch: line i of --batch output must be exactly what get_suitable_crops returns for row i.
+
+import csv
+import io
+import json
+
+import pytest
+
+from conftest import BASE_FEATURES
+import crop_batch
+import model
+
+ROWS = [
+    BASE_FEATURES,
+    {**BASE_FEATURES, 'pH': 6.999, 'Humidity': 90.004},
+    {**BASE_FEATURES, 'Climate': 'Arid', 'Soil_Type': 'Sandy', 'Water_Availability': 'Low'},
+    {**BASE_FEATURES, 'Nitrogen': 0, 'Rainfall': 3000},
+    {**BASE_FEATURES, 'Soil_Type': 'Volcanic'},
+]
+
+def write_inputs(tmp_path, rows):
+    csv_path = tmp_path / 'samples.csv'
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=model.FEATURE_NAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+    jsonl_path = tmp_path / 'samples.jsonl'
+    jsonl_path.write_text(''.join(json.dumps(row) + '\n' for row in rows), encoding='utf-8')
+    return str(csv_path), str(jsonl_path)
+
+@pytest.mark.parametrize('options', [{}, {'top_k': 3, 'compact': True}, {'include_incompatible': False}])
+def test_batch_lines_match_single_requests(tmp_path, options):
+    rows = ROWS * 3
+    expected = [model.get_suitable_crops(model.parse_features([row[key] for key in model.FEATURE_NAMES]), **options)
+                for row in rows]
+    for path in write_inputs(tmp_path, rows):
+        output = io.StringIO()
+        stats = crop_batch.score_file(path, output, chunk_size=4, **options) # Several chunks, one partial
+        assert stats['rows'] == len(rows)
+        assert output.getvalue().splitlines() == expected
+
+def test_jsonl_rows_with_different_keys(tmp_path):
+    # The first row lacks pH, later ones add it (in other spellings) or drop other features
+    rows = [{key: value for key, value in BASE_FEATURES.items() if key != 'pH'},
+            {**BASE_FEATURES, 'pH': 1.0},
+            {**{key.lower(): value for key, value in BASE_FEATURES.items()}, 'ph': 1.0},
+            {'Nitrogen': 75, ' PH ': 6.5, 'Climate': 'Tropical', 'comment': 'ignored'}]
+    path = tmp_path / 'mixed.jsonl'
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows), encoding='utf-8')
+    expected = [model.get_suitable_crops(features) for features in (
+        rows[0], rows[1], rows[1], {'Nitrogen': 75.0, 'pH': 6.5, 'Climate': 'Tropical'})]
+    output = io.StringIO()
+    crop_batch.score_file(str(path), output)
+    assert output.getvalue().splitlines() == expected
+    assert expected[1] != model.get_suitable_crops(rows[0])
+
+@pytest.mark.parametrize('line, message', [
+    ('{"Nitrogen": 75', "line 2: Invalid JSON"),
+    ('[75, 45]', "line 2: Expected a JSON object, got list"),
+    ('{"pH": "acidic"}', "line 2: All numerical inputs must be valid numbers"),
+])
+def test_bad_jsonl_lines_name_the_line(tmp_path, line, message):
+    path = tmp_path / 'bad.jsonl'
+    path.write_text(json.dumps(BASE_FEATURES) + '\n' + line + '\n', encoding='utf-8')
+    with pytest.raises(ValueError, match=message):
+        list(crop_batch.iter_records(str(path)))
@@ -0,0 +1,38 @@
+# tests/test_cache.py
+# crop_cache: a cached result must be the uncached result for the caller's own input.
+
+import pytest
+
+from conftest import BASE_FEATURES
+import crop_cache
+import model
+
+# Values on both sides of the pH 6.0-7.0 and Humidity 70-90 boundaries of several crops
+BOUNDARY_INPUTS = [
+    {**BASE_FEATURES, 'pH': 6.999},
+    {**BASE_FEATURES, 'pH': 7.001},
+    {**BASE_FEATURES, 'pH': 7.0},
+    {**BASE_FEATURES, 'pH': 5.999},
+    {**BASE_FEATURES, 'Humidity': 89.996},
+    {**BASE_FEATURES, 'Humidity': 90.004},
+]
+
+def make_cache(**options):
+    return crop_cache.ResultCache(model_path=None, **options)
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_cached_results_match_uncached(vectorized):
+    model.use_vectorized_engine(vectorized)
+    cache = make_cache()
+    for _ in range(2): # Misses, then hits
+        for features in BOUNDARY_INPUTS:
+            assert cache.get_suitable_crops(features, 3) == model.get_suitable_crops(features, 3)
+    assert cache.hits == len(BOUNDARY_INPUTS)
+
+def test_rounded_key_scores_the_original_input():
+    cache = make_cache(precision=2)
+    features = {**BASE_FEATURES, 'pH': 7.001}
+    assert cache.make_key(features) == cache.make_key({**BASE_FEATURES, 'pH': 7.0})
+    assert cache.get_suitable_crops(features) == model.get_suitable_crops(features)
+    assert cache.get_suitable_crops(features) == model.get_suitable_crops(features)
+    assert cache.hits == 1
@@ -0,0 +1,76 @@
+# tests/test_db.py
+# crop_db.PredictionWriter: rows packed with pack_scores must read back through
+# fetch_history as the ranking model.rank_crops gave, and large flushes must be split
+# into INSERTs within SQLite's bound-variable limit.
+
+import sqlite3
+
+import pytest
+
+from conftest import BASE_FEATURES
+import crop_db
+import model
+from test_scoring import synthetic_catalog
+
+SAMPLES = [
+    BASE_FEATURES,
+    {**BASE_FEATURES, 'pH': 7.0, 'Humidity': 90.004},
+    {**BASE_FEATURES, 'Climate': 'Arid', 'Soil_Type': 'Sandy', 'Water_Availability': 'Low'},
+    {**BASE_FEATURES, 'Nitrogen': 0, 'Rainfall': 3000, 'Soil_Type': 'Volcanic'}, # Few or no matches
+]
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = crop_db.connect(str(tmp_path / 'predictions.sqlite'))
+    # Enforce the limit MAX_VARIABLES is sized for, whatever this SQLite was built with
+    conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, crop_db.MAX_VARIABLES)
+    yield conn
+    conn.close()
+
+def expected_crops(ranked):
+    # Scores are stored in hundredths of a percent
+    return [(name, round(percentage * 100) / 100) for name, percentage in ranked]
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_packed_rows_read_back_through_fetch_history(conn, vectorized):
+    if vectorized:
+        model.install_conditions(synthetic_catalog(model.VECTORIZED_MIN_CROPS + 50))
+        model.use_vectorized_engine(True)
+    expected = []
+    with crop_db.PredictionWriter(conn) as writer:
+        for i, features in enumerate(SAMPLES):
+            ranked = model.rank_crops(features)
+            writer.add(7, features, ranked, prediction_time=f"2024-01-01 00:00:{i:02d}")
+            expected.append((f"2024-01-01 00:00:{i:02d}", features, expected_crops(ranked)))
+    writer.add(8, BASE_FEATURES, model.rank_crops(BASE_FEATURES)) # Another user's row
+    writer.flush()
+
+    history = crop_db.fetch_history(conn, 7)
+    assert [row[0] for row in history] == [row[0] for row in reversed(expected)]
+    for (_, features, crops), (_, stored_features, stored_crops) in zip(reversed(expected), history):
+        assert stored_crops == crops
+        assert stored_features == {key: features.get(key) for key in crop_db.FEATURE_COLUMNS.values()}
+    assert crop_db.fetch_history(conn, 7, limit=2) == history[:2]
+
+def test_pack_scores_round_trip():
+    percentages = [0.0, 100.0, 33.33333, 66.66667, 12.5]
+    compatible = [1, 3, 2, 4]
+    assert crop_db.unpack_scores(crop_db.pack_scores(compatible, percentages)) == [
+        (1, 100.0), (3, 66.67), (2, 33.33), (4, 12.5)]
+    assert crop_db.unpack_scores(crop_db.pack_scores([], percentages)) == []
+
+def test_flush_splits_inserts_at_the_variable_limit(conn):
+    per_statement = crop_db.MAX_VARIABLES // len(crop_db.INSERT_COLUMNS)
+    num_rows = 3 * per_statement + 5 # Well over 999 variables in one flush
+    assert num_rows * len(crop_db.INSERT_COLUMNS) > crop_db.MAX_VARIABLES
+    ranked = model.rank_crops(BASE_FEATURES)
+    writer = crop_db.PredictionWriter(conn, batch_size=num_rows + 1)
+    for i in range(num_rows):
+        writer.add(1, {**BASE_FEATURES, 'Nitrogen': i}, ranked, prediction_time='2024-01-01 00:00:00')
+    writer.flush()
+
+    assert writer.rows_written == num_rows
+    assert conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] == num_rows
+    history = crop_db.fetch_history(conn, 1, limit=num_rows)
+    assert [row[1]['Nitrogen'] for row in history] == list(reversed(range(num_rows)))
+    assert {tuple(row[2]) for row in history} == {tuple(expected_crops(ranked))}
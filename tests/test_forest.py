@@ -0,0 +1,40 @@
+# tests/test_forest.py
+# crop_forest: the array export must predict exactly what the sklearn pipeline does.
+
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+pd = pytest.importorskip('pandas')
+
+import crop_forest
+import generate_crop_model
+
+@pytest.fixture(scope='module')
+def pipeline_and_forest(tmp_path_factory):
+    data = generate_crop_model.SampleGenerator(seed=7).generate(1500)
+    pipeline = generate_crop_model.build_pipeline(n_jobs=1, n_estimators=12, random_state=3)
+    pipeline.fit(data[generate_crop_model.FEATURE_COLUMNS], data[generate_crop_model.TARGET_COLUMN])
+    path = crop_forest.export_pipeline(pipeline, str(tmp_path_factory.mktemp('forest') / 'crop_model_forest'))
+    return pipeline, crop_forest.ForestModel(path)
+
+def held_out_samples():
+    data = generate_crop_model.SampleGenerator(seed=11).generate(300)
+    samples = data[generate_crop_model.FEATURE_COLUMNS].astype(object).to_dict('records')
+    samples[0]['pH'] = float('nan')
+    samples[1]['Rainfall'] = float('nan')
+    samples[2]['Soil_Type'] = 'Volcanic' # Unknown category: all-zero one-hot columns
+    return samples
+
+def test_predict_proba_matches_pipeline(pipeline_and_forest):
+    pipeline, forest = pipeline_and_forest
+    samples = held_out_samples()
+    expected = pipeline.predict_proba(pd.DataFrame(samples, columns=generate_crop_model.FEATURE_COLUMNS))
+    assert forest.classes == [str(c) for c in pipeline.classes_]
+    np.testing.assert_allclose(forest.predict_proba(forest.encode(samples)), expected, rtol=0, atol=1e-12)
+
+def test_mmap_and_loaded_arrays_agree(pipeline_and_forest, tmp_path):
+    _, forest = pipeline_and_forest
+    X = forest.encode(held_out_samples())
+    path = crop_forest.export_pipeline(pipeline_and_forest[0], str(tmp_path / 'copy'))
+    np.testing.assert_array_equal(crop_forest.ForestModel(path, mmap=False).apply(X), forest.apply(X))
@@ -0,0 +1,71 @@
+# tests/test_graded.py
+# Graded scoring (crop_engine.GradedScoring): with zero tolerances and unit weights it must
+# give exactly the binary percentages, for every input the binary scorer accepts.
+
+import random
+
+import numpy as np
+import pytest
+
+from conftest import BASE_FEATURES
+import crop_batch
+import crop_engine
+import model
+
+EDGE_INPUTS = [
+    BASE_FEATURES,
+    {**BASE_FEATURES, 'Nitrogen': float('nan')},
+    {**BASE_FEATURES, 'pH': float('nan'), 'Rainfall': float('nan')},
+    {**BASE_FEATURES, 'Humidity': float('inf'), 'Potassium': float('-inf')},
+    {**BASE_FEATURES, 'pH': None, 'Soil_Type': None},
+    {key: value for key, value in BASE_FEATURES.items() if key not in ('Rainfall', 'Climate')},
+    {**BASE_FEATURES, 'Soil_Type': '', 'Topography': 'Volcanic'},
+    {'Nitrogen': 60.0},
+]
+
+def as_list(value):
+    return value if isinstance(value, list) else [value]
+
+def random_inputs(count, seed=5):
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        features = {}
+        for key in model.NUMERICAL_FEATURES:
+            features[key] = rng.choice([rng.uniform(0, 300), round(rng.uniform(0, 14), 1), rng.randint(0, 3000)])
+        for key in model.CATEGORICAL_FEATURES:
+            values = sorted({value for conditions in model.CROP_CONDITIONS.values()
+                             for value in as_list(conditions.get(key)) if value is not None})
+            features[key] = rng.choice(values + ['Unknown'])
+        samples.append(features)
+    return samples
+
+def exact_graded(falloff):
+    return crop_engine.GradedScoring(falloff, tolerances={key: 0.0 for key in model.NUMERICAL_FEATURES})
+
+@pytest.mark.parametrize('falloff', crop_engine.FALLOFFS)
+def test_zero_tolerance_graded_equals_binary(falloff):
+    graded = exact_graded(falloff)
+    for features in EDGE_INPUTS + random_inputs(200):
+        assert model.get_suitable_crops(features, graded=graded) == model.get_suitable_crops(features)
+
+@pytest.mark.parametrize('falloff', crop_engine.FALLOFFS)
+def test_zero_tolerance_graded_batch_equals_binary(falloff):
+    samples = EDGE_INPUTS + random_inputs(200)
+    columns = crop_batch.read_columns(samples)
+    binary = model.score_batch(columns)
+    graded = model.score_batch(columns, graded=exact_graded(falloff))
+    assert not np.isnan(graded).any()
+    np.testing.assert_array_equal(graded, binary)
+
+@pytest.mark.parametrize('falloff', crop_engine.FALLOFFS)
+def test_nan_input_gets_no_credit(falloff):
+    # Default tolerances: a NaN is outside every range, as in binary scoring
+    graded = model.graded_scoring(falloff)
+    features = {**BASE_FEATURES, 'Nitrogen': float('nan')}
+    without = {**BASE_FEATURES, 'Nitrogen': -1e9} # Beyond any tolerance: also no credit
+    ranked = model.rank_crops(features, graded=graded)
+    assert len(ranked.compatible) + len(ranked.incompatible) == len(model.CROP_CONDITIONS)
+    assert model.get_suitable_crops(features, graded=graded) == model.get_suitable_crops(without, graded=graded)
+    batch = model.score_batch(crop_batch.read_columns([features, without]), graded=graded)
+    np.testing.assert_array_equal(batch[0], batch[1])
@@ -0,0 +1,129 @@
+# tests/test_http.py
+# crop_http: micro-batched responses must be byte-identical to single-request scoring.
+
+import asyncio
+import json
+
+import pytest
+
+from conftest import BASE_FEATURES
+import crop_http
+import model
+
+# Requests the HTTP endpoint accepts (every feature given)
+HTTP_INPUTS = [
+    BASE_FEATURES,
+    {**BASE_FEATURES, 'Soil_Type': ''},
+    {**BASE_FEATURES, 'Climate': '', 'Water_Availability': ''},
+    {**BASE_FEATURES, 'pH': 'nan'},
+    {**BASE_FEATURES, 'Rainfall': 'NaN', 'Soil_Type': ''},
+]
+# Feature dicts for score_requests, which also sees None and missing keys
+EDGE_INPUTS = [model.parse_features([features[key] for key in model.FEATURE_NAMES]) for features in HTTP_INPUTS] + [
+    {**BASE_FEATURES, 'pH': float('nan')},
+    {**BASE_FEATURES, 'pH': None, 'Soil_Type': None},
+    {key: value for key, value in BASE_FEATURES.items() if key not in ('Rainfall', 'Topography')},
+]
+
+def respond_all(service, bodies):
+    async def run():
+        return await asyncio.gather(*(service.respond('POST', '/recommend', body) for body in bodies))
+    return asyncio.run(run())
+
+def request_bodies():
+    bodies = []
+    for features in HTTP_INPUTS:
+        bodies.append(json.dumps([features[key] for key in model.FEATURE_NAMES]).encode())
+        bodies.append(json.dumps({**features, 'top_k': 3, 'compact': True}).encode())
+        bodies.append(json.dumps({**features, 'include_incompatible': False}).encode())
+    return bodies
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_batched_responses_match_unbatched(vectorized):
+    model.use_vectorized_engine(vectorized)
+    bodies = request_bodies()
+    batched = respond_all(crop_http.HTTPService(crop_http.MicroBatcher(max_batch=64, max_delay=0.001)), bodies)
+    unbatched = respond_all(crop_http.HTTPService(), bodies)
+    assert [status for status, _ in batched] == [200] * len(bodies)
+    assert batched == unbatched
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_score_requests_matches_get_suitable_crops(vectorized):
+    model.use_vectorized_engine(vectorized)
+    options = [(None, True, False), (2, False, True)]
+    for option in options:
+        batched = crop_http.score_requests(EDGE_INPUTS, [option] * len(EDGE_INPUTS))
+        assert batched == [model.get_suitable_crops(features, *option) for features in EDGE_INPUTS]
+
+def test_empty_string_is_a_present_value():
+    # '' counts as a condition that does not match, like in calculate_compatibility
+    features = {**BASE_FEATURES, 'Soil_Type': ''}
+    expected = model.calculate_compatibility('Rice', model.parse_features([features[key] for key in model.FEATURE_NAMES]))
+    status, text = respond_all(crop_http.HTTPService(crop_http.MicroBatcher()), [json.dumps(features).encode()])[0]
+    assert status == 200
+    rice = next(entry for entry in json.loads(text)['compatible_crops'] if entry['crop'] == 'Rice')
+    assert rice['compatibility'] == expected < 100.0
+
+def exchange(service, raw):
+    # Runs handle_connection on one raw request; returns what was written back
+    class Writer:
+        def __init__(self):
+            self.data = b''
+        def write(self, data):
+            self.data += data
+        async def drain(self):
+            pass
+        def close(self):
+            pass
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        writer = Writer()
+        await crop_http.handle_connection(reader, writer, service)
+        return writer.data
+    return asyncio.run(run())
+
+def test_negative_content_length_is_rejected():
+    response = exchange(crop_http.HTTPService(), b"POST /recommend HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"Invalid Content-Length" in response
+
+def test_respond_errors_become_500(capsys):
+    class Failing(crop_http.HTTPService):
+        async def respond(self, method, path, body):
+            raise RuntimeError("boom")
+    response = exchange(Failing(), b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 500 Internal Server Error")
+    assert json.loads(response.split(b"\r\n\r\n", 1)[1]) == {'error': "Internal server error"}
+    assert "boom" in capsys.readouterr().err
+
+def test_a_failing_request_does_not_fail_its_batch(monkeypatch):
+    score_requests = crop_http.score_requests
+    def failing(features, options):
+        if any(item['Nitrogen'] == 666 for item in features):
+            raise RuntimeError("boom")
+        return score_requests(features, options)
+    monkeypatch.setattr(crop_http, 'score_requests', failing)
+
+    bodies = request_bodies()
+    bodies.insert(4, json.dumps({**BASE_FEATURES, 'Nitrogen': 666}).encode())
+    service = crop_http.HTTPService(crop_http.MicroBatcher(max_batch=64, max_delay=0.001))
+    async def run():
+        return await asyncio.gather(*(service.respond('POST', '/recommend', body) for body in bodies),
+                                    return_exceptions=True)
+    responses = asyncio.run(run())
+    assert isinstance(responses.pop(4), RuntimeError)
+    del bodies[4]
+    assert responses == respond_all(crop_http.HTTPService(), bodies)
+    assert service.batcher.batches == 1
+
+@pytest.mark.parametrize('raw', [
+    b"GET /" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n",
+    b"GET /health HTTP/1.1\r\nX-Long: " + b"a" * 70000 + b"\r\n\r\n",
+], ids=['request_line', 'header'])
+def test_overlong_lines_are_rejected(raw):
+    response = exchange(crop_http.HTTPService(), raw)
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"too long" in response
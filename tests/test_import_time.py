@@ -0,0 +1,59 @@
+# tests/test_import_time.py
+# Import-time guard for the rule-based CLI fast path.
+#
+# Runs "python -X importtime model.py ..." in a new process and fails if any heavy module
+# (numpy, pandas, sklearn, scipy, ...) was imported, since the rule scoring only needs the
+# standard library. The failure message lists the offending packages and the slowest imports.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+HEAVY_MODULES = ('numpy', 'pandas', 'sklearn', 'scipy', 'joblib', 'pickle')
+SAMPLE = ['75', '45', '40', 'Tropical', '80', '6.5', '200', 'Clayey', 'Flat', 'High']
+FAST_PATHS = {
+    'recommendation': SAMPLE,
+    'top_k_compact': SAMPLE + ['--top-k', '3', '--compact'],
+    'crop_dictionary': ['--crop-dictionary'],
+}
+
+def profile_imports(args):
+    """
+    Runs model.py under -X importtime and returns a list of
+    (module_name, self_us, cumulative_us) for every imported module.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', os.path.join(ROOT, 'model.py')] + args,
+                          capture_output=True, text=True, cwd=ROOT)
+    assert proc.returncode == 0, f"model.py failed: {proc.stdout}{proc.stderr}"
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+def find_heavy(imports):
+    """
+    Returns (package, cumulative_us) for each heavy top-level package that was imported.
+    """
+    heavy = {}
+    for name, _, cumulative_us in imports:
+        package = name.split('.')[0]
+        if package in HEAVY_MODULES:
+            heavy[package] = max(heavy.get(package, 0), cumulative_us)
+    return sorted(heavy.items())
+
+@pytest.mark.parametrize('args', FAST_PATHS.values(), ids=FAST_PATHS.keys())
+def test_fast_path_imports_no_heavy_modules(args):
+    imports = profile_imports(args)
+    heavy = find_heavy(imports)
+    slowest = sorted(imports, key=lambda item: item[2], reverse=True)[:10]
+    assert not heavy, ("heavy modules imported on the rule-based fast path: "
+                       + ', '.join(f"{name} ({us / 1000:.1f} ms)" for name, us in heavy)
+                       + "; slowest imports: "
+                       + ', '.join(f"{name} ({us / 1000:.1f} ms)" for name, _, us in slowest))
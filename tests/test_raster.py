@@ -0,0 +1,79 @@
+# tests/test_raster.py
+# crop_raster: every cell of the output grids must hold what get_suitable_crops gives for
+# that cell's features, however the grid is split into bands and across worker processes.
+
+import json
+
+import numpy as np
+
+import crop_raster
+import crop_vocab
+import model
+
+SHAPE = (37, 53) # Not a multiple of the band height, so the last band is short
+
+def write_grids(directory, seed=6):
+    """
+    Random feature grids around the catalog's range endpoints, with no-data cells, category
+    codes out of range and a category the catalog does not know. Topography has no grid.
+    Returns {feature name: grid} as written, and the categories.json value lists.
+    """
+    rng = np.random.default_rng(seed)
+    grids = {}
+    for key in model.NUMERICAL_FEATURES:
+        endpoints = sorted({bound for conditions in model.CROP_CONDITIONS.values() if conditions.get(key)
+                            for bound in conditions[key]})
+        grid = rng.choice(np.asarray(endpoints, dtype=float), SHAPE) + rng.choice([-0.5, 0.0, 0.0, 0.5], SHAPE)
+        grid[rng.random(SHAPE) < 0.05] = np.nan
+        grids[key] = grid.astype(np.float32) if key == 'pH' else grid
+    categories = {}
+    for key in model.CATEGORICAL_FEATURES:
+        if key == 'Topography':
+            continue
+        categories[key] = list(reversed(crop_vocab.CATEGORY_VALUES[key])) + ['Volcanic']
+        grids[key] = rng.integers(-1, len(categories[key]) + 1, SHAPE, dtype=np.int16)
+    for key, grid in grids.items():
+        np.save(directory / f"{key.lower()}.npy", grid)
+    (directory / crop_raster.CATEGORIES_FILE).write_text(json.dumps(categories), encoding='utf-8')
+    return grids, categories
+
+def cell_features(grids, categories, row, col):
+    features = {}
+    for key, grid in grids.items():
+        value = grid[row, col]
+        if key in categories:
+            if 0 <= value < len(categories[key]):
+                features[key] = categories[key][value]
+        elif not np.isnan(value):
+            features[key] = float(value)
+    return features
+
+def test_raster_matches_get_suitable_crops(tmp_path):
+    input_dir, output_dir = tmp_path / 'in', tmp_path / 'out'
+    input_dir.mkdir()
+    grids, categories = write_grids(input_dir)
+    assert crop_raster.main(['--raster', str(input_dir), '--output', str(output_dir), '--cube',
+                             '--workers', '3', '--tile-rows', '5']) == 0
+
+    crop_names = list(model.CROP_CONDITIONS)
+    assert json.loads((output_dir / 'crops.json').read_text(encoding='utf-8')) == json.loads(
+        model.crop_dictionary())
+    best_crop = np.load(output_dir / 'best_crop.npy')
+    best_score = np.load(output_dir / 'best_score.npy')
+    cube = np.load(output_dir / 'scores.npy')
+    assert best_crop.shape == best_score.shape == SHAPE
+    assert cube.shape == (len(crop_names),) + SHAPE
+
+    for row in range(SHAPE[0]):
+        for col in range(SHAPE[1]):
+            result = json.loads(model.get_suitable_crops(cell_features(grids, categories, row, col)))
+            percentages = {item['crop']: item['compatibility']
+                           for item in result['compatible_crops'] + result['incompatible_crops']}
+            compatible = result['compatible_crops']
+            where = (row, col)
+            if compatible:
+                assert crop_names[best_crop[where]] == compatible[0]['crop'], where
+                assert best_score[where] == int(compatible[0]['compatibility'] + 0.5), where
+            else:
+                assert best_crop[where] == crop_raster.NO_CROP and best_score[where] == 0, where
+            assert cube[:, row, col].tolist() == [int(percentages[name] + 0.5) for name in crop_names], where
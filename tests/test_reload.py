@@ -0,0 +1,49 @@
+# tests/test_reload.py
+# crop_reload.validate_conditions: a conditions file the scorers cannot use must be
+# rejected before it is installed, and a reload of one must keep the running table.
+
+import json
+
+import pytest
+
+import crop_reload
+import model
+
+RICE = {'Nitrogen': [60, 90], 'pH': [6.0, 7.0], 'Soil_Type': ['Clayey', 'Loamy'], 'Water_Availability': 'High'}
+
+@pytest.mark.parametrize('rice, message', [
+    ({**RICE, 'pH': [7.0, 6.0]}, "pH range has min 7.0 above max 6.0"),
+    ({**RICE, 'Nitrogen': [float('nan'), 90]}, "Nitrogen bounds must be finite numbers"),
+    ({**RICE, 'Nitrogen': [60, float('nan')]}, "Nitrogen bounds must be finite numbers"),
+    ({**RICE, 'Rainfall': [float('-inf'), 500]}, "Rainfall bounds must be finite numbers"),
+    ({**RICE, 'Soil_Type': ['Clayey', 3]}, "Soil_Type values must be strings"),
+    ({**RICE, 'Climate': [None]}, "Climate values must be strings"),
+    ({**RICE, 'Climate': [['Tropical']]}, "Climate values must be strings"),
+    ({**RICE, 'Topography': 1}, "Topography must be a value or a list of values"),
+    ({**RICE, 'pH': [6.0]}, "pH must be a [min, max] range"),
+], ids=['min_above_max', 'nan_min', 'nan_max', 'infinite', 'int_category', 'none_category',
+        'nested_list', 'number_category', 'short_range'])
+def test_invalid_conditions_are_rejected(rice, message):
+    with pytest.raises(ValueError, match=message.replace('[', r'\[').replace(']', r'\]')):
+        crop_reload.validate_conditions({'Rice': rice})
+
+def test_valid_conditions_are_accepted():
+    validated = crop_reload.validate_conditions({'Rice': {**RICE, 'Humidity': [80, 80], 'Climate': None}})
+    assert validated == {'Rice': {**RICE, 'Nitrogen': (60, 90), 'pH': (6.0, 7.0), 'Humidity': (80, 80),
+                                  'Climate': None}}
+    assert crop_reload.validate_conditions(model.CROP_CONDITIONS) == model.CROP_CONDITIONS
+
+def test_reload_of_an_invalid_file_keeps_the_running_conditions(tmp_path, capsys):
+    path = tmp_path / 'conditions.json'
+    path.write_text(json.dumps({'Rice': RICE}), encoding='utf-8')
+    reloader = crop_reload.ConditionsReloader(str(path), model_path=str(tmp_path / 'crop_model.pkl'),
+                                              forest_dir=str(tmp_path / 'forest'), interval=0)
+    reloader.load_initial()
+    installed = model.CROP_CONDITIONS
+    assert list(installed) == ['Rice']
+
+    path.write_text(json.dumps({'Rice': {**RICE, 'pH': [7.5, 6.0]}, 'Wheat': {}}), encoding='utf-8')
+    assert reloader.check() == []
+    assert model.CROP_CONDITIONS is installed
+    assert reloader.errors == 1 and 'min 7.5 above max 6.0' in reloader.last_error
+    assert 'keeping the current version' in capsys.readouterr().err
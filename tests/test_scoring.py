@@ -0,0 +1,144 @@
+# tests/test_scoring.py
+# The scoring paths (crop_engine.CompiledConditions.score and score_columns,
+# crop_index.IntervalIndex, model.rank_crops / crop_json.RankedCrops) against
+# calculate_compatibility, the reference semantics, on catalogs below and above
+# VECTORIZED_MIN_CROPS.
+
+import random
+
+import numpy as np
+import pytest
+
+from conftest import BASE_FEATURES
+import crop_engine
+import crop_index
+import crop_vocab
+import model
+
+def synthetic_catalog(num_crops, seed=3):
+    """
+    num_crops random crops: integer and fractional ranges (some a single point), single
+    values and lists for the categorical features, and features without a condition
+    (None or left out).
+    """
+    rng = random.Random(seed)
+    catalog = {}
+    for i in range(num_crops):
+        conditions = {}
+        for key in model.NUMERICAL_FEATURES:
+            if rng.random() < 0.15:
+                if rng.random() < 0.5:
+                    conditions[key] = None
+                continue
+            low = rng.choice([rng.randint(0, 200), round(rng.uniform(0, 14), 1)])
+            conditions[key] = (low, low + rng.choice([0, 1, 0.5, rng.randint(1, 100)]))
+        for key, values in crop_vocab.CATEGORY_VALUES.items():
+            if rng.random() < 0.15:
+                continue
+            accepted = rng.sample(values, rng.randint(1, len(values)))
+            conditions[key] = accepted if len(accepted) > 1 or rng.random() < 0.5 else accepted[0]
+        catalog[f"Crop {i:03d}"] = conditions
+    return catalog
+
+def edge_inputs(catalog, count=60, seed=4):
+    """
+    Inputs exactly on range endpoints, between endpoints and outside every range, with
+    unknown categories, '' values, NaN, None and missing features mixed in.
+    """
+    rng = random.Random(seed)
+    endpoints = {key: sorted({bound for conditions in catalog.values() if conditions.get(key)
+                              for bound in conditions[key]}) for key in model.NUMERICAL_FEATURES}
+    # '' only reaches the scorer for categorical features: numerical ones are parsed to floats
+    samples = [BASE_FEATURES, {}, {**BASE_FEATURES, **{key: '' for key in model.CATEGORICAL_FEATURES}}]
+    for _ in range(count):
+        features = {}
+        for key in model.NUMERICAL_FEATURES:
+            points = endpoints[key] or [0.0]
+            kind = rng.random()
+            if kind < 0.4:
+                features[key] = rng.choice(points) # On an endpoint
+            elif kind < 0.7 and len(points) > 1:
+                i = rng.randrange(len(points) - 1)
+                features[key] = (points[i] + points[i + 1]) / 2 # Between endpoints
+            elif kind < 0.8:
+                features[key] = points[-1] + 1 # Outside every range
+            elif kind < 0.85:
+                features[key] = float('nan')
+            elif kind < 0.9:
+                features[key] = None
+            # Otherwise left out
+        for key, values in crop_vocab.CATEGORY_VALUES.items():
+            kind = rng.random()
+            if kind < 0.7:
+                features[key] = rng.choice(values)
+            elif kind < 0.8:
+                features[key] = 'Volcanic' # Unknown category
+            elif kind < 0.9:
+                features[key] = ''
+        samples.append(features)
+    return samples
+
+def reference(catalog, features):
+    return [model.calculate_compatibility(crop, features, catalog) for crop in catalog]
+
+def reference_ranking(catalog, percentages):
+    names = list(catalog)
+    compatible = sorted((i for i, p in enumerate(percentages) if p > 0), key=lambda i: -percentages[i])
+    incompatible = sorted((i for i, p in enumerate(percentages) if p <= 0), key=names.__getitem__)
+    return compatible, incompatible
+
+CATALOGS = {
+    'builtin': lambda: model.CROP_CONDITIONS,
+    'small': lambda: synthetic_catalog(40),
+    'large': lambda: synthetic_catalog(model.VECTORIZED_MIN_CROPS + 50),
+}
+
+@pytest.fixture(params=CATALOGS, ids=CATALOGS.keys())
+def catalog(request):
+    return CATALOGS[request.param]()
+
+def test_engine_matches_calculate_compatibility(catalog):
+    engine = crop_engine.CompiledConditions(catalog, crop_vocab.CATEGORY_VALUES)
+    for features in edge_inputs(catalog):
+        assert engine.score(features).tolist() == reference(catalog, features), features
+
+def test_index_matches_calculate_compatibility(catalog):
+    index = crop_index.IntervalIndex(crop_engine.CompiledConditions(catalog, crop_vocab.CATEGORY_VALUES))
+    for features in edge_inputs(catalog):
+        expected = reference(catalog, features)
+        assert index.score(features).tolist() == expected, features
+        # query only returns the candidates: crops matching at least one condition
+        crop_ids, matched, total = index.query(features)
+        assert crop_ids.tolist() == [i for i, p in enumerate(expected) if p > 0]
+        np.testing.assert_array_equal(matched / total * 100, np.asarray(expected)[crop_ids])
+
+def test_score_columns_matches_calculate_compatibility(catalog):
+    engine = crop_engine.CompiledConditions(catalog, crop_vocab.CATEGORY_VALUES)
+    samples = edge_inputs(catalog)
+    columns = {key: [features.get(key) for features in samples] for key in model.FEATURE_NAMES}
+    expected = [reference(catalog, features) for features in samples]
+    assert engine.score_columns(columns).tolist() == expected
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_rank_crops_matches_calculate_compatibility(catalog, vectorized):
+    model.install_conditions(catalog)
+    model.use_vectorized_engine(vectorized)
+    for features in edge_inputs(catalog, count=30):
+        expected = reference(catalog, features)
+        compatible, incompatible = reference_ranking(catalog, expected)
+
+        ranked = model.rank_crops(features)
+        assert list(ranked.percentages) == expected
+        assert list(ranked.compatible) == compatible
+        assert list(ranked.incompatible) == incompatible
+        assert [name for name, _ in ranked] == [list(catalog)[i] for i in compatible]
+
+        top = model.rank_crops(features, top_k=5, include_incompatible=False)
+        assert list(top.compatible) == compatible[:5]
+        assert top.incompatible is None
+
+def test_small_catalogs_use_the_python_loop_and_large_ones_the_engine():
+    model.install_conditions(synthetic_catalog(10))
+    assert isinstance(model.rank_crops(BASE_FEATURES).percentages, list)
+    model.install_conditions(synthetic_catalog(model.VECTORIZED_MIN_CROPS))
+    assert isinstance(model.rank_crops(BASE_FEATURES).percentages, np.ndarray)
@@ -0,0 +1,50 @@
+# tests/test_sensitivity.py
+# crop_sensitivity: the one-pass sweep must give the percentages calculate_compatibility
+# gives at every swept value, and its breakpoints must land on the condition endpoints.
+
+import pytest
+
+from conftest import BASE_FEATURES
+import crop_sensitivity
+import model
+
+def expected_compatibility(features):
+    return [model.calculate_compatibility(crop, features) for crop in model.CROP_CONDITIONS]
+
+@pytest.mark.parametrize('key', ['pH', 'Rainfall', 'Soil_Type', 'Climate'])
+def test_sweep_matches_calculate_compatibility(key):
+    base = {**BASE_FEATURES, 'Topography': None} # A missing feature stays uncounted
+    report = crop_sensitivity.analyze(base, key)
+    sweep = {entry['crop']: entry['compatibility'] for entry in report['crops']}
+    constant = {entry['crop']: entry['compatibility'] for entry in report['unaffected']}
+    for step, value in enumerate(report['values'][0]):
+        expected = expected_compatibility({**base, key: value})
+        for crop, percentage in zip(model.CROP_CONDITIONS, expected):
+            actual = sweep[crop][step] if crop in sweep else constant[crop]
+            assert actual == percentage, (crop, key, value)
+
+def test_two_feature_sweep_matches_calculate_compatibility():
+    report = crop_sensitivity.analyze(BASE_FEATURES, 'pH', [5.0, 6.0, 7.0, 7.5], 'Water_Availability')
+    values, values2 = report['values']
+    for entry in report['crops']:
+        crop = entry['crop']
+        for i, ph in enumerate(values):
+            for j, water in enumerate(values2):
+                features = {**BASE_FEATURES, 'pH': ph, 'Water_Availability': water}
+                assert entry['compatibility'][i][j] == model.calculate_compatibility(crop, features)
+
+def test_breakpoints_land_on_inclusive_endpoints():
+    report = crop_sensitivity.analyze(BASE_FEATURES, 'pH')
+    assert report['crops']
+    for entry in report['crops']:
+        low, high = entry['conditions']['pH']
+        assert entry['breakpoints']['pH'] == [{'value': low, 'change': 'enter'}, {'value': high, 'change': 'leave'}]
+        inside = [percentage for value, percentage in zip(report['values'][0], entry['compatibility'])
+                  if low <= value <= high]
+        assert set(inside) == {entry['levels']['inside']}
+
+def test_breakpoints_of_an_explicit_sweep():
+    # Rice: pH 6.0-7.0. The sweep starts outside, steps onto 6.0 and leaves after 7.0
+    report = crop_sensitivity.analyze(BASE_FEATURES, 'pH', [5.5, 6.0, 6.5, 7.0, 7.01])
+    rice = next(entry for entry in report['crops'] if entry['crop'] == 'Rice')
+    assert rice['breakpoints'] == {'pH': [{'value': 6.0, 'change': 'enter'}, {'value': 7.0, 'change': 'leave'}]}
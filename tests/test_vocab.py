@@ -0,0 +1,75 @@
+# tests/test_vocab.py
+# crop_vocab: check_consistency must report mismatched crop tables, the committed tables
+# must pass --check --strict, and the engine's category codes must follow crop_vocab.json.
+
+import crop_engine
+import crop_vocab
+import model
+
+FULL_BASE = {'N': 50, 'Phosphorus': 40, 'Potassium': 40, 'Climate': 'Tropical', 'Humidity': 80, 'pH': 6.5,
+             'Rainfall': 200, 'Soil_Type': 'Clayey', 'Topography': 'Flat', 'Water_Availability': 'High'}
+
+def test_mismatched_tables_give_errors_and_warnings():
+    conditions = {
+        'Rice': {'Nitrogen': (40, 60), 'pH': (6.0, 7.0), 'Climate': ['Tropical', 'Temperate'], 'Soil_Type': 'Clayey'},
+        'Millet': {'Nitrogen': (10, 30), 'Climate': 'Arid', 'Soil_Type': ['Sandy', 'Volcanic']},
+        'Wheat': {'Climate': 'Temperate'},
+    }
+    training_crops = ['Millet', 'Rice', 'Sorghum']
+    training_conditions = {
+        'Rice': FULL_BASE,
+        'Millet': {**FULL_BASE, 'Climate': 'Arid', 'Soil_Type': 'Laterite'},
+        'Sorghum': {key: value for key, value in FULL_BASE.items() if key not in ('pH', 'Rainfall')},
+    }
+    errors, warnings = crop_vocab.check_consistency(conditions, training_crops, training_conditions,
+                                                    {'Nitrogen': 'N'})
+    assert errors == [
+        "all_crops lacks 1 crop(s) of CROP_CONDITIONS: Wheat",
+        "all_crops has 1 crop(s) CROP_CONDITIONS does not: Sorghum",
+        "base_conditions lacks 1 crop(s) of CROP_CONDITIONS: Wheat",
+        "base_conditions has 1 crop(s) CROP_CONDITIONS does not: Sorghum",
+        "CROP_CONDITIONS['Millet']['Soil_Type']: 'Volcanic' is not in CATEGORY_VALUES",
+        "base_conditions['Millet']['Soil_Type']: 'Laterite' is not in CATEGORY_VALUES",
+        "base_conditions['Sorghum'] lacks pH, Rainfall",
+    ]
+    assert warnings == [
+        "Soil_Type: Loamy, Peaty, Silty used by neither table",
+        "Soil_Type: Laterite only in the training data",
+        "Topography: Hilly, Sloped used by neither table",
+        "Water_Availability: no crop rule uses it, so it never counts in the compatibility "
+        "(training data uses High)",
+        "Water_Availability: Low, Medium used by neither table",
+        "base_conditions['Millet']['Nitrogen'] = 50 is outside its rule (10, 30)",
+        "base_conditions['Millet']['Soil_Type'] = 'Laterite' is outside its rule ['Sandy', 'Volcanic']",
+    ]
+
+def test_crop_order_mismatch_is_a_warning():
+    conditions = {'Rice': {'Climate': 'Tropical'}, 'Wheat': {'Climate': 'Temperate'}}
+    errors, warnings = crop_vocab.check_consistency(conditions, ['Wheat', 'Rice'],
+                                                    {'Rice': FULL_BASE, 'Wheat': FULL_BASE}, {'Nitrogen': 'N'})
+    assert not errors
+    assert "all_crops lists the crops in a different order than CROP_CONDITIONS" in warnings
+
+def test_committed_tables_pass_strict_check(capsys):
+    assert crop_vocab.check_tables() == ([], [])
+    assert crop_vocab.main(['--check', '--strict']) == 0
+    assert 'Warning' not in capsys.readouterr().out
+
+def test_engine_category_codes_follow_the_artifact():
+    vocabulary = crop_vocab.load_vocabulary()
+    assert vocabulary == crop_vocab.compile_vocabulary()
+    assert vocabulary.crops == list(model.CROP_CONDITIONS)
+
+    model.use_vectorized_engine(True)
+    engine = model.get_engine()
+    assert engine.crop_names == vocabulary.crops
+    for key in model.CATEGORICAL_FEATURES:
+        assert engine.vocab[key] == vocabulary.codes[key], key
+
+    # Values only a custom catalog mentions get the next codes, in catalog order
+    catalog = {**model.CROP_CONDITIONS, 'Oca': {'Soil_Type': ['Volcanic', 'Loamy'], 'Topography': 'Terraced'}}
+    engine = crop_engine.CompiledConditions(catalog, vocabulary.categories)
+    expected = vocabulary.category_codes(catalog, model.CATEGORICAL_FEATURES)
+    assert engine.vocab == expected
+    assert expected['Soil_Type']['Volcanic'] == len(vocabulary.categories['Soil_Type'])
+    assert expected['Topography']['Terraced'] == len(vocabulary.categories['Topography'])